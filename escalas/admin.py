@@ -1,5 +1,8 @@
+from collections import defaultdict
+
 from django.contrib import admin
-from .models import Escala, DiaEscala, TurnoEscala, AlocacaoEscala
+from .contadores import recalcular_contadores, recalcular_contadores_alocacoes
+from .models import Escala, DiaEscala, TurnoEscala, AlocacaoEscala, ContadorFairness, ParametrosIASecao
 
 
 class DiaInline(admin.TabularInline):
@@ -13,6 +16,22 @@ class EscalaAdmin(admin.ModelAdmin):
     list_filter = ("secao", "status")
     inlines = [DiaInline]
 
+    # apagar a escala leva as alocações junto (cascade)
+    def delete_model(self, request, obj):
+        self.delete_queryset(request, Escala.objects.filter(pk=obj.pk))
+
+    def delete_queryset(self, request, queryset):
+        datas = defaultdict(set)
+        for secao, data in queryset.values_list("secao", "dias__data"):
+            datas[secao].add(data)
+
+        secoes = {e.secao_id: e.secao for e in queryset.select_related("secao")}
+
+        super().delete_queryset(request, queryset)
+
+        for secao_id, dias in datas.items():
+            recalcular_contadores(secoes[secao_id], dias)
+
 
 @admin.register(TurnoEscala)
 class TurnoEscalaAdmin(admin.ModelAdmin):
@@ -23,3 +42,38 @@ class TurnoEscalaAdmin(admin.ModelAdmin):
 class AlocacaoEscalaAdmin(admin.ModelAdmin):
     list_display = ("usuario", "turno", "tipo", "virou_titular")
     list_filter = ("tipo",)
+
+    # ContadorFairness acompanha toda escrita, como nas views
+    def save_model(self, request, obj, form, change):
+        anteriores = []
+        if change:
+            anteriores = list(
+                AlocacaoEscala.objects
+                .select_related("turno__dia__escala__secao")
+                .filter(pk=obj.pk)
+            )
+
+        super().save_model(request, obj, form, change)
+        recalcular_contadores_alocacoes(obj, *anteriores)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        recalcular_contadores_alocacoes(obj)
+
+    def delete_queryset(self, request, queryset):
+        alocacoes = list(queryset.select_related("turno__dia__escala__secao"))
+
+        super().delete_queryset(request, queryset)
+        recalcular_contadores_alocacoes(*alocacoes)
+
+
+@admin.register(ContadorFairness)
+class ContadorFairnessAdmin(admin.ModelAdmin):
+    list_display = ("usuario", "secao", "semana", "total", "preta", "amarela")
+    list_filter = ("secao",)
+
+
+@admin.register(ParametrosIASecao)
+class ParametrosIASecaoAdmin(admin.ModelAdmin):
+    list_display = ("secao", "peso_pontos", "peso_amarelas", "peso_sobreaviso", "injustica", "treinado_em")
+    readonly_fields = ("treinado_em",)
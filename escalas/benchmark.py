@@ -0,0 +1,282 @@
+"""
+Benchmark da geração de escalas sobre seções sintéticas.
+
+Usado pelo comando `benchmark_escalas` e pelos testes: semeia uma
+seção, mede cada cenário (tempo, queries, pico de memória) e compara
+com uma baseline em JSON.
+
+Cada tamanho roda dentro de uma transação desfeita no final, então
+nada do que é semeado fica no banco.
+"""
+import json
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+
+TAMANHOS_PADRAO = (10, 100, 1000)
+TOLERANCIA_PADRAO = 0.25
+
+# cenários de poucos ms oscilam mais que qualquer tolerância relativa
+FOLGA_SEGUNDOS = 0.05
+
+# segunda-feira fixa → resultados comparáveis entre execuções
+INICIO_PADRAO = date(2026, 1, 5)
+
+CAMINHO_BASELINE = Path(__file__).resolve().parent / "benchmark_baseline.json"
+
+
+# =========================
+# SEÇÃO SINTÉTICA
+# =========================
+def semear_secao(
+    operadores,
+    proporcao_pista=0.6,
+    proporcao_manutencao=0.7,
+    densidade_indisponibilidade=0.05,
+    inicio=INICIO_PADRAO,
+    dias=28,
+    seed=0,
+):
+    """
+    Cria projeto, seção, operadores com cursos e indisponibilidades.
+
+    densidade_indisponibilidade: fração de operador×dia ausente na
+    janela [inicio, inicio + dias).
+
+    Retorna (secao, escalante).
+    """
+    from accounts.models import User, CursoOperacional, Curso
+    from indisponibilidades.models import Indisponibilidade
+    from projetos.models import Projeto, Secao
+
+    rng = random.Random(seed)
+
+    projeto = Projeto.objects.create(nome=f"Benchmark {operadores}")
+    secao = Secao.objects.create(nome=f"BENCH{operadores}", projeto=projeto)
+
+    # hash uma vez só (make_password por usuário domina o setup)
+    senha = make_password(None)
+
+    escalante = User.objects.create(
+        username=f"bench_esc_{operadores}",
+        password=senha,
+        papel=User.Papel.ESCALANTE,
+        secao=secao,
+    )
+
+    User.objects.bulk_create([
+        User(
+            username=f"bench_{operadores}_{i}",
+            password=senha,
+            papel=User.Papel.OPERADOR,
+            secao=secao,
+        )
+        for i in range(operadores)
+    ])
+
+    # bulk_create não devolve pk em todos os bancos → relê
+    usuarios = list(User.objects.filter(secao=secao, papel=User.Papel.OPERADOR))
+
+    pista = CursoOperacional.objects.get_or_create(codigo=Curso.PISTA)[0]
+    manutencao = CursoOperacional.objects.get_or_create(codigo=Curso.MANUTENCAO)[0]
+
+    Vinculo = User.cursos.through
+    vinculos = []
+
+    for u in usuarios:
+        if rng.random() < proporcao_pista:
+            vinculos.append(Vinculo(user_id=u.id, cursooperacional_id=pista.id))
+        if rng.random() < proporcao_manutencao:
+            vinculos.append(Vinculo(user_id=u.id, cursooperacional_id=manutencao.id))
+
+    Vinculo.objects.bulk_create(vinculos)
+
+    ausencias = []
+
+    for u in usuarios:
+        for i in range(dias):
+            if rng.random() < densidade_indisponibilidade:
+                data = inicio + timedelta(days=i)
+                ausencias.append(
+                    Indisponibilidade(
+                        usuario=u,
+                        data_inicio=data,
+                        data_fim=data,
+                        motivo=Indisponibilidade.Motivo.FOLGA,
+                    )
+                )
+
+    Indisponibilidade.objects.bulk_create(ausencias)
+
+    return secao, escalante
+
+
+# =========================
+# MEDIÇÃO
+# =========================
+def medir(funcao):
+    """
+    Executa `funcao` e devolve (resultado, métricas).
+    """
+    tracemalloc.start()
+    inicio = time.perf_counter()
+
+    try:
+        with CaptureQueriesContext(connection) as ctx:
+            resultado = funcao()
+
+        segundos = time.perf_counter() - inicio
+        _, pico = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return resultado, {
+        "segundos": round(segundos, 4),
+        "queries": len(ctx.captured_queries),
+        "pico_memoria_kb": round(pico / 1024, 1),
+    }
+
+
+def _cenarios(secao, escalante, inicio, qtd_madrugada, qtd_noturno, seed=0):
+    """
+    (nome, função) na ordem de execução.
+    encerrar_escala usa a escala DIN da mesma rodada.
+    """
+    from escalas.models import Escala
+    from escalas.services import (
+        gerar_escala_semanal,
+        encerrar_escala,
+        criar_sobreaviso_service,
+    )
+
+    gerada = {}
+
+    def gerar(modo, semana):
+        def _f():
+            escala = gerar_escala_semanal(
+                secao=secao,
+                data_inicio=inicio + timedelta(days=7 * semana),
+                criada_por=escalante,
+                qtd_madrugada=qtd_madrugada,
+                qtd_noturno=qtd_noturno,
+                modo=modo,
+                seed=seed,
+            )
+            gerada[modo] = escala
+            return escala
+        return _f
+
+    def encerrar():
+        escala = gerada["DIN"]
+        escala.status = Escala.Status.PUBLICADA
+        escala.save(update_fields=["status"])
+        return encerrar_escala(escala, escalante)
+
+    def sobreaviso():
+        # sábado da semana DIN
+        return criar_sobreaviso_service(
+            secao, inicio + timedelta(days=5), 2, escalante
+        )
+
+    return [
+        ("gerar_escala_semanal_DIN", gerar("DIN", 0)),
+        ("gerar_escala_semanal_SEM", gerar("SEM", 1)),
+        ("encerrar_escala", encerrar),
+        ("criar_sobreaviso_service", sobreaviso),
+    ]
+
+
+def rodar_benchmarks(
+    tamanhos=TAMANHOS_PADRAO,
+    inicio=INICIO_PADRAO,
+    qtd_madrugada=1,
+    qtd_noturno=2,
+    seed=0,
+    **opcoes_secao
+):
+    """
+    Roda todos os cenários para cada tamanho de seção.
+
+    Retorna {"<tamanho>": {"<cenario>": métricas}}.
+    """
+    resultados = {}
+
+    for tamanho in tamanhos:
+        with transaction.atomic():
+            secao, escalante = semear_secao(
+                tamanho, inicio=inicio, seed=seed, **opcoes_secao
+            )
+
+            resultados[str(tamanho)] = {
+                nome: medir(funcao)[1]
+                for nome, funcao in _cenarios(
+                    secao, escalante, inicio, qtd_madrugada, qtd_noturno, seed
+                )
+            }
+
+            # 🔙 nada do benchmark fica no banco
+            transaction.set_rollback(True)
+
+    return resultados
+
+
+# =========================
+# BASELINE
+# =========================
+def carregar_baseline(caminho=CAMINHO_BASELINE):
+    caminho = Path(caminho)
+
+    if not caminho.exists():
+        return None
+
+    return json.loads(caminho.read_text(encoding="utf-8"))
+
+
+def salvar_baseline(resultados, caminho=CAMINHO_BASELINE):
+    Path(caminho).write_text(
+        json.dumps(resultados, indent=2, sort_keys=True) + "\n",
+        encoding="utf-8",
+    )
+
+
+def comparar(resultados, baseline, tolerancia=TOLERANCIA_PADRAO):
+    """
+    Lista de regressões (strings) em relação à baseline.
+
+    - tempo e memória: falha acima de baseline × (1 + tolerancia)
+      (tempo com FOLGA_SEGUNDOS de margem absoluta)
+    - queries: determinísticas → qualquer aumento é regressão
+    """
+    regressoes = []
+
+    for tamanho, cenarios in resultados.items():
+        for nome, atual in cenarios.items():
+            base = (baseline or {}).get(tamanho, {}).get(nome)
+
+            if base is None:
+                continue
+
+            if atual["queries"] > base["queries"]:
+                regressoes.append(
+                    f"{nome}[{tamanho}] queries: {base['queries']} → {atual['queries']}"
+                )
+
+            for campo in ("segundos", "pico_memoria_kb"):
+                limite = base[campo] * (1 + tolerancia)
+
+                if campo == "segundos":
+                    limite += FOLGA_SEGUNDOS
+
+                if atual[campo] > limite:
+                    regressoes.append(
+                        f"{nome}[{tamanho}] {campo}: {base[campo]} → {atual[campo]}"
+                    )
+
+    return regressoes
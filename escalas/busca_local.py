@@ -0,0 +1,280 @@
+"""
+Busca local sobre um plano já preenchido (estágio opcional da geração).
+
+Depois do guloso, tenta mover titularidades para outro operador ou
+trocar dois titulares de dias diferentes, aceitando o que reduzir a
+injustiça. Respeita disponibilidade, cursos, um turno por dia e a
+cobertura do noturno. Roda até estourar o orçamento em ms.
+"""
+import math
+import random
+import time
+
+from .fairness import candidato_valido
+from .utils import tem_curso_manutencao
+
+
+CAMPOS = ("total", "preta", "amarela")
+PESO_TIPO_DIA = 0.5
+RESFRIAMENTO = 0.999
+EPS = 1e-12
+
+ORCAMENTO_PADRAO_MS = 200
+
+
+def campos_do_dia(tipo_dia):
+    if tipo_dia == "PRETA":
+        return ("total", "preta")
+
+    if tipo_dia == "AMARELA":
+        return ("total", "amarela")
+
+    return ("total",)
+
+
+# =========================
+# OBJETIVO
+# =========================
+class Objetivo:
+    """
+    CV da carga total (o mesmo de ia.autoajuste.avaliar_injustica)
+    + PESO_TIPO_DIA × (CV de pretas + CV de amarelas).
+
+    Mover ou trocar titulares não muda a soma de nenhum campo, só a
+    soma dos quadrados → cada movimento é avaliado em O(1).
+    """
+
+    def __init__(self, cargas, peso_tipo=PESO_TIPO_DIA):
+        self.cargas = cargas
+        self.peso_tipo = peso_tipo
+        self.n = len(cargas)
+        self.soma = {c: sum(d[c] for d in cargas.values()) for c in CAMPOS}
+        self.quad = {c: sum(d[c] ** 2 for d in cargas.values()) for c in CAMPOS}
+
+    def _cv(self, campo, quad):
+        if not self.n:
+            return 0.0
+
+        media = self.soma[campo] / self.n
+
+        if media == 0:
+            return 0.0
+
+        variancia = max(quad / self.n - media * media, 0.0)
+        return math.sqrt(variancia) / media
+
+    def _valor(self, quad):
+        return (
+            self._cv("total", quad["total"]) +
+            self.peso_tipo * (
+                self._cv("preta", quad["preta"]) +
+                self._cv("amarela", quad["amarela"])
+            )
+        )
+
+    def valor(self):
+        return self._valor(self.quad)
+
+    def _quadrados(self, mudancas):
+        quad = dict(self.quad)
+
+        for (usuario_id, campo), d in mudancas.items():
+            if d:
+                v = self.cargas[usuario_id][campo]
+                quad[campo] += (v + d) ** 2 - v * v
+
+        return quad
+
+    def delta(self, mudancas):
+        return self._valor(self._quadrados(mudancas)) - self.valor()
+
+    def aplicar(self, mudancas):
+        self.quad = self._quadrados(mudancas)
+
+        for (usuario_id, campo), d in mudancas.items():
+            self.cargas[usuario_id][campo] += d
+
+
+def _transferir(mudancas, de_id, para_id, tipo_dia):
+    for campo in campos_do_dia(tipo_dia):
+        mudancas[(de_id, campo)] = mudancas.get((de_id, campo), 0) - 1
+        mudancas[(para_id, campo)] = mudancas.get((para_id, campo), 0) + 1
+
+
+def _descobre_noturno(turno, saindo, entrando, capacidades):
+    return (
+        turno.turno == "NOT"
+        and turno.habilitados == 1
+        and tem_curso_manutencao(saindo, capacidades)
+        and not tem_curso_manutencao(entrando, capacidades)
+    )
+
+
+# =========================
+# VIZINHANÇA
+# =========================
+def _mover(slot, novo, ocupados, disponibilidade, capacidades):
+    """
+    Titular do slot → `novo` (que não trabalha nesse dia).
+    """
+    dia, turno, alocacao = slot
+    atual = alocacao.usuario
+
+    if novo.id in ocupados[dia.data]:
+        return None
+
+    if not candidato_valido(novo, dia.data, turno, (), disponibilidade, capacidades):
+        return None
+
+    if _descobre_noturno(turno, atual, novo, capacidades):
+        return None
+
+    mudancas = {}
+    _transferir(mudancas, atual.id, novo.id, dia.tipo_dia)
+
+    def aplicar():
+        ocupados[dia.data].discard(atual.id)
+        ocupados[dia.data].add(novo.id)
+        turno.trocar(alocacao, novo, capacidades)
+
+    return mudancas, aplicar
+
+
+def _trocar(slot, outro, ocupados, disponibilidade, capacidades):
+    """
+    Titulares de dois dias diferentes trocam de lugar.
+    """
+    dia1, turno1, a1 = slot
+    dia2, turno2, a2 = outro
+    u1, u2 = a1.usuario, a2.usuario
+
+    # mesmo tipo de dia → carga idêntica, nada a ganhar
+    if dia1.data == dia2.data or dia1.tipo_dia == dia2.tipo_dia:
+        return None
+
+    if u1.id in ocupados[dia2.data] or u2.id in ocupados[dia1.data]:
+        return None
+
+    if not candidato_valido(u1, dia2.data, turno2, (), disponibilidade, capacidades):
+        return None
+
+    if not candidato_valido(u2, dia1.data, turno1, (), disponibilidade, capacidades):
+        return None
+
+    if (
+        _descobre_noturno(turno1, u1, u2, capacidades)
+        or _descobre_noturno(turno2, u2, u1, capacidades)
+    ):
+        return None
+
+    mudancas = {}
+    _transferir(mudancas, u1.id, u2.id, dia1.tipo_dia)
+    _transferir(mudancas, u2.id, u1.id, dia2.tipo_dia)
+
+    def aplicar():
+        ocupados[dia1.data].discard(u1.id)
+        ocupados[dia1.data].add(u2.id)
+        ocupados[dia2.data].discard(u2.id)
+        ocupados[dia2.data].add(u1.id)
+        turno1.trocar(a1, u2, capacidades)
+        turno2.trocar(a2, u1, capacidades)
+
+    return mudancas, aplicar
+
+
+# =========================
+# BUSCA
+# =========================
+def melhorar_plano(
+    plano,
+    operadores,
+    stats,
+    disponibilidade=None,
+    capacidades=None,
+    orcamento_ms=ORCAMENTO_PADRAO_MS,
+    temperatura=0.0,
+    rng=random
+):
+    """
+    Hill climbing (temperatura=0) ou simulated annealing sobre os
+    titulares do plano, alterando o plano no lugar.
+
+    `stats` é o histórico antes da semana (não é alterado).
+    Retorna {"antes", "depois", "iteracoes", "aceitos"}.
+    """
+    slots = [
+        (dia, turno, a)
+        for dia, turno in plano.turnos()
+        for a in turno.alocacoes
+        if a.tipo == "TIT"
+    ]
+
+    ocupados = {dia.data: set() for dia in plano.dias}
+    for dia, turno in plano.turnos():
+        ocupados[dia.data].update(turno.usuarios_ids())
+
+    cargas = {
+        op.id: {c: stats.get(op.id, {}).get(c, 0) for c in CAMPOS}
+        for op in operadores
+    }
+
+    for dia, _, a in slots:
+        carga = cargas.setdefault(a.usuario.id, dict.fromkeys(CAMPOS, 0))
+        for campo in campos_do_dia(dia.tipo_dia):
+            carga[campo] += 1
+
+    objetivo = Objetivo(cargas)
+    resumo = {"antes": objetivo.valor(), "iteracoes": 0, "aceitos": 0}
+
+    melhor = resumo["antes"]
+    melhor_estado = None
+
+    limite = time.perf_counter() + orcamento_ms / 1000
+
+    while slots and len(operadores) > 1 and time.perf_counter() < limite:
+        resumo["iteracoes"] += 1
+        slot = rng.choice(slots)
+
+        if rng.random() < 0.5:
+            proposta = _mover(
+                slot, rng.choice(operadores), ocupados,
+                disponibilidade, capacidades,
+            )
+        else:
+            proposta = _trocar(
+                slot, rng.choice(slots), ocupados,
+                disponibilidade, capacidades,
+            )
+
+        if proposta is None:
+            continue
+
+        mudancas, aplicar = proposta
+        delta = objetivo.delta(mudancas)
+
+        aceita = delta < -EPS or (
+            temperatura > 0
+            and rng.random() < math.exp(-max(delta, 0) / temperatura)
+        )
+
+        temperatura *= RESFRIAMENTO
+
+        if not aceita:
+            continue
+
+        objetivo.aplicar(mudancas)
+        aplicar()
+        resumo["aceitos"] += 1
+
+        if objetivo.valor() < melhor - EPS:
+            melhor = objetivo.valor()
+            melhor_estado = [a.usuario for _, _, a in slots]
+
+    # annealing pode terminar acima do melhor visto → volta para ele
+    if melhor_estado is not None and objetivo.valor() > melhor + EPS:
+        for (_, turno, a), usuario in zip(slots, melhor_estado):
+            if a.usuario is not usuario:
+                turno.trocar(a, usuario, capacidades)
+
+    resumo["depois"] = min(objetivo.valor(), melhor)
+    return resumo
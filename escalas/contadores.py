@@ -0,0 +1,254 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import Count, Max, Q
+from django.db.models.functions import TruncWeek
+
+from .models import AlocacaoEscala, ContadorFairness
+
+
+CAMPOS = ("total", "preta", "amarela")
+
+
+def semana_de(data):
+    return data - timedelta(days=data.weekday())
+
+
+def _vazio():
+    return {"total": 0, "preta": 0, "amarela": 0}
+
+
+# =========================
+# INCREMENTO (flush do plano)
+# =========================
+def incrementar_contadores(secao, deltas):
+    """
+    deltas: {(usuario_id, semana): {"total": n, "preta": n, "amarela": n}}
+
+    Uma leitura + um bulk_update + um bulk_create.
+    """
+    if not deltas:
+        return
+
+    usuario_ids = {u for u, _ in deltas}
+    semanas = {s for _, s in deltas}
+
+    existentes = {
+        (c.usuario_id, c.semana): c
+        for c in ContadorFairness.objects.filter(
+            secao=secao,
+            semana__in=semanas,
+            usuario_id__in=usuario_ids,
+        )
+    }
+
+    atualizar = []
+    criar = []
+
+    for chave, delta in deltas.items():
+        contador = existentes.get(chave)
+
+        if contador is None:
+            usuario_id, semana = chave
+            criar.append(
+                ContadorFairness(
+                    secao=secao,
+                    usuario_id=usuario_id,
+                    semana=semana,
+                    **{campo: max(delta[campo], 0) for campo in CAMPOS},
+                )
+            )
+            continue
+
+        for campo in CAMPOS:
+            setattr(contador, campo, max(getattr(contador, campo) + delta[campo], 0))
+
+        atualizar.append(contador)
+
+    if atualizar:
+        ContadorFairness.objects.bulk_update(atualizar, CAMPOS)
+
+    if criar:
+        ContadorFairness.objects.bulk_create(criar)
+
+
+def deltas_do_plano(plano):
+    deltas = defaultdict(_vazio)
+
+    for dia, turno in plano.turnos():
+        for usuario_id in turno.usuarios_ids(tipo="TIT"):
+            delta = deltas[(usuario_id, semana_de(dia.data))]
+            delta["total"] += 1
+
+            if dia.tipo_dia == "PRETA":
+                delta["preta"] += 1
+            elif dia.tipo_dia == "AMARELA":
+                delta["amarela"] += 1
+
+    return deltas
+
+
+# =========================
+# RECÁLCULO (edição / exclusão / permuta)
+# =========================
+def recalcular_contadores(secao, datas):
+    """
+    Refaz as semanas que contêm `datas` a partir das alocações.
+    Custo limitado às semanas tocadas, não ao histórico.
+    """
+    semanas = sorted({semana_de(d) for d in datas if d})
+
+    if not semanas:
+        return
+
+    filtro_datas = Q()
+    for semana in semanas:
+        filtro_datas |= Q(
+            turno__dia__data__gte=semana,
+            turno__dia__data__lte=semana + timedelta(days=6),
+        )
+
+    agregados = (
+        AlocacaoEscala.objects
+        .filter(
+            filtro_datas,
+            turno__dia__escala__secao=secao,
+            tipo="TIT",
+            usuario__isnull=False,
+        )
+        .annotate(semana=TruncWeek("turno__dia__data"))
+        .values("usuario", "semana")
+        .annotate(
+            total=Count("id"),
+            preta=Count("id", filter=Q(turno__dia__tipo_dia="PRETA")),
+            amarela=Count("id", filter=Q(turno__dia__tipo_dia="AMARELA")),
+        )
+    )
+
+    novos = [
+        ContadorFairness(
+            secao=secao,
+            usuario_id=item["usuario"],
+            semana=item["semana"],
+            total=item["total"],
+            preta=item["preta"],
+            amarela=item["amarela"],
+        )
+        for item in agregados
+    ]
+
+    ContadorFairness.objects.filter(secao=secao, semana__in=semanas).delete()
+
+    if novos:
+        ContadorFairness.objects.bulk_create(novos)
+
+
+def recalcular_contadores_escala(escala):
+    recalcular_contadores(
+        escala.secao,
+        escala.dias.values_list("data", flat=True),
+    )
+
+
+def recalcular_contadores_alocacoes(*alocacoes):
+    por_secao = defaultdict(set)
+
+    for alocacao in alocacoes:
+        dia = alocacao.turno.dia
+        por_secao[dia.escala.secao].add(dia.data)
+
+    for secao, datas in por_secao.items():
+        recalcular_contadores(secao, datas)
+
+
+# =========================
+# PARTICIPAÇÃO RECENTE (leitura)
+# =========================
+@dataclass
+class Participacao:
+    # titulares nas últimas `semanas_bloqueio` semanas
+    bloqueados: set = field(default_factory=set)
+    # usuario_id → semanas com titularidade nas últimas `semanas`
+    semanas: dict = field(default_factory=dict)
+
+
+def participacao_recente(secao, semanas=8, semanas_bloqueio=1, hoje=None):
+    """
+    Uma query agrupada sobre os contadores materializados
+    (índice contador_participacao_idx cobre o filtro).
+
+    Granularidade de semana: a semana que contém o início da
+    janela conta inteira.
+    """
+    from django.utils import timezone
+
+    hoje = hoje or timezone.now().date()
+
+    limite_bloqueio = hoje - timedelta(days=7 * semanas_bloqueio)
+    inicio = semana_de(hoje - timedelta(days=7 * semanas))
+
+    linhas = (
+        ContadorFairness.objects
+        .filter(
+            secao=secao,
+            semana__gte=min(limite_bloqueio, inicio),
+            total__gt=0,
+        )
+        .values("usuario")
+        .annotate(
+            n=Count("id", filter=Q(semana__gte=inicio)),
+            ultima=Max("semana"),
+        )
+        .values_list("usuario", "n", "ultima")
+    )
+
+    participacao = Participacao()
+
+    for usuario_id, n, ultima in linhas:
+        if n:
+            participacao.semanas[usuario_id] = n
+
+        if ultima >= limite_bloqueio:
+            participacao.bloqueados.add(usuario_id)
+
+    return participacao
+
+
+def titulares_por_semana(secao, desde):
+    """
+    {semana: {usuario_id}} com titularidade a partir de `desde`.
+    Uma query nos contadores; é o "recente" do ContextoGeracao.
+    """
+    por_semana = defaultdict(set)
+
+    linhas = (
+        ContadorFairness.objects
+        .filter(secao=secao, semana__gte=semana_de(desde), total__gt=0)
+        .values_list("semana", "usuario")
+    )
+
+    for semana, usuario_id in linhas:
+        por_semana[semana].add(usuario_id)
+
+    return dict(por_semana)
+
+
+def participacao_de(por_semana, hoje, semanas=8, semanas_bloqueio=1):
+    """
+    participacao_recente em memória, sobre titulares_por_semana.
+    """
+    limite_bloqueio = hoje - timedelta(days=7 * semanas_bloqueio)
+    inicio = semana_de(hoje - timedelta(days=7 * semanas))
+
+    participacao = Participacao()
+
+    for semana, usuarios in por_semana.items():
+        for usuario_id in usuarios:
+            if semana >= inicio:
+                participacao.semanas[usuario_id] = participacao.semanas.get(usuario_id, 0) + 1
+
+            if semana >= limite_bloqueio:
+                participacao.bloqueados.add(usuario_id)
+
+    return participacao
@@ -0,0 +1,169 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import timedelta
+
+from django.db.models import Count
+
+from accounts.models import User
+from .contadores import deltas_do_plano, participacao_de, titulares_por_semana
+from .fairness import calcular_stats
+from .indices import IndiceDisponibilidade, CapacidadesOperadores
+from .models import AlocacaoEscala
+
+
+# semanas de titularidade que o contexto traz (participação recente)
+SEMANAS_RECENTES = 8
+
+
+# =========================
+# REGISTROS (sem ORM)
+# =========================
+@dataclass(slots=True, eq=False)
+class Operador:
+    """
+    O que a seleção e as telas usam de User, lido com values().
+    Nenhum atributo dispara query.
+    """
+
+    id: int
+    username: str
+    first_name: str = ""
+    last_name: str = ""
+    cursos: frozenset = frozenset()
+
+    def get_full_name(self):
+        return f"{self.first_name} {self.last_name}".strip()
+
+    def __str__(self):
+        return self.get_full_name() or self.username
+
+
+def carregar_operadores(secao):
+    """
+    Operadores da seção com os códigos de curso (duas queries).
+    """
+    registros = (
+        User.objects
+        .filter(secao=secao, papel="OPE")
+        .order_by("id")
+        .values("id", "username", "first_name", "last_name")
+    )
+
+    cursos = defaultdict(set)
+
+    for usuario_id, codigo in (
+        User.cursos.through.objects
+        .filter(user__secao=secao, user__papel="OPE")
+        .values_list("user_id", "cursooperacional__codigo")
+    ):
+        cursos[usuario_id].add(codigo)
+
+    return [
+        Operador(**r, cursos=frozenset(cursos[r["id"]]))
+        for r in registros
+    ]
+
+
+def contar_sobreavisos(secao):
+    return dict(
+        AlocacaoEscala.objects
+        .filter(usuario__secao=secao, usuario__papel="OPE", tipo="SOB")
+        .values("usuario")
+        .annotate(n=Count("id"))
+        .values_list("usuario", "n")
+    )
+
+
+# =========================
+# CONTEXTO DA GERAÇÃO
+# =========================
+@dataclass
+class ContextoGeracao:
+    """
+    Tudo que a geração lê do banco, carregado uma vez para a janela
+    inteira (uma semana ou várias), em número fixo de queries.
+    Depois disso os motores (DIN, SEM, OPT, sobreaviso) só leem
+    memória: dá para montar um contexto à mão e testar sem banco.
+
+    As alocações recentes entram como `titulares_recentes`
+    ({semana: {usuario_id}}, das SEMANAS_RECENTES semanas antes do
+    início em diante, lido dos contadores materializados), de onde
+    sai `participacao` sem query.
+
+    Entre semanas o estado é carregado em memória via `acumular`,
+    então a semana N+1 enxerga as titularidades planejadas na N
+    exatamente como enxergaria depois de gravadas.
+    """
+
+    secao: object
+    operadores: list
+    stats: dict
+    disponibilidade: IndiceDisponibilidade
+    capacidades: CapacidadesOperadores
+    stats_fixa: dict = field(default_factory=dict)
+    sobreavisos: dict = field(default_factory=dict)
+    titulares_recentes: dict = field(default_factory=dict)
+    modo: str = "DIN"
+
+    @classmethod
+    def carregar(cls, secao, inicio, fim, modo="DIN"):
+        """
+        `modo` SOB (sobreaviso) troca os stats de titularidade pela
+        contagem de sobreavisos.
+        """
+        operadores = carregar_operadores(secao)
+        sobreaviso = modo == "SOB"
+
+        return cls(
+            secao=secao,
+            operadores=operadores,
+            stats={} if sobreaviso else calcular_stats(secao),
+            stats_fixa=(
+                calcular_stats(secao, dias=365) if modo == "SEM" else {}
+            ),
+            sobreavisos=contar_sobreavisos(secao) if sobreaviso else {},
+            titulares_recentes=(
+                {} if sobreaviso else titulares_por_semana(
+                    secao, inicio - timedelta(weeks=SEMANAS_RECENTES)
+                )
+            ),
+            disponibilidade=IndiceDisponibilidade.carregar(secao, inicio, fim),
+            capacidades=CapacidadesOperadores.de_operadores(operadores),
+            modo=modo,
+        )
+
+    def participacao(self, hoje, semanas=SEMANAS_RECENTES, semanas_bloqueio=1):
+        """
+        Mesmo resultado de participacao_recente(secao, hoje=hoje),
+        incluindo as semanas já acumuladas.
+        """
+        return participacao_de(self.titulares_recentes, hoje, semanas, semanas_bloqueio)
+
+    def copia_stats(self, fixa=False):
+        base = self.stats_fixa if fixa else self.stats
+        return {k: dict(v) for k, v in base.items()}
+
+    def fila_balanceada(self):
+        """
+        Mesma ordem de fila_operadores_balanceada, sem query.
+        """
+        return sorted(
+            self.operadores,
+            key=lambda op: (self.stats.get(op.id, {"total": 0})["total"], op.id),
+        )
+
+    def acumular(self, plano):
+        bases = [self.stats]
+
+        if self.modo == "SEM":
+            bases.append(self.stats_fixa)
+
+        for (usuario_id, semana), delta in deltas_do_plano(plano).items():
+            self.titulares_recentes.setdefault(semana, set()).add(usuario_id)
+
+            for base in bases:
+                dados = base.setdefault(
+                    usuario_id, {"total": 0, "preta": 0, "amarela": 0}
+                )
+                for campo, valor in delta.items():
+                    dados[campo] += valor
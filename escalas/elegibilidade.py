@@ -0,0 +1,65 @@
+import numpy as np
+
+from .indices import BIT_POR_TURNO
+
+
+# =========================
+# MATRIZ DIA × TURNO × OPERADOR
+# =========================
+class MatrizElegibilidade:
+    """
+    Quem pode assumir cada turno de cada dia, calculado uma vez por
+    semana a partir dos índices de disponibilidade e de cursos.
+
+    matriz[d, t, i] → operador i está disponível no dia d e tem o
+    curso do turno t. Não considera quem já foi usado no dia (isso
+    muda durante a seleção e fica com quem chama).
+    """
+
+    def __init__(self, datas, turnos, ids, matriz):
+        self.datas = {data: d for d, data in enumerate(datas)}
+        self.turnos = {codigo: t for t, codigo in enumerate(turnos)}
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.posicao = {int(u): i for i, u in enumerate(self.ids)}
+        self.matriz = matriz
+
+    @classmethod
+    def montar(cls, datas, turnos, operadores, disponibilidade, capacidades):
+        # dia fora do índice → fica fora da matriz (quem chama cai no caminho normal)
+        datas = [data for data in datas if disponibilidade.cobre(data)]
+        turnos = list(turnos)
+        ids = np.array([op.id for op in operadores], dtype=np.int64)
+
+        # disponível por dia (D × N)
+        disponivel = np.ones((len(datas), len(ids)), dtype=bool)
+        for d, data in enumerate(datas):
+            ausentes = disponibilidade.ausentes_por_dia.get(data, ())
+            if ausentes:
+                disponivel[d] = ~np.isin(ids, list(ausentes))
+
+        # curso por turno (T × N)
+        mascaras = np.array(
+            [capacidades.mascaras.get(int(u), 0) for u in ids],
+            dtype=np.int64,
+        )
+        curso = np.ones((len(turnos), len(ids)), dtype=bool)
+        for t, codigo in enumerate(turnos):
+            if codigo in BIT_POR_TURNO:
+                curso[t] = (mascaras & BIT_POR_TURNO[codigo]) != 0
+
+        return cls(datas, turnos, ids, disponivel[:, None, :] & curso[None, :, :])
+
+    def cobre(self, data, turno_codigo):
+        return data in self.datas and turno_codigo in self.turnos
+
+    def conhece(self, usuario_id):
+        return usuario_id in self.posicao
+
+    def linha(self, data, turno_codigo):
+        """
+        Vetor booleano na ordem de `ids`.
+        """
+        return self.matriz[self.datas[data], self.turnos[turno_codigo]]
+
+    def elegivel(self, usuario_id, data, turno_codigo):
+        return bool(self.linha(data, turno_codigo)[self.posicao[usuario_id]])
@@ -1,8 +1,15 @@
 from django.utils import timezone
 from datetime import timedelta
-from escalas.models import AlocacaoEscala
-from django.db.models import Count, Q
-from .utils import usuario_disponivel, pode_assumir_turno
+from escalas.models import ContadorFairness
+from django.db.models import Sum
+from .utils import (
+    usuario_disponivel,
+    pode_assumir_turno,
+    tem_curso_manutencao,
+    turno_tem_habilitado,
+)
+from collections import deque
+import heapq
 import random
 
 
@@ -10,26 +17,29 @@ import random
 # STATS BASE (histórico)
 # =========================
 def calcular_stats(secao, dias=60):
+    """
+    Lê os contadores materializados (ContadorFairness) das semanas
+    dentro da janela. O custo depende da janela, não do histórico.
+    """
     inicio = timezone.now().date() - timedelta(days=dias)
 
-    alocacoes = (
-        AlocacaoEscala.objects
+    contadores = (
+        ContadorFairness.objects
         .filter(
-            turno__dia__escala__secao=secao,
-            turno__dia__data__gte=inicio,
-            tipo="TIT"
+            secao=secao,
+            semana__gte=inicio - timedelta(days=inicio.weekday()),
         )
         .values("usuario")
         .annotate(
-            total=Count("id"),
-            preta=Count("id", filter=Q(turno__dia__tipo_dia="PRETA")),
-            amarela=Count("id", filter=Q(turno__dia__tipo_dia="AMARELA")),
+            total=Sum("total"),
+            preta=Sum("preta"),
+            amarela=Sum("amarela"),
         )
     )
 
     stats = {}
 
-    for item in alocacoes:
+    for item in contadores:
         stats[item["usuario"]] = {
             "total": item["total"],
             "preta": item["preta"],
@@ -42,7 +52,15 @@ def calcular_stats(secao, dias=60):
 # =========================
 # SCORE (estável e previsível)
 # =========================
-def score_usuario(stats, usuario_id, turno, min_total, min_preta, min_amarela):
+def score_usuario(
+    stats,
+    usuario_id,
+    turno,
+    min_total,
+    min_preta,
+    min_amarela,
+    rng=random
+):
     dados = stats.get(usuario_id, {"total": 0, "preta": 0, "amarela": 0})
 
     total = dados["total"]
@@ -70,15 +88,224 @@ def score_usuario(stats, usuario_id, turno, min_total, min_preta, min_amarela):
     # =========================
     # 🎲 Ruído mínimo (desempate leve)
     # =========================
-    score += random.uniform(0, 0.1)
+    score += rng.uniform(0, 0.1)
 
     return score
 
 
+def registrar_escolha(stats, usuario_id, turno):
+    stats.setdefault(usuario_id, {"total": 0, "preta": 0, "amarela": 0})
+
+    stats[usuario_id]["total"] += 1
+
+    if turno.dia.tipo_dia == "PRETA":
+        stats[usuario_id]["preta"] += 1
+
+    elif turno.dia.tipo_dia == "AMARELA":
+        stats[usuario_id]["amarela"] += 1
+
+
+# =========================
+# FILA DE PRIORIDADE (heap)
+# =========================
+class FilaFair:
+    """
+    Mesma ordem do score_usuario, mantida em heap.
+
+    Os mínimos do score são iguais para todos os candidatos, então a
+    ordem depende só de total*10 + preta*4 + amarela*peso. Como o peso
+    da amarela muda na sexta, há um heap por peso.
+
+    Remoção preguiçosa: ao escolher alguém, a chave dele é atualizada
+    com uma nova versão e as entradas antigas são ignoradas no pop.
+    Cada escolha custa O(log n) mais os candidatos inelegíveis pulados.
+    """
+
+    PESOS_AMARELA = (1, 3)
+
+    def __init__(self, operadores, stats, rng=random):
+        self.operadores = {op.id: op for op in operadores}
+        self.stats = stats
+        self.rng = rng
+        self.versoes = {}
+        self.heaps = {peso: [] for peso in self.PESOS_AMARELA}
+
+        for usuario_id in self.operadores:
+            self._empurrar(usuario_id)
+
+    def __len__(self):
+        return len(self.operadores)
+
+    def __iter__(self):
+        return iter(self.operadores.values())
+
+    def _chave(self, usuario_id, peso_amarela):
+        dados = self.stats.get(usuario_id, {"total": 0, "preta": 0, "amarela": 0})
+
+        return (
+            dados["total"] * 10 +
+            dados["preta"] * 4 +
+            dados["amarela"] * peso_amarela
+        )
+
+    def _empurrar(self, usuario_id):
+        versao = self.versoes.get(usuario_id, 0) + 1
+        self.versoes[usuario_id] = versao
+
+        # 🎲 mesmo ruído de desempate do score_usuario
+        ruido = self.rng.uniform(0, 0.1)
+
+        for peso, heap in self.heaps.items():
+            heapq.heappush(
+                heap,
+                (self._chave(usuario_id, peso) + ruido, usuario_id, versao),
+            )
+
+            # entradas velhas demais → reconstrói
+            if len(heap) > 4 * len(self.operadores):
+                self._compactar(heap)
+
+    def _compactar(self, heap):
+        heap[:] = [e for e in heap if self.versoes[e[1]] == e[2]]
+        heapq.heapify(heap)
+
+    def puxar(
+        self,
+        data,
+        turno,
+        usados_no_dia,
+        disponibilidade=None,
+        capacidades=None,
+        elegibilidade=None
+    ):
+        peso = 3 if turno.dia.tipo_dia == "AMARELA" else 1
+        heap = self.heaps[peso]
+
+        # Regra NOT (garantir habilitado)
+        exigir_habilitado = (
+            turno.turno == "NOT"
+            and not turno_tem_habilitado(turno, capacidades)
+        )
+
+        pulados = []
+        escolhido = None
+        primeiro_valido = None
+
+        while heap:
+            entrada = heapq.heappop(heap)
+            _, usuario_id, versao = entrada
+
+            if self.versoes[usuario_id] != versao:
+                continue  # entrada obsoleta
+
+            op = self.operadores[usuario_id]
+
+            if not candidato_valido(
+                op, data, turno, usados_no_dia,
+                disponibilidade, capacidades, elegibilidade
+            ):
+                pulados.append(entrada)
+                continue
+
+            if not exigir_habilitado or tem_curso_manutencao(op, capacidades):
+                escolhido = op
+                break
+
+            pulados.append(entrada)
+
+            if primeiro_valido is None:
+                primeiro_valido = op
+
+        # devolve os pulados (a entrada do escolhido fica obsoleta abaixo)
+        for entrada in pulados:
+            heapq.heappush(heap, entrada)
+
+        escolhido = escolhido or primeiro_valido
+
+        if escolhido is None:
+            return None
+
+        # 🔥 UPDATE INCREMENTAL → nova chave, entradas antigas ficam obsoletas
+        registrar_escolha(self.stats, escolhido.id, turno)
+        self._empurrar(escolhido.id)
+
+        return escolhido
+
+
+MOTORES_FILA = ("HEAP", "NUMPY", "ESCALAR")
+
+
+def criar_fila(operadores, stats, motor="HEAP", stats_semana=None, rng=random):
+    """
+    HEAP: FilaFair (padrão)
+    NUMPY: PlacarVetorizado (lotes grandes / simulações)
+    ESCALAR: deque original (o rng vai em cada puxar_da_fila_*)
+    """
+    if motor == "NUMPY":
+        from .vetorizado import PlacarVetorizado
+        return PlacarVetorizado(operadores, stats, stats_semana, rng=rng)
+
+    if motor == "ESCALAR":
+        return deque(operadores)
+
+    return FilaFair(operadores, stats, rng=rng)
+
+
+# =========================
+# RNG DA GERAÇÃO
+# =========================
+def nova_seed():
+    """
+    Seed do desempate de uma geração (gravada em Escala.seed).
+    random.Random(seed) + mesmos dados → mesmas escolhas.
+    """
+    return random.SystemRandom().randrange(2 ** 31)
+
+
+def candidato_valido(
+    op,
+    data,
+    turno,
+    usados_no_dia,
+    disponibilidade,
+    capacidades,
+    elegibilidade=None
+):
+    if op.id in usados_no_dia:
+        return False
+
+    # 🔥 matriz pré-calculada (escala fixa) → sem consulta
+    if (
+        elegibilidade is not None
+        and elegibilidade.cobre(data, turno.turno)
+        and elegibilidade.conhece(op.id)
+    ):
+        return elegibilidade.elegivel(op.id, data, turno.turno)
+
+    if not usuario_disponivel(op, data, disponibilidade):
+        return False
+
+    if turno.turno in ("MAD", "NOT") and not pode_assumir_turno(op, turno.turno, capacidades):
+        return False
+
+    return True
+
+
 # =========================
 # FILA JUSTA (core do sistema)
 # =========================
-def puxar_da_fila_fair(fila, data, turno, usados_no_dia, secao, stats=None):
+def puxar_da_fila_fair(
+    fila,
+    data,
+    turno,
+    usados_no_dia,
+    secao,
+    stats=None,
+    disponibilidade=None,
+    capacidades=None,
+    elegibilidade=None,
+    rng=random
+):
     """
     Seleção com fairness real:
     - menor carga histórica
@@ -89,6 +316,16 @@ def puxar_da_fila_fair(fila, data, turno, usados_no_dia, secao, stats=None):
     if not fila:
         return None
 
+    # 🔥 motores em memória (heap / NumPy) decidem sozinhos
+    # (com o rng recebido em criar_fila)
+    if hasattr(fila, "puxar"):
+        return fila.puxar(
+            data, turno, usados_no_dia,
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+            elegibilidade=elegibilidade,
+        )
+
     # =========================
     # Stats base (somente se necessário)
     # =========================
@@ -98,23 +335,13 @@ def puxar_da_fila_fair(fila, data, turno, usados_no_dia, secao, stats=None):
     # =========================
     # Filtrar candidatos válidos
     # =========================
-    candidatos = []
-
-    for op in fila:
-
-        if op.id in usados_no_dia:
-            continue
-
-        if not usuario_disponivel(op, data):
-            continue
-
-        if turno.turno == "MAD" and not pode_assumir_turno(op, "MAD"):
-            continue
-
-        if turno.turno == "NOT" and not pode_assumir_turno(op, "NOT"):
-            continue
-
-        candidatos.append(op)
+    candidatos = [
+        op for op in fila
+        if candidato_valido(
+            op, data, turno, usados_no_dia,
+            disponibilidade, capacidades, elegibilidade
+        )
+    ]
 
     if not candidatos:
         return None
@@ -123,14 +350,12 @@ def puxar_da_fila_fair(fila, data, turno, usados_no_dia, secao, stats=None):
     # Regra NOT (garantir habilitado)
     # =========================
     if turno.turno == "NOT":
-        ja_tem_habilitado = turno.alocacoes.filter(
-            usuario__cursos__codigo="MAN"
-        ).exists()
+        ja_tem_habilitado = turno_tem_habilitado(turno, capacidades)
 
         if not ja_tem_habilitado:
             habilitados = [
                 op for op in candidatos
-                if op.cursos.filter(codigo="MAN").exists()
+                if tem_curso_manutencao(op, capacidades)
             ]
             if habilitados:
                 candidatos = habilitados
@@ -165,7 +390,8 @@ def puxar_da_fila_fair(fila, data, turno, usados_no_dia, secao, stats=None):
             turno,
             min_total,
             min_preta,
-            min_amarela
+            min_amarela,
+            rng=rng
         )
         candidatos_score.append((score, op.id, op))
 
@@ -199,7 +425,11 @@ def puxar_da_fila_fixa(
     usados_no_dia,
     secao,
     stats,
-    stats_semana
+    stats_semana,
+    disponibilidade=None,
+    capacidades=None,
+    elegibilidade=None,
+    rng=random
 ):
     """
     Versão para escala fixa:
@@ -207,23 +437,21 @@ def puxar_da_fila_fixa(
     - fairness semanal (forte)
     """
 
-    candidatos = []
-
-    for op in fila:
-
-        if op.id in usados_no_dia:
-            continue
-
-        if not usuario_disponivel(op, data):
-            continue
-
-        if turno.turno == "MAD" and not pode_assumir_turno(op, "MAD"):
-            continue
-
-        if turno.turno == "NOT" and not pode_assumir_turno(op, "NOT"):
-            continue
+    if hasattr(fila, "puxar_fixa"):
+        return fila.puxar_fixa(
+            data, turno, usados_no_dia,
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+            elegibilidade=elegibilidade,
+        )
 
-        candidatos.append(op)
+    candidatos = [
+        op for op in fila
+        if candidato_valido(
+            op, data, turno, usados_no_dia,
+            disponibilidade, capacidades, elegibilidade
+        )
+    ]
 
     if not candidatos:
         return None
@@ -253,7 +481,8 @@ def puxar_da_fila_fixa(
             turno,
             min_total,
             min_preta,
-            min_amarela
+            min_amarela,
+            rng=rng
         )
 
         # semanal (forte)
@@ -6,6 +6,7 @@ class CriarEscalaForm(forms.Form):
     class TipoEscala(models.TextChoices):
         DINAMICA = "DIN", "⚡ Dinâmica (dia a dia)"
         SEMANAL = "SEM", "📅 Fixa semanal"
+        OTIMA = "OPT", "🎯 Ótima (semana inteira)"
 
     tipo_escala = forms.ChoiceField(
         label="Tipo de Escala",
@@ -46,3 +47,28 @@ class CriarEscalaForm(forms.Form):
             }
         ),
     )
+
+    semanas = forms.IntegerField(
+        label="Quantidade de semanas",
+        min_value=1,
+        max_value=26,
+        initial=1,
+        required=False,
+        help_text="Gera semanas consecutivas de uma vez (ex.: 4 = um mês).",
+        widget=forms.NumberInput(
+            attrs={
+                "class": "form-control",
+            }
+        ),
+    )
+
+    refinar = forms.BooleanField(
+        label="Refinar com busca local",
+        required=False,
+        help_text="Depois de gerar, troca titulares para equilibrar a carga (não se aplica à fixa semanal).",
+        widget=forms.CheckboxInput(
+            attrs={
+                "class": "form-check-input",
+            }
+        ),
+    )
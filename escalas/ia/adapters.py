@@ -1,44 +1,120 @@
 from collections import defaultdict
+from datetime import date, timedelta
+
+from django.db.models import Count, F, Max, Q, Sum
+
 from escalas.models import AlocacaoEscala
 from .domain import UsuarioEscala, Plantao
 
 
-def carregar_historico_secao(secao):
+# histórico lido por sugerir_operador
+JANELA_HISTORICO_DIAS = 365
+
+CHUNK_HISTORICO = 2000
+
+# secao_id → (versão das alocações, usuários); ver _versao_historico
+_historico_por_secao = {}
+
+
+def _alocacoes_secao(secao, desde):
+    alocacoes = AlocacaoEscala.objects.filter(
+        usuario__secao=secao,
+        usuario__is_active=True,
+    )
+
+    if desde is not None:
+        alocacoes = alocacoes.filter(turno__dia__data__gte=desde)
+
+    return alocacoes
+
+
+def _versao_historico(alocacoes, desde):
     """
-    Retorna lista de UsuarioEscala com histórico completo.
+    Muda quando entra, sai, é acionada ou troca de usuário uma
+    alocação da janela. Uma query agregada, sem ler as linhas.
+
+    `donos` = Σ id × usuario_id: uma permuta (usuários trocados
+    entre duas alocações) ou um reparo mudam a soma; Σ usuario_id
+    sozinho não veria a troca.
     """
+    versao = alocacoes.aggregate(
+        total=Count("id"),
+        ultima=Max("id"),
+        acionadas=Count("id", filter=Q(foi_acionado=True)),
+        donos=Sum(F("id") * F("usuario_id")),
+    )
 
-    alocacoes = (
-        AlocacaoEscala.objects
-        .select_related("usuario", "turno__dia")
-        .filter(usuario__secao=secao, usuario__is_active=True)
+    return (
+        desde,
+        versao["total"],
+        versao["ultima"],
+        versao["acionadas"],
+        versao["donos"],
     )
 
-    mapa = defaultdict(list)
 
-    for a in alocacoes:
-        if not a.usuario:
-            continue
+def carregar_historico_secao(secao, janela_dias=None, hoje=None, memorizar=False):
+    """
+    Retorna lista de UsuarioEscala com o histórico da seção.
 
-        data = a.turno.dia.data
-        turno = a.turno.turno  # MAD, NOT, SOB
+    `janela_dias` limita aos últimos N dias (None = histórico
+    completo). As linhas vêm como tuplas, em blocos de
+    CHUNK_HISTORICO, direto para os Plantao de cada usuário.
+
+    `memorizar=True` reaproveita a última carga da seção (no
+    processo) enquanto as alocações da janela não mudarem (ver
+    _versao_historico).
+    """
+    desde = None
+
+    if janela_dias is not None:
+        desde = (hoje or date.today()) - timedelta(days=janela_dias)
+
+    alocacoes = _alocacoes_secao(secao, desde)
+
+    if memorizar:
+        versao = _versao_historico(alocacoes, desde)
+        memorizado = _historico_por_secao.get(secao.id)
+
+        if memorizado and memorizado[0] == versao:
+            return memorizado[1]
+
+    linhas = (
+        alocacoes
+        .order_by("usuario_id", "turno__dia__data")
+        .values_list(
+            "usuario_id",
+            "usuario__username",
+            "usuario__first_name",
+            "usuario__last_name",
+            "turno__dia__data",
+            "turno__turno",  # MAD, NOT, SOB
+            "foi_acionado",
+        )
+        .iterator(chunk_size=CHUNK_HISTORICO)
+    )
+
+    nomes = {}
+    mapa = defaultdict(list)
+
+    for user_id, username, first_name, last_name, data, turno, acionado in linhas:
+        if user_id not in nomes:
+            nomes[user_id] = f"{first_name} {last_name}".strip() or username
 
         # sobreaviso acionado
-        if turno == "SOB" and a.foi_acionado:
+        if turno == "SOB" and acionado:
             tipo = "SOB_ATIVO"
         else:
             tipo = turno
 
-        mapa[a.usuario].append(Plantao(data=data, tipo=tipo))
+        mapa[user_id].append(Plantao(data=data, tipo=tipo))
 
-    usuarios = []
-    for user, plantoes in mapa.items():
-        usuarios.append(
-            UsuarioEscala(
-                user_id=user.id,
-                nome=user.get_full_name() or user.username,
-                plantoes=plantoes,
-            )
-        )
+    usuarios = [
+        UsuarioEscala(user_id=user_id, nome=nomes[user_id], plantoes=plantoes)
+        for user_id, plantoes in mapa.items()
+    ]
+
+    if memorizar:
+        _historico_por_secao[secao.id] = (versao, usuarios)
 
-    return usuarios
\ No newline at end of file
+    return usuarios
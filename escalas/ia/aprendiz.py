@@ -1,30 +1,124 @@
-from escalas.ia.simulador import SimuladorEscala
+"""
+Treino dos pesos de ParametrosIA.
+
+Estratégia evolutiva (μ/μ_w, λ): a cada geração sorteia `populacao`
+candidatos em volta da média, avalia todos em paralelo e move a
+média para a combinação ponderada dos melhores. O passo (sigma)
+cresce quando a geração bate o melhor global e encolhe quando não.
+
+Os workers recebem o mesmo CenarioSimulacao (imutável) uma vez, no
+initializer; cada avaliação é só NumPy. Este módulo não importa
+Django no topo (workers `spawn`).
+"""
+import multiprocessing
+import time
+from contextlib import ExitStack
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import numpy as np
+
 from escalas.ia.autoajuste import ParametrosIA, avaliar_injustica
+from escalas.ia.vetorizado import CenarioSimulacao, simular
+
+
+CAMPOS = ("peso_pontos", "peso_amarelas", "peso_sobreaviso")
+
+AUMENTO_SIGMA = 1.2
+REDUCAO_SIGMA = 0.85
+
+
+# =========================
+# WORKERS
+# =========================
+_cenario = None
+
+
+def _iniciar_worker(cenario):
+    global _cenario
+    _cenario = cenario
+
+
+def _parametros(vetor):
+    return ParametrosIA(**dict(zip(CAMPOS, map(float, vetor))))
+
+
+def _avaliar(vetor, semanas, cenario=None):
+    resultado = simular(cenario or _cenario, _parametros(vetor), semanas)
+    return avaliar_injustica(resultado)
+
+
+# =========================
+# TREINO
+# =========================
+def treinar_ia(
+    secao,
+    geracoes=30,
+    semanas=100,
+    populacao=8,
+    processos=None,
+    sigma=0.2,
+    seed=None,
+    ao_terminar_geracao=None
+):
+    """
+    Retorna (melhor ParametrosIA, histórico da melhor injustiça
+    de cada geração).
+
+    `processos` = 1 avalia no próprio processo; None usa todos os
+    núcleos. `ao_terminar_geracao(g, injustica, melhor, segundos)`
+    recebe o relatório de cada geração.
+    """
+    rng = np.random.default_rng(seed)
+
+    # 🔥 banco lido uma vez; o resto é NumPy
+    cenario = CenarioSimulacao.carregar(secao, semanas)
+
+    media = np.array([getattr(ParametrosIA(), c) for c in CAMPOS])
+
+    mu = max(populacao // 2, 1)
+    pesos = np.log(mu + 0.5) - np.log(np.arange(1, mu + 1))
+    pesos /= pesos.sum()
 
-def treinar_ia(secao, geracoes=30, semanas=100):
     melhor = ParametrosIA()
     melhor_score = 999
 
     historico = []
 
-    for g in range(geracoes):
-        candidato = melhor.mutar()
+    with ExitStack() as pilha:
+        if processos == 1:
+            avaliar = partial(map, partial(_avaliar, semanas=semanas, cenario=cenario))
+        else:
+            pool = pilha.enter_context(
+                ProcessPoolExecutor(
+                    max_workers=processos,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_iniciar_worker,
+                    initargs=(cenario,),
+                )
+            )
+            avaliar = partial(pool.map, partial(_avaliar, semanas=semanas))
+
+        for g in range(geracoes):
+            inicio = time.perf_counter()
 
-        sim = SimuladorEscala(secao, params=candidato)
-        resultado = sim.rodar(semanas)
+            amostras = media + sigma * rng.standard_normal((populacao, len(CAMPOS)))
+            scores = np.fromiter(avaliar(amostras), dtype=np.float64, count=populacao)
 
-        score = avaliar_injustica(resultado)
-        historico.append(score)
+            ordem = np.argsort(scores, kind="stable")
+            media = pesos @ amostras[ordem[:mu]]
 
-        print(f"Geração {g} → injustiça {score:.5f}")
+            score = float(scores[ordem[0]])
+            historico.append(score)
 
-        if score < melhor_score:
-            melhor = candidato
-            melhor_score = score
-            print("⭐ NOVO MELHOR!")
+            if score < melhor_score:
+                melhor = _parametros(amostras[ordem[0]])
+                melhor_score = score
+                sigma *= AUMENTO_SIGMA
+            else:
+                sigma *= REDUCAO_SIGMA
 
-    print("\n🏆 MELHOR CONFIG:")
-    print(melhor)
-    print(f"Injustiça final: {melhor_score:.5f}")
+            if ao_terminar_geracao:
+                ao_terminar_geracao(g, score, melhor_score, time.perf_counter() - inicio)
 
-    return melhor, historico
\ No newline at end of file
+    return melhor, historico
@@ -1,14 +1,25 @@
+import time
 from collections import deque
 from accounts.models import User
-from django.db.models import Sum, Count, Q, F, FloatField, ExpressionWrapper
-from escalas.ia.simulador import OperadorIA
+from django.db.models import (
+    Sum, Count, F, Value, FloatField, ExpressionWrapper, OuterRef, Subquery
+)
+from django.db.models.functions import Coalesce
 from escalas.ia.autoajuste import ParametrosIA
+from escalas.models import AlocacaoEscala, ParametrosIASecao
+from pontuacao.models import Pontuacao
 from django.conf import settings
 
-def carregar_parametros_ia():
-    """
-    Carrega IA treinada do settings ou fallback padrão
-    """
+# Cache do processo: secao_id → (expira_em, ParametrosIA).
+# save/delete só limpam o processo que gravou (treinar_ia --salvar
+# roda em outro); os workers web veem os pesos novos em até
+# TTL_PARAMETROS_IA segundos, sem restart.
+TTL_PARAMETROS_IA = 60
+
+_parametros_por_secao = {}
+
+
+def _parametros_do_settings():
     data = getattr(settings, "ESCALA_IA_PARAMS", None)
 
     if not data:
@@ -16,38 +27,102 @@ def carregar_parametros_ia():
 
     return ParametrosIA(**data)
 
-def fila_operadores_com_ia(secao):
-    params = carregar_parametros_ia()
 
-    users = User.objects.filter(secao=secao, papel="OPE")
+def carregar_parametros_ia(secao=None):
+    """
+    Carrega IA treinada da seção (ParametrosIASecao), senão do
+    settings, senão fallback padrão.
 
-    operadores = []
+    No máximo uma query por seção e processo a cada
+    TTL_PARAMETROS_IA segundos; o save/delete do modelo descarta a
+    entrada na hora (no processo que gravou).
+    """
+    if secao is None:
+        return _parametros_do_settings()
 
-    for u in users:
-        op = OperadorIA(u)
+    agora = time.monotonic()
+    expira_em, params = _parametros_por_secao.get(secao.id, (0, None))
 
-        # puxar stats reais
-        stats = u.pontuacoes.aggregate(
-            pontos=Sum("pontos"),
-            amarelas=Count("id", filter=Q(tipo="AMARELA")),
-        )
+    if params is None or agora >= expira_em:
+        salvo = ParametrosIASecao.objects.filter(secao_id=secao.id).first()
 
-        op.pontos = stats["pontos"] or 0
-        op.amarelas = stats["amarelas"] or 0
+        params = salvo.como_parametros() if salvo else _parametros_do_settings()
+        _parametros_por_secao[secao.id] = (agora + TTL_PARAMETROS_IA, params)
 
-        operadores.append(op)
+    return params
 
-    # ordenar com IA
-    operadores.sort(
-        key=lambda op: (
-            op.pontos * params.peso_pontos +
-            op.amarelas * params.peso_amarelas +
-            op.sobreavisos * params.peso_sobreaviso
-        )
+
+def invalidar_parametros_ia(secao_id=None):
+    """
+    Descarta o cache de uma seção (ou de todas).
+    """
+    if secao_id is None:
+        _parametros_por_secao.clear()
+    else:
+        _parametros_por_secao.pop(secao_id, None)
+
+
+def salvar_parametros_ia(secao, params, injustica=None, geracoes=0):
+    salvo, _ = ParametrosIASecao.objects.update_or_create(
+        secao=secao,
+        defaults={
+            "peso_pontos": params.peso_pontos,
+            "peso_amarelas": params.peso_amarelas,
+            "peso_sobreaviso": params.peso_sobreaviso,
+            "injustica": injustica,
+            "geracoes": geracoes,
+        },
     )
 
-    # converter para Users novamente
-    ordered_ids = [op.id for op in operadores]
-    mapa = {u.id: u for u in users}
+    return salvo
+
+
+def _total_por_usuario(queryset, agregado):
+    """
+    Subquery escalar (um valor por usuário) para anotar em User.
+    """
+    return Coalesce(
+        Subquery(
+            queryset
+            .filter(usuario=OuterRef("pk"))
+            .values("usuario")
+            .annotate(total=agregado)
+            .values("total")
+        ),
+        0,
+    )
+
+
+def fila_operadores_com_ia(secao):
+    """
+    Operadores da seção do menor para o maior score da IA, numa
+    query só: pontos, amarelas e sobreavisos são subqueries por
+    usuário e o score com os pesos é calculado e ordenado no banco.
+    """
+    params = carregar_parametros_ia(secao)
+
+    users = (
+        User.objects
+        .filter(secao=secao, papel="OPE")
+        .annotate(
+            pontos_ia=_total_por_usuario(Pontuacao.objects, Sum("pontos")),
+            amarelas_ia=_total_por_usuario(
+                Pontuacao.objects.filter(tipo="AMARELA"), Count("id")
+            ),
+            sobreavisos_ia=_total_por_usuario(
+                AlocacaoEscala.objects.filter(tipo="SOB"), Count("id")
+            ),
+        )
+        .annotate(
+            score_ia=ExpressionWrapper(
+                F("pontos_ia") * Value(params.peso_pontos) +
+                F("amarelas_ia") * Value(params.peso_amarelas) +
+                F("sobreavisos_ia") * Value(params.peso_sobreaviso),
+                output_field=FloatField(),
+            )
+        )
+        # empate → ordem de cadastro
+        .order_by("score_ia", "id")
+    )
 
-    return deque([mapa[i] for i in ordered_ids])
\ No newline at end of file
+    return deque(users)
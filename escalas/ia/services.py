@@ -1,4 +1,4 @@
-from .adapters import carregar_historico_secao
+from .adapters import carregar_historico_secao, JANELA_HISTORICO_DIAS
 from .engine import MotorEscalaIA
 from indisponibilidades.models import Indisponibilidade
 
@@ -27,7 +27,9 @@ def filtrar_indisponiveis(usuarios, data_turno):
     return [u for u in usuarios if u.user_id not in indisponiveis_ids]
 
 def sugerir_operador(secao, data_turno, debug=False):
-    usuarios = carregar_historico_secao(secao)
+    usuarios = carregar_historico_secao(
+        secao, janela_dias=JANELA_HISTORICO_DIAS, memorizar=True
+    )
 
     if not usuarios:
         return None
@@ -2,7 +2,6 @@
 
 from collections import defaultdict
 from datetime import timedelta
-from accounts.models import User
 from indisponibilidades.models import Indisponibilidade
 from escalas.ia.autoajuste import ParametrosIA
 import random
@@ -18,10 +17,15 @@ def indisponivel(user_id, data):
         ).exists()
 
 class OperadorIA:
-    def __init__(self, user):
+    def __init__(self, user, cursos=None):
         self.id = user.id
         self.nome = user.username
-        self.cursos = set(user.cursos.values_list("codigo", flat=True))
+
+        # registros do contexto (contexto.Operador) já trazem os cursos
+        if cursos is None:
+            cursos = user.cursos.values_list("codigo", flat=True)
+
+        self.cursos = set(cursos)
 
         self.pontos = 0
         self.amarelas = 0
@@ -42,9 +46,13 @@ class OperadorIA:
         return "PIS" in self.cursos
     
 class SimuladorEscala:
-    def __init__(self, secao, params=None):
-        users = User.objects.filter(secao=secao, papel="OPE")
-        self.ops = [OperadorIA(u) for u in users]
+    def __init__(self, secao, params=None, operadores=None):
+        from escalas.contexto import carregar_operadores
+
+        if operadores is None:
+            operadores = carregar_operadores(secao)
+
+        self.ops = [OperadorIA(op, op.cursos) for op in operadores]
         self.params = params or ParametrosIA()
 
     def score(self, op):
@@ -0,0 +1,156 @@
+"""
+Simulador da IA em NumPy, sem banco depois da carga.
+
+CenarioSimulacao guarda tudo que a simulação lê (operadores, cursos
+e um bitmap de ausências dia × operador) e é imutável: o mesmo
+cenário serve para avaliar qualquer número de ParametrosIA.
+
+`simular` reproduz SimuladorEscala.rodar escolha a escolha: o score
+é o mesmo e o argmin mascarado desempata pela ordem dos operadores,
+como o sorted estável do caminho escalar.
+
+Nada de Django no topo: o cenário é desserializado em workers
+`spawn` (treinar_ia) sem django.setup().
+"""
+from dataclasses import dataclass
+from datetime import date, timedelta
+
+import numpy as np
+
+from escalas.ia.autoajuste import ParametrosIA
+
+
+PONTOS_POR_TIPO = {"PRETA": 1, "AMARELA": 2}
+
+
+@dataclass(frozen=True)
+class CenarioSimulacao:
+    inicio: date
+    nomes: tuple
+    pode: np.ndarray      # (turnos, N) → tem o curso do turno
+    ausente: np.ndarray   # (dias, N) → indisponível no dia
+
+    @property
+    def semanas(self):
+        return len(self.ausente) // 7
+
+    @classmethod
+    def carregar(cls, secao, semanas=100, inicio=None, operadores=None):
+        """
+        Três queries (operadores, cursos, indisponibilidades),
+        qualquer que seja o número de semanas.
+        """
+        from escalas.contexto import carregar_operadores
+        from escalas.indices import IndiceDisponibilidade
+
+        inicio = inicio or date.today()
+        fim = inicio + timedelta(days=7 * semanas - 1)
+
+        if operadores is None:
+            operadores = carregar_operadores(secao)
+
+        disponibilidade = IndiceDisponibilidade.carregar(secao, inicio, fim)
+
+        return cls.montar(operadores, disponibilidade, inicio, semanas)
+
+    @classmethod
+    def montar(cls, operadores, disponibilidade, inicio, semanas):
+        from escalas.indices import BIT_POR_TURNO, CapacidadesOperadores
+        from escalas.ia.simulador import TURNOS
+
+        ids = np.array([op.id for op in operadores], dtype=np.int64)
+
+        capacidades = CapacidadesOperadores.de_operadores(operadores)
+        mascaras = np.array(
+            [capacidades.mascaras[op.id] for op in operadores],
+            dtype=np.int64,
+        )
+
+        pode = np.array(
+            [(mascaras & BIT_POR_TURNO[turno]) != 0 for turno in TURNOS],
+            dtype=bool,
+        ).reshape(len(TURNOS), len(ids))
+
+        ausente = np.zeros((7 * semanas, len(ids)), dtype=bool)
+
+        for data, ausentes in disponibilidade.ausentes_por_dia.items():
+            d = (data - inicio).days
+            if 0 <= d < len(ausente):
+                ausente[d] = np.isin(ids, list(ausentes))
+
+        pode.setflags(write=False)
+        ausente.setflags(write=False)
+
+        return cls(
+            inicio=inicio,
+            nomes=tuple(op.username for op in operadores),
+            pode=pode,
+            ausente=ausente,
+        )
+
+
+def simular(cenario, params=None, semanas=None):
+    """
+    {nome: titularidades} como SimuladorEscala.rodar
+    (só quem foi escolhido ao menos uma vez).
+    """
+    params = params or ParametrosIA()
+    semanas = cenario.semanas if semanas is None else min(semanas, cenario.semanas)
+
+    n = len(cenario.nomes)
+    pontos = np.zeros(n, dtype=np.float64)
+    amarelas = np.zeros(n, dtype=np.float64)
+    sobreavisos = np.zeros(n, dtype=np.float64)
+    contagem = np.zeros(n, dtype=np.int64)
+
+    for d in range(7 * semanas):
+        weekday = (cenario.inicio + timedelta(days=d)).weekday()
+
+        if weekday > 4:
+            continue
+
+        presentes = ~cenario.ausente[d]
+
+        for t in range(len(cenario.pode)):
+            elegiveis = presentes & cenario.pode[t]
+
+            if not elegiveis.any():
+                continue
+
+            score = (
+                pontos * params.peso_pontos +
+                amarelas * params.peso_amarelas +
+                sobreavisos * params.peso_sobreaviso
+            )
+
+            k = np.argmin(np.where(elegiveis, score, np.inf))
+
+            if weekday == 4:
+                pontos[k] += PONTOS_POR_TIPO["AMARELA"]
+                amarelas[k] += 1
+            else:
+                pontos[k] += PONTOS_POR_TIPO["PRETA"]
+
+            contagem[k] += 1
+
+    return {
+        cenario.nomes[i]: int(contagem[i])
+        for i in np.flatnonzero(contagem)
+    }
+
+
+class SimuladorVetorizado:
+    """
+    Mesma interface de SimuladorEscala (rodar), sem query por escolha.
+    """
+
+    def __init__(self, secao, params=None, cenario=None):
+        self.secao = secao
+        self.params = params or ParametrosIA()
+        self.cenario = cenario
+
+    def rodar(self, semanas=100):
+        if self.cenario is None or self.cenario.semanas < semanas:
+            self.cenario = CenarioSimulacao.carregar(self.secao, semanas)
+
+        return simular(self.cenario, self.params, semanas)
@@ -0,0 +1,121 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from accounts.models import Curso, User
+from indisponibilidades.models import Indisponibilidade
+
+
+# =========================
+# DISPONIBILIDADE (janela da geração)
+# =========================
+class IndiceDisponibilidade:
+    """
+    Indisponibilidades de uma seção carregadas uma única vez para a
+    janela de datas da geração.
+
+    Guarda, por dia, o conjunto de usuários ausentes. Cada consulta
+    depois disso é feita em memória.
+    """
+
+    def __init__(self, inicio, fim, ausentes_por_dia=None):
+        self.inicio = inicio
+        self.fim = fim
+        self.ausentes_por_dia = ausentes_por_dia or {}
+
+    @classmethod
+    def carregar(cls, secao, inicio, fim):
+        registros = (
+            Indisponibilidade.objects
+            .filter(
+                usuario__secao=secao,
+                data_inicio__lte=fim,
+                data_fim__gte=inicio,
+            )
+            .values_list("usuario_id", "data_inicio", "data_fim")
+        )
+
+        ausentes = defaultdict(set)
+
+        for usuario_id, data_inicio, data_fim in registros:
+            dia = max(data_inicio, inicio)
+            ultimo = min(data_fim, fim)
+
+            while dia <= ultimo:
+                ausentes[dia].add(usuario_id)
+                dia += timedelta(days=1)
+
+        return cls(inicio, fim, dict(ausentes))
+
+    def cobre(self, data):
+        return self.inicio <= data <= self.fim
+
+    def disponivel(self, usuario_id, data):
+        return usuario_id not in self.ausentes_por_dia.get(data, ())
+
+
+# =========================
+# CURSOS (bitmask por operador)
+# =========================
+CAP_PISTA = 1
+CAP_MANUTENCAO = 2
+
+BIT_POR_CURSO = {
+    Curso.PISTA: CAP_PISTA,
+    Curso.MANUTENCAO: CAP_MANUTENCAO,
+}
+
+# curso exigido por turno
+BIT_POR_TURNO = {
+    "MAD": CAP_PISTA,
+    "NOT": CAP_MANUTENCAO,
+}
+
+
+class CapacidadesOperadores:
+    """
+    Cursos de cada operador reduzidos a um int (PIS/MAN),
+    carregados uma vez no início da geração.
+    """
+
+    def __init__(self, mascaras=None):
+        self.mascaras = mascaras or {}
+
+    @classmethod
+    def carregar(cls, usuario_ids):
+        usuario_ids = list(usuario_ids)
+        mascaras = dict.fromkeys(usuario_ids, 0)
+
+        cursos = (
+            User.cursos.through.objects
+            .filter(user_id__in=usuario_ids)
+            .values_list("user_id", "cursooperacional__codigo")
+        )
+
+        for usuario_id, codigo in cursos:
+            mascaras[usuario_id] |= BIT_POR_CURSO.get(codigo, 0)
+
+        return cls(mascaras)
+
+    @classmethod
+    def de_operadores(cls, operadores):
+        """
+        A partir de registros que já trazem `cursos` (contexto.Operador).
+        """
+        return cls({
+            op.id: sum(BIT_POR_CURSO.get(codigo, 0) for codigo in set(op.cursos))
+            for op in operadores
+        })
+
+    def conhece(self, usuario_id):
+        return usuario_id in self.mascaras
+
+    def pode_assumir(self, usuario_id, turno_codigo):
+        bit = BIT_POR_TURNO.get(turno_codigo)
+
+        if bit is None:
+            return False
+
+        return bool(self.mascaras.get(usuario_id, 0) & bit)
+
+    def habilitado(self, usuario_id):
+        return bool(self.mascaras.get(usuario_id, 0) & CAP_MANUTENCAO)
@@ -0,0 +1,212 @@
+"""
+Instrumentação de queries dos serviços de escala.
+
+`medir_queries` (context manager) e `instrumentado` (decorator)
+capturam, por chamada: número de queries, tempo total de SQL,
+queries repetidas (fingerprint) e tempo de parede.
+
+Cada medição vira uma linha de log estruturada (JSON) no logger
+"escalas.instrumentacao" e é comparada com o orçamento do serviço.
+Estourar o orçamento loga um aviso; com ESCALA_ORCAMENTO_ESTRITO
+levanta OrcamentoExcedido.
+
+O modo estrito é só para testes: a checagem roda depois que o
+serviço terminou (e o @transaction.atomic dele já fez COMMIT),
+então a exceção não desfaz nada do que foi gravado. Chamadas que
+falham também são medidas e publicadas (campo "erro"), sem que o
+orçamento troque a exceção original.
+"""
+import functools
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger("escalas.instrumentacao")
+
+
+# =========================
+# ORÇAMENTOS (máximo de queries por chamada)
+# =========================
+# A geração carrega tudo em lote → número fixo, independe do
+# tamanho da seção. Um N+1 no loop de fairness estoura na hora.
+ORCAMENTOS = {
+    "gerar_escala_semanal": 20,
+    "gerar_escala_semanal_fixa": 0,
+    "gerar_escalas_periodo": 20,
+    "confirmar_previa": 20,
+    "encerrar_escala": 30,
+    "criar_sobreaviso_service": 12,
+    "criar_sobreavisos_periodo": 12,
+    "executar_permuta_direta": 20,
+    "executar_pedido_permuta": 20,
+    "planejar_reparo": 12,
+    "aplicar_reparo": 15,
+}
+
+
+class OrcamentoExcedido(AssertionError):
+    pass
+
+
+def orcamento_de(nome):
+    orcamentos = {**ORCAMENTOS, **getattr(settings, "ESCALA_ORCAMENTOS_QUERIES", {})}
+    return orcamentos.get(nome)
+
+
+# =========================
+# MEDIÇÃO
+# =========================
+# lista de medições da requisição atual (ResumoQueriesMiddleware)
+_medicoes_requisicao = ContextVar("medicoes_requisicao", default=None)
+
+_LISTA_IN = re.compile(r"\((?:\s*%s\s*,)*\s*%s\s*\)")
+_ESPACOS = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """
+    SQL sem parâmetros e com listas IN colapsadas:
+    a mesma query com outros valores tem o mesmo fingerprint.
+    """
+    return _ESPACOS.sub(" ", _LISTA_IN.sub("(...)", sql)).strip()
+
+
+@dataclass
+class Medicao:
+    servico: str
+    queries: int = 0
+    sql_segundos: float = 0.0
+    segundos: float = 0.0
+    erro: str | None = None
+    fingerprints: Counter = field(default_factory=Counter, repr=False)
+
+    def registrar(self, sql, segundos):
+        self.queries += 1
+        self.sql_segundos += segundos
+        self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def duplicadas(self):
+        return {
+            sql: n for sql, n in self.fingerprints.most_common()
+            if n > 1
+        }
+
+    @property
+    def orcamento(self):
+        return orcamento_de(self.servico)
+
+    @property
+    def excedeu(self):
+        return self.orcamento is not None and self.queries > self.orcamento
+
+    def como_dict(self):
+        return {
+            "servico": self.servico,
+            "queries": self.queries,
+            "sql_ms": round(self.sql_segundos * 1000, 2),
+            "wall_ms": round(self.segundos * 1000, 2),
+            "orcamento": self.orcamento,
+            "duplicadas": self.duplicadas,
+            "erro": self.erro,
+        }
+
+
+class _Coletor:
+    """
+    execute_wrapper: vê toda query da conexão, com ou sem DEBUG.
+    """
+
+    def __init__(self, medicao):
+        self.medicao = medicao
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.medicao.registrar(sql, time.perf_counter() - inicio)
+
+
+@contextmanager
+def medir_queries(servico):
+    """
+    with medir_queries("encerrar_escala") as m:
+        ...
+    m.queries, m.sql_segundos, m.duplicadas, m.segundos
+    """
+    medicao = Medicao(servico)
+    inicio = time.perf_counter()
+
+    try:
+        with connection.execute_wrapper(_Coletor(medicao)):
+            yield medicao
+    except BaseException as e:
+        medicao.erro = type(e).__name__
+        raise
+    finally:
+        medicao.segundos = time.perf_counter() - inicio
+        # falhou → publica, mas não troca a exceção original
+        _publicar(medicao, estrito=medicao.erro is None)
+
+
+def instrumentado(servico):
+    """
+    Decorator de medir_queries. Vai acima de @transaction.atomic
+    para incluir o COMMIT na medição.
+    """
+
+    def decorador(funcao):
+        @functools.wraps(funcao)
+        def wrapper(*args, **kwargs):
+            with medir_queries(servico):
+                return funcao(*args, **kwargs)
+
+        return wrapper
+
+    return decorador
+
+
+def _publicar(medicao, estrito=True):
+    dados = medicao.como_dict()
+    linha = json.dumps(dados, ensure_ascii=False)
+
+    requisicao = _medicoes_requisicao.get()
+    if requisicao is not None:
+        requisicao.append(medicao)
+
+    if not medicao.excedeu:
+        logger.info(linha, extra={"medicao": dados})
+        return
+
+    logger.warning(linha, extra={"medicao": dados})
+
+    # só testes: o que o serviço gravou já foi commitado
+    if estrito and getattr(settings, "ESCALA_ORCAMENTO_ESTRITO", False):
+        raise OrcamentoExcedido(
+            f"{medicao.servico}: {medicao.queries} queries "
+            f"(orçamento {medicao.orcamento}). Repetidas: {medicao.duplicadas}"
+        )
+
+
+# =========================
+# RESUMO POR REQUISIÇÃO
+# =========================
+@contextmanager
+def coletar_requisicao():
+    medicoes = []
+    token = _medicoes_requisicao.set(medicoes)
+
+    try:
+        yield medicoes
+    finally:
+        _medicoes_requisicao.reset(token)
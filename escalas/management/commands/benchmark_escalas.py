@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from escalas.benchmark import (
+    TAMANHOS_PADRAO,
+    TOLERANCIA_PADRAO,
+    CAMINHO_BASELINE,
+    rodar_benchmarks,
+    carregar_baseline,
+    salvar_baseline,
+    comparar,
+)
+
+
+class Command(BaseCommand):
+    help = "Mede geração, encerramento e sobreaviso em seções sintéticas e compara com a baseline."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--tamanhos", type=int, nargs="+", default=list(TAMANHOS_PADRAO))
+        parser.add_argument("--pista", type=float, default=0.6, help="fração de operadores com curso de pista")
+        parser.add_argument("--manutencao", type=float, default=0.7, help="fração de operadores com curso de manutenção")
+        parser.add_argument("--indisponibilidade", type=float, default=0.05, help="fração de operador×dia ausente")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--baseline", default=str(CAMINHO_BASELINE))
+        parser.add_argument("--tolerancia", type=float, default=TOLERANCIA_PADRAO)
+        parser.add_argument("--salvar", action="store_true", help="grava o resultado como nova baseline")
+
+    def handle(self, *args, **options):
+        resultados = rodar_benchmarks(
+            tamanhos=options["tamanhos"],
+            seed=options["seed"],
+            proporcao_pista=options["pista"],
+            proporcao_manutencao=options["manutencao"],
+            densidade_indisponibilidade=options["indisponibilidade"],
+        )
+
+        for tamanho, cenarios in resultados.items():
+            self.stdout.write(f"{tamanho} operadores")
+            for nome, m in cenarios.items():
+                self.stdout.write(
+                    f"  {nome:<28} {m['segundos']:>8.3f}s "
+                    f"{m['queries']:>6} queries {m['pico_memoria_kb']:>10.1f} KB"
+                )
+
+        if options["salvar"]:
+            salvar_baseline(resultados, options["baseline"])
+            self.stdout.write(f"Baseline gravada em {options['baseline']}")
+            return
+
+        baseline = carregar_baseline(options["baseline"])
+
+        if baseline is None:
+            self.stdout.write("Sem baseline para comparar (use --salvar).")
+            return
+
+        regressoes = comparar(resultados, baseline, options["tolerancia"])
+
+        for r in regressoes:
+            self.stderr.write(f"✗ {r}")
+
+        if regressoes:
+            raise CommandError(f"{len(regressoes)} regressão(ões) acima da baseline.")
+
+        self.stdout.write("Sem regressões.")
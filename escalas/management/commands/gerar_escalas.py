@@ -0,0 +1,95 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from escalas.paralelo import inicializar_worker, gerar_secao
+from projetos.models import Projeto, Secao
+
+
+class Command(BaseCommand):
+    help = "Gera a escala semanal de todas as seções ativas de um projeto em paralelo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--projeto", required=True, help="id ou nome do projeto")
+        parser.add_argument("--semana", required=True, type=date.fromisoformat, help="segunda-feira (AAAA-MM-DD)")
+        parser.add_argument("--semanas", type=int, default=1)
+        parser.add_argument("--usuario", required=True, help="username de quem cria as escalas")
+        parser.add_argument("--madrugada", type=int, default=0)
+        parser.add_argument("--noturno", type=int, default=2)
+        parser.add_argument("--modo", choices=["DIN", "SEM", "OPT"], default="DIN")
+        parser.add_argument("--processos", type=int, default=os.cpu_count())
+
+    def handle(self, *args, **options):
+        from accounts.models import User
+
+        if options["semana"].weekday() != 0:
+            raise CommandError(f"--semana {options['semana']} não é segunda-feira.")
+
+        projeto = options["projeto"]
+        filtro = {"id": projeto} if projeto.isdigit() else {"nome": projeto}
+
+        try:
+            projeto = Projeto.objects.get(**filtro)
+        except Projeto.DoesNotExist:
+            raise CommandError(f"Projeto {options['projeto']} não encontrado.")
+
+        try:
+            usuario = User.objects.get(username=options["usuario"])
+        except User.DoesNotExist:
+            raise CommandError(f"Usuário {options['usuario']} não encontrado.")
+
+        secoes = list(
+            Secao.objects
+            .filter(projeto=projeto, ativa=True)
+            .values_list("id", flat=True)
+        )
+
+        parametros = (
+            options["semana"],
+            options["semanas"],
+            usuario.id,
+            options["madrugada"],
+            options["noturno"],
+            options["modo"],
+        )
+
+        inicio = time.perf_counter()
+        resultados = []
+
+        if options["processos"] <= 1:
+            resultados = [gerar_secao(s, *parametros) for s in secoes]
+        else:
+            # workers não podem herdar a conexão do processo pai
+            connections.close_all()
+
+            with ProcessPoolExecutor(
+                max_workers=min(options["processos"], len(secoes)) or 1,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=inicializar_worker,
+            ) as pool:
+                futuros = [pool.submit(gerar_secao, s, *parametros) for s in secoes]
+
+                for futuro in as_completed(futuros):
+                    resultados.append(futuro.result())
+
+        falhas = 0
+
+        for r in sorted(resultados, key=lambda r: r["secao"]):
+            if r["erro"]:
+                falhas += 1
+                self.stderr.write(f"✗ {r['secao']}: {r['erro']} ({r['segundos']:.2f}s)")
+            else:
+                self.stdout.write(f"✓ {r['secao']}: {r['escalas']} escala(s) em {r['segundos']:.2f}s")
+
+        self.stdout.write(
+            f"{len(resultados) - falhas}/{len(resultados)} seções geradas "
+            f"em {time.perf_counter() - inicio:.2f}s"
+        )
+
+        if falhas:
+            raise CommandError(f"{falhas} seção(ões) falharam.")
@@ -0,0 +1,68 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from escalas.ia.aprendiz import treinar_ia
+from escalas.ia.runtime import salvar_parametros_ia
+from projetos.models import Secao
+
+
+class Command(BaseCommand):
+    help = "Treina os pesos da IA de escala de uma seção (estratégia evolutiva em paralelo)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--secao", required=True, help="id ou nome da seção")
+        parser.add_argument("--geracoes", type=int, default=30)
+        parser.add_argument("--semanas", type=int, default=100, help="semanas simuladas por avaliação")
+        parser.add_argument("--populacao", type=int, default=8, help="candidatos por geração")
+        parser.add_argument("--processos", type=int, default=os.cpu_count())
+        parser.add_argument("--seed", type=int, default=None)
+        parser.add_argument(
+            "--salvar",
+            action="store_true",
+            help="grava os pesos como os da seção (ParametrosIASecao)",
+        )
+
+    def handle(self, *args, **options):
+        secao = options["secao"]
+        filtro = {"id": secao} if secao.isdigit() else {"nome": secao}
+
+        try:
+            secao = Secao.objects.get(**filtro)
+        except (Secao.DoesNotExist, Secao.MultipleObjectsReturned):
+            raise CommandError(f"Seção {options['secao']} não encontrada.")
+
+        def relatorio(g, injustica, melhor, segundos):
+            self.stdout.write(
+                f"Geração {g:>3} → injustiça {injustica:.5f} "
+                f"(melhor {melhor:.5f}) em {segundos:.3f}s"
+            )
+
+        inicio = time.perf_counter()
+
+        melhor, historico = treinar_ia(
+            secao,
+            geracoes=options["geracoes"],
+            semanas=options["semanas"],
+            populacao=options["populacao"],
+            processos=max(options["processos"], 1),
+            seed=options["seed"],
+            ao_terminar_geracao=relatorio,
+        )
+
+        injustica = min(historico, default=999)
+
+        self.stdout.write(f"\n🏆 {melhor}")
+        self.stdout.write(
+            f"Injustiça final: {injustica:.5f} "
+            f"em {time.perf_counter() - inicio:.2f}s"
+        )
+
+        if options["salvar"]:
+            salvar_parametros_ia(
+                secao, melhor,
+                injustica=injustica,
+                geracoes=options["geracoes"],
+            )
+            self.stdout.write(self.style.SUCCESS(f"Pesos salvos para {secao}."))
@@ -0,0 +1,64 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import TruncWeek
+
+
+def popular_contadores(apps, schema_editor):
+    AlocacaoEscala = apps.get_model("escalas", "AlocacaoEscala")
+    ContadorFairness = apps.get_model("escalas", "ContadorFairness")
+
+    agregados = (
+        AlocacaoEscala.objects
+        .filter(tipo="TIT", usuario__isnull=False)
+        .annotate(semana=TruncWeek("turno__dia__data"))
+        .values("turno__dia__escala__secao", "usuario", "semana")
+        .annotate(
+            total=Count("id"),
+            preta=Count("id", filter=Q(turno__dia__tipo_dia="PRETA")),
+            amarela=Count("id", filter=Q(turno__dia__tipo_dia="AMARELA")),
+        )
+    )
+
+    ContadorFairness.objects.bulk_create([
+        ContadorFairness(
+            secao_id=item["turno__dia__escala__secao"],
+            usuario_id=item["usuario"],
+            semana=item["semana"],
+            total=item["total"],
+            preta=item["preta"],
+            amarela=item["amarela"],
+        )
+        for item in agregados
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('escalas', '0003_alocacaoescala_pisteiro'),
+        ('projetos', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorFairness',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('semana', models.DateField(help_text='Segunda-feira da semana')),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('preta', models.PositiveIntegerField(default=0)),
+                ('amarela', models.PositiveIntegerField(default=0)),
+                ('secao', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_fairness', to='projetos.secao')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='contadores_fairness', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('secao', 'semana', 'usuario'), name='contador_unico_por_semana')],
+            },
+        ),
+        migrations.RunPython(popular_contadores, migrations.RunPython.noop),
+    ]
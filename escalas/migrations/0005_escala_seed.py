@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('escalas', '0004_contadorfairness'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='escala',
+            name='seed',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
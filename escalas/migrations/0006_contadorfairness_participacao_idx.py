@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('escalas', '0005_escala_seed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contadorfairness',
+            index=models.Index(fields=['secao', 'semana'], include=['usuario', 'total'], name='contador_participacao_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('escalas', '0006_contadorfairness_participacao_idx'),
+        ('projetos', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ParametrosIASecao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('peso_pontos', models.FloatField()),
+                ('peso_amarelas', models.FloatField()),
+                ('peso_sobreaviso', models.FloatField()),
+                ('injustica', models.FloatField(blank=True, null=True)),
+                ('geracoes', models.PositiveIntegerField(default=0)),
+                ('treinado_em', models.DateTimeField(auto_now=True)),
+                ('secao', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='parametros_ia', to='projetos.secao')),
+            ],
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 6.0.1 on 2026-10-18 12:00
+
+from django.core.management import call_command
+from django.db import migrations
+
+
+def criar_tabela_cache(apps, schema_editor):
+    # tabela do DatabaseCache "previas" (settings.CACHES)
+    call_command("createcachetable", database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('escalas', '0007_parametrosiasecao'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_tabela_cache, migrations.RunPython.noop),
+    ]
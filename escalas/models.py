@@ -44,6 +44,9 @@ class Escala(models.Model):
         default=Status.RASCUNHO,
     )
 
+    # 🎲 desempate da geração → a semana pode ser regenerada igual
+    seed = models.BigIntegerField(null=True, blank=True)
+
     class Meta:
         constraints = [
             UniqueConstraint(
@@ -192,7 +195,7 @@ class AlocacaoEscala(models.Model):
         return f"{self.usuario} - {self.get_tipo_display()}"
 
     def clean(self):
-        from .utils import pode_assumir_turno
+        from .utils import pode_assumir_turno, tem_curso_manutencao
 
         if not self.usuario:
             return
@@ -204,17 +207,16 @@ class AlocacaoEscala(models.Model):
         # 🔥 Regra especial NOTURNO
         if self.turno.turno == "NOT":
 
-            # verifica se já existe habilitado no turno
+            # este já é habilitado → turno coberto
+            if tem_curso_manutencao(self.usuario):
+                return
+
+            # senão, precisa existir outro habilitado no turno
             ja_tem_habilitado = self.turno.alocacoes.filter(
-                usuario__tem_curso_manutencao=True
+                usuario__cursos__codigo="MAN"
             ).exclude(id=self.id).exists()
 
-            # se já tem um habilitado → qualquer um pode entrar
-            if ja_tem_habilitado:
-                return
-
-            # se ainda não tem → este precisa ser habilitado
-            if not self.usuario.tem_curso_manutencao:
+            if not ja_tem_habilitado:
                 raise ValidationError(
                     "Turno noturno precisa ter pelo menos um operador com curso."
                 )
@@ -224,4 +226,100 @@ class AlocacaoEscala(models.Model):
             if not pode_assumir_turno(self.usuario, "MAD"):
                 raise ValidationError(
                     "Usuário não possui curso necessário para Madrugada."
-                )
\ No newline at end of file
+                )
+
+class ContadorFairness(models.Model):
+    """
+    Contagem materializada de titularidades por operador, seção e semana
+    (segunda-feira). Substitui a agregação do histórico em calcular_stats.
+
+    Mantida por escalas.contadores a cada escrita de alocações.
+    """
+
+    secao = models.ForeignKey(
+        "projetos.Secao",
+        on_delete=models.CASCADE,
+        related_name="contadores_fairness",
+    )
+
+    usuario = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="contadores_fairness",
+    )
+
+    semana = models.DateField(help_text="Segunda-feira da semana")
+
+    total = models.PositiveIntegerField(default=0)
+    preta = models.PositiveIntegerField(default=0)
+    amarela = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            UniqueConstraint(
+                fields=["secao", "semana", "usuario"],
+                name="contador_unico_por_semana",
+            )
+        ]
+        indexes = [
+            # participacao_recente: filtro por seção/semana sem ler a tabela
+            models.Index(
+                fields=["secao", "semana"],
+                include=["usuario", "total"],
+                name="contador_participacao_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.usuario_id} @ {self.semana}: {self.total}"
+
+
+class ParametrosIASecao(models.Model):
+    """
+    Pesos da IA treinados para uma seção (comando treinar_ia --salvar).
+
+    Lidos por escalas.ia.runtime.carregar_parametros_ia através de um
+    cache do processo com TTL, descartado também a cada save/delete.
+    """
+
+    secao = models.OneToOneField(
+        "projetos.Secao",
+        on_delete=models.CASCADE,
+        related_name="parametros_ia",
+    )
+
+    peso_pontos = models.FloatField()
+    peso_amarelas = models.FloatField()
+    peso_sobreaviso = models.FloatField()
+
+    # metadados do treino
+    injustica = models.FloatField(null=True, blank=True)
+    geracoes = models.PositiveIntegerField(default=0)
+    treinado_em = models.DateTimeField(auto_now=True)
+
+    def como_parametros(self):
+        from escalas.ia.autoajuste import ParametrosIA
+
+        return ParametrosIA(
+            peso_pontos=self.peso_pontos,
+            peso_amarelas=self.peso_amarelas,
+            peso_sobreaviso=self.peso_sobreaviso,
+        )
+
+    def save(self, *args, **kwargs):
+        from escalas.ia.runtime import invalidar_parametros_ia
+
+        super().save(*args, **kwargs)
+        invalidar_parametros_ia(self.secao_id)
+
+    def delete(self, *args, **kwargs):
+        from escalas.ia.runtime import invalidar_parametros_ia
+
+        secao_id = self.secao_id
+        resultado = super().delete(*args, **kwargs)
+        invalidar_parametros_ia(secao_id)
+
+        return resultado
+
+    def __str__(self):
+        return f"IA {self.secao_id}: injustiça {self.injustica}"
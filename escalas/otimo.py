@@ -0,0 +1,217 @@
+import heapq
+from collections import defaultdict
+
+from .fairness import registrar_escolha
+from .utils import usuario_disponivel, pode_assumir_turno
+
+
+INF = float("inf")
+
+
+# =========================
+# FLUXO DE CUSTO MÍNIMO
+# =========================
+class FluxoCustoMinimo:
+    """
+    Caminhos mínimos sucessivos (Dijkstra com potenciais).
+    Custos iniciais não negativos → potenciais começam em zero.
+    """
+
+    def __init__(self):
+        self.grafo = []
+
+    def no(self):
+        self.grafo.append([])
+        return len(self.grafo) - 1
+
+    def aresta(self, u, v, capacidade, custo):
+        """
+        Retorna a aresta (lista mutável): capacidade residual em [1].
+        """
+        self.grafo[u].append([v, capacidade, custo, len(self.grafo[v])])
+        self.grafo[v].append([u, 0, -custo, len(self.grafo[u]) - 1])
+        return self.grafo[u][-1]
+
+    def resolver(self, origem, destino):
+        """
+        Fluxo máximo de menor custo. Retorna (fluxo, custo).
+        """
+        n = len(self.grafo)
+        potencial = [0] * n
+        fluxo = 0
+        custo = 0
+
+        while True:
+            dist = [INF] * n
+            anterior = [None] * n
+            dist[origem] = 0
+            heap = [(0, origem)]
+
+            while heap:
+                d, u = heapq.heappop(heap)
+
+                if d > dist[u]:
+                    continue
+
+                for i, (v, capacidade, c, _) in enumerate(self.grafo[u]):
+                    if capacidade <= 0:
+                        continue
+
+                    nd = d + c + potencial[u] - potencial[v]
+
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        anterior[v] = (u, i)
+                        heapq.heappush(heap, (nd, v))
+
+            if dist[destino] == INF:
+                break
+
+            for v in range(n):
+                if dist[v] < INF:
+                    potencial[v] += dist[v]
+
+            # gargalo do caminho
+            gargalo = INF
+            v = destino
+            while v != origem:
+                u, i = anterior[v]
+                gargalo = min(gargalo, self.grafo[u][i][1])
+                v = u
+
+            v = destino
+            while v != origem:
+                u, i = anterior[v]
+                aresta = self.grafo[u][i]
+                aresta[1] -= gargalo
+                self.grafo[v][aresta[3]][1] += gargalo
+                v = u
+
+            fluxo += gargalo
+            custo += gargalo * (potencial[destino] - potencial[origem])
+
+        return fluxo, custo
+
+
+# =========================
+# SEMANA COMO FLUXO
+# =========================
+PESOS_TIPO_DIA = {
+    "PRETA": ("preta", 4),
+    "AMARELA": ("amarela", 3),
+}
+
+
+def alocar_otimo(
+    plano,
+    operadores,
+    stats,
+    qtd_por_turno,
+    disponibilidade=None,
+    capacidades=None,
+    tipo="TIT",
+    usados_por_dia=None
+):
+    """
+    Preenche os turnos do plano resolvendo um fluxo de custo mínimo:
+
+    origem → operador → operador×tipo de dia → operador×dia → turno → destino
+
+    - operador×dia com capacidade 1 garante um turno por dia
+    - só existe aresta operador×dia → turno se o operador está
+      disponível e tem o curso do turno
+    - o custo da k-ésima unidade cresce com a carga (total, preta,
+      amarela), então o ótimo espalha a semana de forma justa
+
+    Retorna usados_por_dia (data → ids) atualizado.
+    """
+    if usados_por_dia is None:
+        usados_por_dia = {}
+
+    g = FluxoCustoMinimo()
+    origem = g.no()
+    destino = g.no()
+
+    # =========================
+    # Turnos (demanda)
+    # =========================
+    turnos_por_dia = defaultdict(list)
+    no_turno = {}
+
+    for dia, turno in plano.turnos():
+        qtd = qtd_por_turno(turno)
+
+        if qtd <= 0:
+            continue
+
+        no_turno[id(turno)] = g.no()
+        g.aresta(no_turno[id(turno)], destino, qtd, 0)
+        turnos_por_dia[dia].append(turno)
+
+    # =========================
+    # Operadores (oferta)
+    # =========================
+    escolhas = []
+
+    for op in operadores:
+        elegiveis = {}
+
+        for dia, turnos in turnos_por_dia.items():
+            if op.id in usados_por_dia.get(dia.data, ()):
+                continue
+
+            if not usuario_disponivel(op, dia.data, disponibilidade):
+                continue
+
+            possiveis = [
+                t for t in turnos
+                if pode_assumir_turno(op, t.turno, capacidades)
+            ]
+
+            if possiveis:
+                elegiveis[dia] = possiveis
+
+        if not elegiveis:
+            continue
+
+        dados = stats.get(op.id, {"total": 0, "preta": 0, "amarela": 0})
+        no_op = g.no()
+
+        for k in range(len(elegiveis)):
+            g.aresta(origem, no_op, 1, (dados["total"] + k) * 10)
+
+        por_tipo = defaultdict(list)
+        for dia in elegiveis:
+            por_tipo[dia.tipo_dia].append(dia)
+
+        for tipo_dia, dias in por_tipo.items():
+            campo, peso = PESOS_TIPO_DIA.get(tipo_dia, (None, 0))
+            base = dados[campo] if campo else 0
+
+            no_tipo = g.no()
+
+            for k in range(len(dias)):
+                g.aresta(no_op, no_tipo, 1, (base + k) * peso)
+
+            for dia in dias:
+                no_dia = g.no()
+                g.aresta(no_tipo, no_dia, 1, 0)
+
+                for turno in elegiveis[dia]:
+                    aresta = g.aresta(no_dia, no_turno[id(turno)], 1, 0)
+                    escolhas.append((aresta, op, dia, turno))
+
+    g.resolver(origem, destino)
+
+    # =========================
+    # Aplicar no plano
+    # =========================
+    for aresta, op, dia, turno in escolhas:
+        if aresta[1] != 0:
+            continue  # aresta não usada
+
+        turno.adicionar(op, tipo=tipo, capacidades=capacidades)
+        usados_por_dia.setdefault(dia.data, set()).add(op.id)
+        registrar_escolha(stats, op.id, turno)
+
+    return usados_por_dia
@@ -0,0 +1,62 @@
+"""
+Funções executadas nos workers do comando gerar_escalas.
+
+Este módulo não importa models no topo: com o start method `spawn`
+ele é importado pelo worker antes do django.setup().
+"""
+import time
+
+
+# True só nos processos do pool (ver inicializar_worker)
+_em_worker = False
+
+
+def inicializar_worker():
+    # processo novo → setup próprio e conexão própria com o banco
+    global _em_worker
+    import django
+    django.setup()
+    _em_worker = True
+
+
+def gerar_secao(secao_id, data_inicio, semanas, usuario_id, qtd_madrugada, qtd_noturno, modo):
+    """
+    Gera as semanas de uma seção e devolve tempo e resultado.
+    Nunca propaga exceção (vira falha no relatório).
+    """
+    from django.db import connections
+    from accounts.models import User
+    from projetos.models import Secao
+    from escalas.services import gerar_escalas_periodo
+
+    inicio = time.perf_counter()
+    nome = f"#{secao_id}"
+
+    try:
+        secao = Secao.objects.get(id=secao_id)
+        nome = secao.nome
+
+        escalas = gerar_escalas_periodo(
+            secao=secao,
+            data_inicio=data_inicio,
+            semanas=semanas,
+            criada_por=User.objects.get(id=usuario_id),
+            qtd_madrugada=qtd_madrugada,
+            qtd_noturno=qtd_noturno,
+            modo=modo,
+        )
+        erro = None
+    except Exception as e:
+        escalas = []
+        erro = f"{type(e).__name__}: {e}"
+    finally:
+        # em processo (--processos 1) as conexões são do chamador
+        if _em_worker:
+            connections.close_all()
+
+    return {
+        "secao": nome,
+        "escalas": len(escalas),
+        "erro": erro,
+        "segundos": time.perf_counter() - inicio,
+    }
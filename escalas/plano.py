@@ -0,0 +1,241 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from .contadores import deltas_do_plano, incrementar_contadores
+from .models import Escala, DiaEscala, TurnoEscala, AlocacaoEscala
+from .utils import montar_pontuacao, tem_curso_manutencao
+from pontuacao.models import Pontuacao
+
+
+# =========================
+# PLANO EM MEMÓRIA
+# =========================
+@dataclass(eq=False)
+class PlanoAlocacao:
+    usuario: object
+    tipo: str = "TIT"
+    foi_acionado: bool = False
+
+
+@dataclass(eq=False)
+class PlanoTurno:
+    """
+    Espelha TurnoEscala (`turno`, `dia.tipo_dia`) para que
+    a seleção funcione igual sobre o plano e sobre o banco.
+
+    Cobertura mantida em memória a cada `adicionar`:
+    `qtd` vagas de titular planejadas, `titulares` e `habilitados`
+    (titulares com curso de manutenção) já alocados.
+    """
+
+    dia: "PlanoDia" = field(repr=False)
+    turno: str
+    alocacoes: list = field(default_factory=list)
+    qtd: int = 0
+    titulares: int = 0
+    habilitados: int = 0
+
+    @property
+    def vagas(self):
+        return max(self.qtd - self.titulares, 0)
+
+    @property
+    def precisa_habilitado(self):
+        return self.turno == "NOT" and not self.habilitados
+
+    def usuarios_ids(self, tipo=None):
+        return [
+            a.usuario.id for a in self.alocacoes
+            if tipo is None or a.tipo == tipo
+        ]
+
+    def adicionar(self, usuario, tipo="TIT", foi_acionado=False, capacidades=None):
+        alocacao = PlanoAlocacao(
+            usuario=usuario,
+            tipo=tipo,
+            foi_acionado=foi_acionado,
+        )
+        self.alocacoes.append(alocacao)
+
+        if tipo == "TIT":
+            self.titulares += 1
+
+            if self.turno == "NOT" and tem_curso_manutencao(usuario, capacidades):
+                self.habilitados += 1
+
+        return alocacao
+
+    def trocar(self, alocacao, usuario, capacidades=None):
+        """
+        Substitui o operador de uma alocação mantendo a cobertura.
+        """
+        if alocacao.tipo == "TIT" and self.turno == "NOT":
+            self.habilitados += (
+                tem_curso_manutencao(usuario, capacidades)
+                - tem_curso_manutencao(alocacao.usuario, capacidades)
+            )
+
+        alocacao.usuario = usuario
+
+
+@dataclass(eq=False)
+class PlanoDia:
+    data: date
+    tipo_dia: str
+    turnos: list = field(default_factory=list)
+
+    def adicionar_turno(self, codigo, qtd=0):
+        turno = PlanoTurno(dia=self, turno=codigo, qtd=qtd)
+        self.turnos.append(turno)
+        return turno
+
+
+@dataclass(eq=False)
+class PlanoEscala:
+    secao: object
+    data_inicio: date
+    data_fim: date
+    tipo: str = Escala.Tipo.NORMAL
+    dias: list = field(default_factory=list)
+    seed: int = None
+
+    def adicionar_dia(self, data, tipo_dia):
+        dia = PlanoDia(data=data, tipo_dia=tipo_dia)
+        self.dias.append(dia)
+        return dia
+
+    def turnos(self):
+        for dia in self.dias:
+            for turno in dia.turnos:
+                yield dia, turno
+
+
+def tipo_dia_para(data):
+    weekday = data.weekday()
+
+    return (
+        "PRETA" if weekday < 4
+        else "AMARELA" if weekday == 4
+        else "VERMELHA"
+    )
+
+
+def montar_plano_semanal(secao, data_inicio, turnos_padrao, vagas=None):
+    """
+    Estrutura vazia da semana (dias + turnos dos dias úteis).
+    `vagas`: titulares por turno ({"MAD": 1, "NOT": 2}).
+    """
+    vagas = vagas or {}
+
+    plano = PlanoEscala(
+        secao=secao,
+        data_inicio=data_inicio,
+        data_fim=data_inicio + timedelta(days=6),
+    )
+
+    for i in range(7):
+        data = data_inicio + timedelta(days=i)
+        tipo_dia = tipo_dia_para(data)
+
+        dia = plano.adicionar_dia(data, tipo_dia)
+
+        if tipo_dia == "VERMELHA":
+            continue
+
+        for codigo in turnos_padrao:
+            dia.adicionar_turno(codigo, vagas.get(codigo, 0))
+
+    return plano
+
+
+# =========================
+# FLUSH (bulk_create)
+# =========================
+def gravar_plano(plano, criada_por):
+    return gravar_planos([plano], criada_por)[0]
+
+
+def gravar_planos(planos, criada_por):
+    """
+    Persiste os planos com um INSERT por tabela:
+    escalas, dias, turnos, alocações, pontuações e contadores.
+
+    Deve rodar dentro de transaction.atomic (quem chama garante).
+    """
+
+    escalas = Escala.objects.bulk_create([
+        Escala(
+            secao=plano.secao,
+            data_inicio=plano.data_inicio,
+            data_fim=plano.data_fim,
+            criada_por=criada_por,
+            tipo=plano.tipo,
+            seed=plano.seed,
+        )
+        for plano in planos
+    ])
+
+    dias_plano = []
+    dias = []
+
+    for escala, plano in zip(escalas, planos):
+        for plano_dia in plano.dias:
+            dias_plano.append(plano_dia)
+            dias.append(
+                DiaEscala(
+                    escala=escala,
+                    data=plano_dia.data,
+                    tipo_dia=plano_dia.tipo_dia,
+                )
+            )
+
+    dias = DiaEscala.objects.bulk_create(dias)
+
+    turnos_plano = []
+    turnos = []
+
+    for dia, plano_dia in zip(dias, dias_plano):
+        for plano_turno in plano_dia.turnos:
+            turnos_plano.append(plano_turno)
+            turnos.append(TurnoEscala(dia=dia, turno=plano_turno.turno))
+
+    turnos = TurnoEscala.objects.bulk_create(turnos)
+
+    alocacoes = []
+
+    for turno, plano_turno in zip(turnos, turnos_plano):
+        for a in plano_turno.alocacoes:
+            alocacoes.append(
+                AlocacaoEscala(
+                    turno=turno,
+                    usuario_id=a.usuario.id,
+                    tipo=a.tipo,
+                    foi_acionado=a.foi_acionado,
+                    data=turno.dia.data,
+                )
+            )
+
+    alocacoes = AlocacaoEscala.objects.bulk_create(alocacoes)
+
+    pontuacoes = [
+        p for p in (montar_pontuacao(a) for a in alocacoes)
+        if p is not None
+    ]
+
+    if pontuacoes:
+        Pontuacao.objects.bulk_create(pontuacoes)
+
+    # contadores de fairness materializados
+    deltas = defaultdict(dict)
+
+    for plano in planos:
+        for chave, delta in deltas_do_plano(plano).items():
+            acumulado = deltas[plano.secao].setdefault(chave, dict.fromkeys(delta, 0))
+            for campo, valor in delta.items():
+                acumulado[campo] += valor
+
+    for secao, deltas_secao in deltas.items():
+        incrementar_contadores(secao, deltas_secao)
+
+    return escalas
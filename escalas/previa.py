@@ -0,0 +1,131 @@
+"""
+Prévia de geração (dry-run): planeja sem escrever no banco.
+
+Os planos ficam no cache "previas" (DatabaseCache, compartilhado
+entre os workers) por TTL_PREVIA segundos, numa chave derivada da
+seção, dos parâmetros e da seed. Confirmar grava
+exatamente os planos que foram mostrados, com o mesmo flush em
+lote da geração normal.
+"""
+import hashlib
+import json
+
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .fairness import nova_seed
+from .instrumentacao import instrumentado
+from .models import Escala
+from .plano import gravar_planos
+
+
+TTL_PREVIA = 10 * 60
+
+CACHE_PREVIAS = "previas"
+
+
+def _cache():
+    return caches[CACHE_PREVIAS]
+
+
+def chave_previa(secao, parametros, seed):
+    bruto = json.dumps(
+        {**parametros, "seed": seed},
+        sort_keys=True,
+        default=str,
+    )
+    resumo = hashlib.sha256(bruto.encode()).hexdigest()[:32]
+
+    return f"escalas:previa:{secao.id}:{resumo}"
+
+
+# =========================
+# PRÉVIA (nenhuma escrita)
+# =========================
+def gerar_previa(
+    secao,
+    data_inicio,
+    qtd_madrugada,
+    qtd_noturno,
+    semanas=1,
+    modo="DIN",
+    motor="HEAP",
+    melhorar_ms=0,
+    seed=None
+):
+    """
+    Retorna (chave, planos). Mesmos parâmetros + mesma seed dentro
+    do TTL → os mesmos planos, sem planejar de novo.
+    """
+    from .services import planejar_escala_semanal, planejar_escalas_periodo
+
+    if seed is None:
+        seed = nova_seed()
+
+    parametros = {
+        "data_inicio": data_inicio,
+        "qtd_madrugada": qtd_madrugada,
+        "qtd_noturno": qtd_noturno,
+        "semanas": semanas,
+        "modo": modo,
+        "motor": motor,
+        "melhorar_ms": melhorar_ms,
+    }
+
+    chave = chave_previa(secao, parametros, seed)
+    planos = _cache().get(chave)
+
+    if planos is not None:
+        return chave, planos
+
+    # uma semana → mesma seed que gerar_escala_semanal usaria
+    if semanas == 1:
+        planos = [
+            planejar_escala_semanal(
+                secao, data_inicio, qtd_madrugada, qtd_noturno,
+                modo=modo, motor=motor, melhorar_ms=melhorar_ms, seed=seed,
+            )
+        ]
+    else:
+        planos = planejar_escalas_periodo(
+            secao, data_inicio, semanas, qtd_madrugada, qtd_noturno,
+            modo=modo, motor=motor, melhorar_ms=melhorar_ms, seed=seed,
+        )
+
+    _cache().set(chave, planos, TTL_PREVIA)
+
+    return chave, planos
+
+
+# =========================
+# CONFIRMAÇÃO
+# =========================
+@instrumentado("confirmar_previa")
+@transaction.atomic
+def confirmar_previa(chave, secao, criada_por):
+    """
+    Grava os planos da prévia `chave` (e a descarta).
+    """
+    if not chave.startswith(f"escalas:previa:{secao.id}:"):
+        raise ValidationError("Prévia de outra seção.")
+
+    planos = _cache().get(chave)
+
+    if planos is None:
+        raise ValidationError("Prévia expirada. Gere novamente.")
+
+    existentes = Escala.objects.filter(
+        secao=secao,
+        data_inicio__in=[plano.data_inicio for plano in planos],
+    )
+
+    if existentes.exists():
+        raise ValidationError("Já existe escala para uma das semanas da prévia.")
+
+    escalas = gravar_planos(planos, criada_por)
+
+    # confirmada uma vez só
+    transaction.on_commit(lambda: _cache().delete(chave))
+
+    return escalas
@@ -0,0 +1,236 @@
+"""
+Reparo incremental de escalas já geradas quando surge uma
+indisponibilidade nova.
+
+Só as alocações do operador dentro do intervalo são refeitas, com a
+mesma fila justa da geração e o fairness dos contadores
+materializados. O resultado é um diff para o escalante aprovar;
+aplicar_reparo grava exatamente esse diff.
+"""
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Case, Q, Value, When
+
+from indisponibilidades.models import Indisponibilidade
+from pontuacao.models import Pontuacao
+from .contadores import recalcular_contadores_alocacoes
+from .contexto import ContextoGeracao
+from .fairness import criar_fila, puxar_da_fila_fair
+from .instrumentacao import instrumentado
+from .models import Escala, AlocacaoEscala
+from .plano import PlanoDia
+
+
+@dataclass
+class Substituicao:
+    alocacao_id: int
+    data: date
+    turno: str
+    tipo: str
+    sai: object = field(repr=False)
+    entra: object = field(default=None, repr=False)
+
+    def chave(self):
+        """
+        Forma serializável (sessão) do que será gravado.
+        """
+        return [
+            self.alocacao_id,
+            self.sai.id,
+            self.entra.id if self.entra else None,
+        ]
+
+
+MENSAGEM_ESCALA_MUDOU = "A escala mudou desde a prévia. Gere o reparo novamente."
+
+
+def alocacoes_afetadas(indisponibilidade):
+    # data do dia da escala: AlocacaoEscala.data é nula em linhas
+    # antigas e nas criadas por editar_turno
+    return (
+        AlocacaoEscala.objects
+        .filter(
+            usuario_id=indisponibilidade.usuario_id,
+            turno__dia__data__range=(indisponibilidade.data_inicio, indisponibilidade.data_fim),
+        )
+        .exclude(turno__dia__escala__status=Escala.Status.ENCERRADA)
+    )
+
+
+# =========================
+# PRÉVIA (nenhuma escrita)
+# =========================
+@instrumentado("planejar_reparo")
+def planejar_reparo(indisponibilidade, motor="HEAP"):
+    """
+    Lista de Substituicao, uma por alocação afetada.
+    `entra` None → ninguém elegível para a vaga.
+    """
+    afetadas = list(
+        alocacoes_afetadas(indisponibilidade)
+        .select_related("turno__dia__escala__secao", "usuario")
+        .order_by("turno__dia__data", "turno__turno", "id")
+    )
+
+    if not afetadas:
+        return []
+
+    por_secao = defaultdict(list)
+    for a in afetadas:
+        por_secao[a.turno.dia.escala.secao].append(a)
+
+    substituicoes = []
+
+    for secao, alocacoes in por_secao.items():
+        substituicoes.extend(_reparar_secao(secao, alocacoes, motor))
+
+    return substituicoes
+
+
+def _reparar_secao(secao, afetadas, motor):
+    datas = sorted({a.turno.dia.data for a in afetadas})
+
+    # disponibilidade já enxerga a indisponibilidade nova
+    contexto = ContextoGeracao.carregar(secao, datas[0], datas[-1])
+    capacidades = contexto.capacidades
+
+    # quem já trabalha em cada dia e quem está em cada turno afetado
+    ocupacao = (
+        AlocacaoEscala.objects
+        .filter(turno__dia__data__in=datas, turno__dia__escala__secao=secao)
+        .values_list("turno__dia__data", "turno_id", "usuario_id", "tipo")
+    )
+
+    usados_por_dia = defaultdict(set)
+    titulares_por_turno = defaultdict(list)
+
+    for data, turno_id, usuario_id, tipo in ocupacao:
+        if usuario_id is None:
+            continue
+
+        usados_por_dia[data].add(usuario_id)
+
+        if tipo == "TIT":
+            titulares_por_turno[turno_id].append(usuario_id)
+
+    stats = contexto.copia_stats()
+    fila = criar_fila(contexto.fila_balanceada(), stats, motor)
+
+    substituicoes = []
+
+    for a in afetadas:
+        dia = a.turno.dia
+
+        # espelho em memória do turno, sem quem sai
+        espelho = PlanoDia(data=dia.data, tipo_dia=dia.tipo_dia).adicionar_turno(a.turno.turno)
+        espelho.habilitados = sum(
+            capacidades.habilitado(u)
+            for u in titulares_por_turno[a.turno_id]
+            if u != a.usuario_id
+        )
+
+        entra = puxar_da_fila_fair(
+            fila,
+            dia.data,
+            espelho,
+            usados_por_dia[dia.data],
+            secao,
+            stats=stats,
+            disponibilidade=contexto.disponibilidade,
+            capacidades=capacidades,
+        )
+
+        if entra is not None:
+            usados_por_dia[dia.data].add(entra.id)
+
+        substituicoes.append(
+            Substituicao(
+                alocacao_id=a.id,
+                data=dia.data,
+                turno=a.turno.turno,
+                tipo=a.tipo,
+                sai=a.usuario,
+                entra=entra,
+            )
+        )
+
+    return substituicoes
+
+
+# =========================
+# APLICAÇÃO
+# =========================
+@instrumentado("aplicar_reparo")
+@transaction.atomic
+def aplicar_reparo(chaves):
+    """
+    Grava o diff aprovado ([alocacao_id, sai_id, entra_id], ...).
+    Se alguma alocação mudou desde a prévia, ou quem entra ficou
+    ocupado/indisponível no dia, nada é gravado.
+    """
+    trocas = {
+        alocacao_id: (sai_id, entra_id)
+        for alocacao_id, sai_id, entra_id in chaves
+        if entra_id
+    }
+
+    if not trocas:
+        return []
+
+    alocacoes = list(
+        AlocacaoEscala.objects
+        .select_for_update(of=("self",))
+        .select_related("turno__dia__escala__secao")
+        .filter(id__in=trocas)
+    )
+
+    if len(alocacoes) != len(trocas):
+        raise ValidationError(MENSAGEM_ESCALA_MUDOU)
+
+    # (entra_id, data) de cada troca
+    entradas = []
+
+    for a in alocacoes:
+        sai_id, entra_id = trocas[a.id]
+
+        if (
+            a.usuario_id != sai_id
+            or a.turno.dia.escala.status == Escala.Status.ENCERRADA
+        ):
+            raise ValidationError(MENSAGEM_ESCALA_MUDOU)
+
+        entradas.append((entra_id, a.turno.dia.data))
+
+    # quem entra continua livre e disponível no dia (duas queries)
+    ocupado = Q()
+    ausente = Q()
+
+    for entra_id, data in entradas:
+        ocupado |= Q(usuario_id=entra_id, turno__dia__data=data)
+        ausente |= Q(usuario_id=entra_id, data_inicio__lte=data, data_fim__gte=data)
+
+    if (
+        AlocacaoEscala.objects.filter(ocupado).exclude(id__in=trocas).exists()
+        or Indisponibilidade.objects.filter(ausente).exists()
+    ):
+        raise ValidationError(MENSAGEM_ESCALA_MUDOU)
+
+    for a in alocacoes:
+        a.usuario_id = trocas[a.id][1]
+
+    AlocacaoEscala.objects.bulk_update(alocacoes, ["usuario"])
+
+    # pontuação da titularidade acompanha quem assume
+    Pontuacao.objects.filter(alocacao__in=alocacoes).update(
+        usuario_id=Case(
+            *[When(alocacao_id=a.id, then=Value(a.usuario_id)) for a in alocacoes]
+        )
+    )
+
+    recalcular_contadores_alocacoes(*alocacoes)
+
+    return alocacoes
@@ -7,31 +7,33 @@ from accounts.models import User
 from django.db.models import Q, Count
 from django.db.models import Prefetch
 from escalas.ia.runtime import fila_operadores_com_ia
-from .fairness import puxar_da_fila_fair, calcular_stats, pode_assumir_turno, usuario_disponivel
+from .fairness import puxar_da_fila_fair, calcular_stats, pode_assumir_turno, usuario_disponivel, criar_fila, candidato_valido, nova_seed
+from .indices import IndiceDisponibilidade, CapacidadesOperadores
+from .elegibilidade import MatrizElegibilidade
+from .plano import PlanoEscala, montar_plano_semanal, gravar_plano, gravar_planos
+from .contexto import ContextoGeracao
+from .contadores import participacao_recente
+from .otimo import alocar_otimo
+from .busca_local import melhorar_plano
+from .instrumentacao import instrumentado
 from collections import deque
+import random
 
 from pontuacao.utils import registrar_pontuacoes_em_lote
 from django.core.exceptions import ValidationError
+from django.utils.dateparse import parse_date
 
 def ultimos_titulares(secao, semanas=1):
-    from datetime import timedelta
-    from django.utils import timezone
+    return participacao_recente(secao, semanas_bloqueio=semanas).bloqueados
 
-    data_limite = timezone.now().date() - timedelta(days=7 * semanas)
-
-    return set(
-        AlocacaoEscala.objects.filter(
-            turno__dia__escala__secao=secao,
-            tipo="TIT",
-            turno__dia__escala__data_inicio__gte=data_limite,
-        ).values_list("usuario_id", flat=True)
-    )
-
-def selecionar_titulares_semana(secao):
+def selecionar_titulares_semana(secao, participacao=None):
     fila = fila_operadores_balanceada(secao)
 
-    # 🔥 NOVO
-    bloqueados = ultimos_titulares(secao)
+    # 🔥 bloqueados saem da mesma query da participação
+    if participacao is None:
+        participacao = participacao_recente(secao)
+
+    bloqueados = participacao.bloqueados
 
     titulares = []
     fallback = []
@@ -59,29 +61,7 @@ def ja_escalado_no_dia(usuario_id, data, escala):
     ).exists()
 
 def calcular_participacao_semanal(secao, semanas=8):
-    from django.utils import timezone
-    from datetime import timedelta
-
-    inicio = timezone.now().date() - timedelta(days=7 * semanas)
-
-    participacoes = (
-        AlocacaoEscala.objects
-        .filter(
-            turno__dia__escala__secao=secao,
-            turno__dia__data__gte=inicio,
-            tipo="TIT"
-        )
-        .values("usuario", "turno__dia__escala")
-        .distinct()
-    )
-
-    contador = {}
-
-    for item in participacoes:
-        user = item["usuario"]
-        contador[user] = contador.get(user, 0) + 1
-
-    return contador
+    return participacao_recente(secao, semanas=semanas).semanas
 
 def acionar_sobreaviso(alocacao):
     """
@@ -111,19 +91,27 @@ def alocar_turno(
     usados_no_dia,
     secao,
     stats,
-    tipo="TIT"
+    tipo="TIT",
+    disponibilidade=None,
+    capacidades=None,
+    rng=random
 ):
+    """
+    Preenche um turno do plano (em memória).
+    """
     alocados = []
 
-    from django.db import IntegrityError
-
     for _ in range(qtd):
         op = None
 
         # 🔁 tenta achar alguém válido
         for _ in range(len(fila)):
             candidato = puxar_da_fila_fair(
-                fila, data, turno, usados_no_dia, secao, stats=stats
+                fila, data, turno, usados_no_dia, secao,
+                stats=stats,
+                disponibilidade=disponibilidade,
+                capacidades=capacidades,
+                rng=rng,
             )
 
             if not candidato:
@@ -139,44 +127,39 @@ def alocar_turno(
         if not op:
             break
 
-        try:
-            aloc = AlocacaoEscala.objects.create(
-                turno=turno,
-                usuario=op,
-                tipo=tipo,
-                data=data,
-            )
-
-            usados_no_dia.add(op.id)
+        turno.adicionar(op, tipo=tipo, capacidades=capacidades)
+        usados_no_dia.add(op.id)
 
-            if tipo == "TIT":
-                pontuar_alocacao(aloc)
-
-            alocados.append(op)
-
-        except IntegrityError:
-            # 🛡️ proteção extra contra concorrência
-            continue
+        alocados.append(op)
 
     return alocados
 
+@instrumentado("gerar_escala_semanal_fixa")
 def gerar_escala_semanal_fixa(
     dias,
     secao,
     qtd_operadores_semana,
     qtd_madrugada,
     qtd_noturno,
-    usar_reserva=True
+    usar_reserva=True,
+    disponibilidade=None,
+    capacidades=None,
+    motor="HEAP",
+    operadores=None,
+    stats=None,
+    rng=random
 ):
     # =========================
     # 1️⃣ Seleciona grupo fixo
     # =========================
-    
-    stats = calcular_stats(secao, dias=365)
 
-    operadores = list(
-        User.objects.filter(secao=secao, papel="OPE")
-    )
+    if stats is None:
+        stats = calcular_stats(secao, dias=365)
+
+    if operadores is None:
+        operadores = User.objects.filter(secao=secao, papel="OPE")
+
+    operadores = list(operadores)
 
     def score(op):
         dados = stats.get(op.id, {"total": 0, "preta": 0, "amarela": 0})
@@ -188,11 +171,34 @@ def gerar_escala_semanal_fixa(
 
     operadores.sort(key=lambda op: (score(op), op.id))
 
+    # =========================
+    # 🔥 ELEGIBILIDADE DA SEMANA (dia × turno × operador)
+    # =========================
+    # índices carregados uma vez → número de queries não depende
+    # do tamanho da seção
+    datas = [dia.data for dia in dias]
+
+    if datas and disponibilidade is None:
+        disponibilidade = IndiceDisponibilidade.carregar(secao, min(datas), max(datas))
+
+    if capacidades is None:
+        capacidades = CapacidadesOperadores.carregar(op.id for op in operadores)
+
+    elegibilidade = None
+    if datas:
+        elegibilidade = MatrizElegibilidade.montar(
+            datas,
+            {turno.turno for dia in dias for turno in dia.turnos},
+            operadores,
+            disponibilidade,
+            capacidades,
+        )
+
     # 🔥 GRUPO FIXO DA SEMANA
     operadores_semana = operadores[:qtd_operadores_semana]
 
     # 🔥 RESTO = fallback
-    fila_fallback = deque(operadores[qtd_operadores_semana:])
+    fila_fallback = criar_fila(operadores[qtd_operadores_semana:], stats, motor, rng=rng)
 
     # =========================
     # 2️⃣ LOOP DOS DIAS
@@ -203,7 +209,7 @@ def gerar_escala_semanal_fixa(
 
         usados_no_dia = set()
 
-        for turno in dia.turnos.all():
+        for turno in dia.turnos:
 
             qtd = qtd_madrugada if turno.turno == "MAD" else qtd_noturno
 
@@ -215,10 +221,10 @@ def gerar_escala_semanal_fixa(
             # =========================
             candidatos_fixos = [
                 op for op in operadores_semana
-                if op.id not in usados_no_dia
-                and usuario_disponivel(op, dia.data)
-                and not (turno.turno == "MAD" and not pode_assumir_turno(op, "MAD"))
-                and not (turno.turno == "NOT" and not pode_assumir_turno(op, "NOT"))
+                if candidato_valido(
+                    op, dia.data, turno, usados_no_dia,
+                    disponibilidade, capacidades, elegibilidade
+                )
             ]
 
             # 🔥 pega os primeiros disponíveis
@@ -234,7 +240,11 @@ def gerar_escala_semanal_fixa(
                     turno,
                     usados_no_dia,
                     secao,
-                    stats=stats
+                    stats=stats,
+                    disponibilidade=disponibilidade,
+                    capacidades=capacidades,
+                    elegibilidade=elegibilidade,
+                    rng=rng
                 )
 
                 if not op:
@@ -243,19 +253,11 @@ def gerar_escala_semanal_fixa(
                 selecionados.append(op)
 
             # =========================
-            # 💾 SALVAR TITULARES
+            # 💾 TITULARES NO PLANO
             # =========================
             for op in selecionados:
                 usados_no_dia.add(op.id)
-
-                aloc = AlocacaoEscala.objects.create(
-                    turno=turno,
-                    usuario=op,
-                    tipo="TIT",
-                    data=dia.data,
-                )
-
-                pontuar_alocacao(aloc)
+                turno.adicionar(op, tipo="TIT", capacidades=capacidades)
 
             # =========================
             # 4️⃣ RESERVA (opcional)
@@ -268,19 +270,18 @@ def gerar_escala_semanal_fixa(
                     turno,
                     usados_no_dia,
                     secao,
-                    stats=stats
+                    stats=stats,
+                    disponibilidade=disponibilidade,
+                    capacidades=capacidades,
+                    elegibilidade=elegibilidade,
+                    rng=rng
                 )
 
                 if op:
                     usados_no_dia.add(op.id)
+                    turno.adicionar(op, tipo="RES", capacidades=capacidades)
 
-                    AlocacaoEscala.objects.create(
-                        turno=turno,
-                        usuario=op,
-                        tipo="RES",
-                        data=dia.data,
-                    )
-
+@instrumentado("encerrar_escala")
 @transaction.atomic
 def encerrar_escala(escala, usuario):
     if escala.status != Escala.Status.PUBLICADA:
@@ -305,8 +306,12 @@ def encerrar_escala(escala, usuario):
     escala.status = Escala.Status.ENCERRADA
     escala.save()
 
+@instrumentado("criar_sobreaviso_service")
 @transaction.atomic
 def criar_sobreaviso_service(secao, data, quantidade, criada_por):
+    if isinstance(data, str):
+        data = parse_date(data)
+
     escala = Escala.objects.create(
         secao=secao,
         data_inicio=data,
@@ -338,7 +343,9 @@ def criar_sobreaviso_service(secao, data, quantidade, criada_por):
         .order_by("total_sobreaviso", "id")
     )
 
-    seletor = SeletorOperadores(operadores)
+    disponibilidade = IndiceDisponibilidade.carregar(secao, data, data)
+
+    seletor = SeletorOperadores(operadores, disponibilidade=disponibilidade)
     usados = set()
 
     for _ in range(quantidade):
@@ -367,133 +374,278 @@ def criar_sobreaviso_service(secao, data, quantidade, criada_por):
 
     return escala
 
-@transaction.atomic
-def gerar_escala_semanal(
+def validar_noturno(plano):
+    """
+    Cobertura já é acompanhada no plano → só confere os contadores.
+    """
+    for dia, turno in plano.turnos():
+        if turno.qtd and turno.precisa_habilitado:
+            raise ValidationError(
+                f"Turno noturno do dia {dia.data} ficou sem habilitado."
+            )
+
+def planejar_escala_semanal(
     secao,
     data_inicio,
-    criada_por,
     qtd_madrugada,
     qtd_noturno,
-    modo="DIN"
+    modo="DIN",
+    motor="HEAP",
+    contexto=None,
+    melhorar_ms=0,
+    seed=None
 ):
-    escala = Escala.objects.create(
-        secao=secao,
-        data_inicio=data_inicio,
-        data_fim=data_inicio + timedelta(days=6),
-        criada_por=criada_por,
+    """
+    Monta a semana inteira em memória (nenhuma escrita no banco).
+
+    `modo`: DIN (fila dia a dia), SEM (grupo fixo) ou OPT (fluxo
+    de custo mínimo sobre a semana inteira, ver escalas.otimo).
+    `motor` escolhe a fila de seleção (ver fairness.criar_fila).
+    `contexto` permite reaproveitar o que já foi carregado
+    (ver planejar_escalas_periodo).
+    `melhorar_ms` > 0 roda a busca local (escalas.busca_local) depois
+    do preenchimento; não se aplica ao modo SEM (quebraria o grupo fixo).
+    `seed` fixa o desempate: mesma seed + mesmos dados → mesmo plano
+    (sem busca local, que para por tempo). Sem seed, sorteia uma e
+    guarda em plano.seed.
+    """
+    plano = montar_plano_semanal(
+        secao, data_inicio, TURNOS_PADRAO,
+        vagas={"MAD": qtd_madrugada, "NOT": qtd_noturno},
     )
 
-    fila = fila_operadores_balanceada(secao)
-    stats = calcular_stats(secao)
-
-    dias_processados = []
+    plano.seed = nova_seed() if seed is None else seed
+    rng = random.Random(plano.seed)
 
-    # =========================
-    # 1️⃣ Criar estrutura
-    # =========================
-    for i in range(7):
-        data = data_inicio + timedelta(days=i)
-        weekday = data.weekday()
-
-        tipo_dia = (
-            "PRETA" if weekday < 4
-            else "AMARELA" if weekday == 4
-            else "VERMELHA"
+    if contexto is None:
+        contexto = ContextoGeracao.carregar(
+            secao, plano.data_inicio, plano.data_fim, modo
         )
 
-        dia = DiaEscala.objects.create(
-            escala=escala,
-            data=data,
-            tipo_dia=tipo_dia,
-        )
-
-        if tipo_dia == "VERMELHA":
-            continue
-
-        for turno_codigo in TURNOS_PADRAO:
-            turno = TurnoEscala.objects.create(
-                dia=dia,
-                turno=turno_codigo,
-            )
-
-            dias_processados.append((data, turno_codigo, turno))
+    disponibilidade = contexto.disponibilidade
+    capacidades = contexto.capacidades
 
     # =========================
     # MODO FIXO
     # =========================
     if modo == "SEM":
-        dias = escala.dias.prefetch_related("turnos__alocacoes")
-
         gerar_escala_semanal_fixa(
-            dias,
+            plano.dias,
             secao,
             qtd_operadores_semana=6,
             qtd_madrugada=qtd_madrugada,
             qtd_noturno=qtd_noturno,
-            usar_reserva=True
+            usar_reserva=True,
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+            motor=motor,
+            operadores=contexto.operadores,
+            stats=contexto.copia_stats(fixa=True),
+            rng=rng
         )
-        return escala
+        return plano
+
+    stats = contexto.copia_stats()
+
+    def qtd_por_turno(turno):
+        return qtd_madrugada if turno.turno == "MAD" else qtd_noturno
+
+    # =========================
+    # MODO ÓTIMO (fluxo de custo mínimo)
+    # =========================
+    if modo == "OPT":
+        usados_por_dia = alocar_otimo(
+            plano, contexto.operadores, stats, qtd_por_turno,
+            disponibilidade, capacidades,
+            tipo="TIT",
+        )
+
+        validar_noturno(plano)
+
+        alocar_otimo(
+            plano, contexto.operadores, stats, lambda turno: 1,
+            disponibilidade, capacidades,
+            tipo="RES",
+            usados_por_dia=usados_por_dia,
+        )
+        return refinar_plano(plano, contexto, melhorar_ms, rng)
+
+    fila = criar_fila(contexto.fila_balanceada(), stats, motor, rng=rng)
 
     # =========================
     # 2️⃣ ALOCAÇÃO PRINCIPAL
     # =========================
     usados_global = {}
 
-    for data, turno_codigo, turno in dias_processados:
+    for dia, turno in plano.turnos():
 
-        usados_no_dia = usados_global.setdefault(data, set())
+        usados_no_dia = usados_global.setdefault(dia.data, set())
 
-        qtd = qtd_madrugada if turno_codigo == "MAD" else qtd_noturno
+        qtd = qtd_madrugada if turno.turno == "MAD" else qtd_noturno
 
         if qtd == 0:
             continue
 
         alocar_turno(
             turno=turno,
-            data=data,
+            data=dia.data,
             qtd=qtd,
             fila=fila,
             usados_no_dia=usados_no_dia,
             secao=secao,
             stats=stats,
-            tipo="TIT"
+            tipo="TIT",
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+            rng=rng
         )
 
     # =========================
     # 3️⃣ VALIDAR NOT
     # =========================
-    for data, turno_codigo, turno in dias_processados:
-        if turno_codigo != "NOT" or qtd_noturno == 0:
-            continue
-
-        if not turno.alocacoes.filter(
-            usuario__cursos__codigo="MAN",
-            tipo="TIT"
-        ).exists():
-            raise ValidationError(
-                f"Turno noturno do dia {data} ficou sem habilitado."
-            )
+    validar_noturno(plano)
 
     # =========================
     # 4️⃣ RESERVAS
     # =========================
-    for data, turno_codigo, turno in dias_processados:
+    for dia, turno in plano.turnos():
 
-        usados_no_dia = usados_global.setdefault(data, set())
+        usados_no_dia = usados_global.setdefault(dia.data, set())
 
         alocar_turno(
             turno=turno,
-            data=data,
+            data=dia.data,
             qtd=1,
             fila=fila,
             usados_no_dia=usados_no_dia,
             secao=secao,
             stats=stats,
-            tipo="RES"
+            tipo="RES",
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+            rng=rng
         )
 
-    return escala
+    return refinar_plano(plano, contexto, melhorar_ms, rng)
+
+def refinar_plano(plano, contexto, melhorar_ms, rng=random):
+    if melhorar_ms > 0:
+        melhorar_plano(
+            plano,
+            contexto.operadores,
+            contexto.stats,
+            contexto.disponibilidade,
+            contexto.capacidades,
+            orcamento_ms=melhorar_ms,
+            rng=rng,
+        )
+
+    return plano
+
+@instrumentado("gerar_escala_semanal")
+@transaction.atomic
+def gerar_escala_semanal(
+    secao,
+    data_inicio,
+    criada_por,
+    qtd_madrugada,
+    qtd_noturno,
+    modo="DIN",
+    motor="HEAP",
+    melhorar_ms=0,
+    seed=None
+):
+    plano = planejar_escala_semanal(
+        secao,
+        data_inicio,
+        qtd_madrugada,
+        qtd_noturno,
+        modo=modo,
+        motor=motor,
+        melhorar_ms=melhorar_ms,
+        seed=seed,
+    )
+
+    # 💾 flush único (bulk_create por tabela)
+    return gravar_plano(plano, criada_por)
+
+# =========================
+# VÁRIAS SEMANAS (lote)
+# =========================
+def planejar_escalas_periodo(
+    secao,
+    data_inicio,
+    semanas,
+    qtd_madrugada,
+    qtd_noturno,
+    modo="DIN",
+    motor="HEAP",
+    melhorar_ms=0,
+    seed=None
+):
+    """
+    Planeja N semanas seguidas com uma única carga de dados.
+    O fairness de cada semana já considera as anteriores.
+    `seed` gera a seed de cada semana (cada plano guarda a sua).
+    """
+    contexto = ContextoGeracao.carregar(
+        secao,
+        data_inicio,
+        data_inicio + timedelta(days=7 * semanas - 1),
+        modo,
+    )
+
+    sementes = random.Random(nova_seed() if seed is None else seed)
+    planos = []
+
+    for i in range(semanas):
+        plano = planejar_escala_semanal(
+            secao,
+            data_inicio + timedelta(days=7 * i),
+            qtd_madrugada,
+            qtd_noturno,
+            modo=modo,
+            motor=motor,
+            contexto=contexto,
+            melhorar_ms=melhorar_ms,
+            seed=sementes.randrange(2 ** 31),
+        )
+
+        contexto.acumular(plano)
+        planos.append(plano)
+
+    return planos
+
+@instrumentado("gerar_escalas_periodo")
+@transaction.atomic
+def gerar_escalas_periodo(
+    secao,
+    data_inicio,
+    semanas,
+    criada_por,
+    qtd_madrugada,
+    qtd_noturno,
+    modo="DIN",
+    motor="HEAP",
+    melhorar_ms=0,
+    seed=None
+):
+    planos = planejar_escalas_periodo(
+        secao,
+        data_inicio,
+        semanas,
+        qtd_madrugada,
+        qtd_noturno,
+        modo=modo,
+        motor=motor,
+        melhorar_ms=melhorar_ms,
+        seed=seed,
+    )
 
+    # 💾 todas as semanas no mesmo flush
+    return gravar_planos(planos, criada_por)
+
+@instrumentado("encerrar_escala")
 @transaction.atomic
 def encerrar_escala(escala, usuario):
     if escala.status != Escala.Status.PUBLICADA:
@@ -518,8 +670,12 @@ def encerrar_escala(escala, usuario):
     escala.status = Escala.Status.ENCERRADA
     escala.save()
 
+@instrumentado("criar_sobreaviso_service")
 @transaction.atomic
 def criar_sobreaviso_service(secao, data, quantidade, criada_por):
+    if isinstance(data, str):
+        data = parse_date(data)
+
     escala = Escala.objects.create(
         secao=secao,
         data_inicio=data,
@@ -551,7 +707,9 @@ def criar_sobreaviso_service(secao, data, quantidade, criada_por):
         .order_by("total_sobreaviso", "id")
     )
 
-    seletor = SeletorOperadores(operadores)
+    disponibilidade = IndiceDisponibilidade.carregar(secao, data, data)
+
+    seletor = SeletorOperadores(operadores, disponibilidade=disponibilidade)
     usados = set()
 
     for _ in range(quantidade):
@@ -578,4 +736,106 @@ def criar_sobreaviso_service(secao, data, quantidade, criada_por):
 
         usados.add(usuario.id)
 
-    return escala
\ No newline at end of file
+    return escala
+
+# =========================
+# SOBREAVISO EM LOTE (período)
+# =========================
+def datas_sobreaviso(data_inicio, data_fim, feriados=()):
+    """
+    Sábados, domingos e feriados do período.
+    """
+    feriados = set(feriados)
+    datas = []
+    data = data_inicio
+
+    while data <= data_fim:
+        if data.weekday() >= 5 or data in feriados:
+            datas.append(data)
+        data += timedelta(days=1)
+
+    return datas
+
+def planejar_sobreavisos(secao, datas, quantidade, contexto=None):
+    """
+    Um plano de sobreaviso por data, com rodízio em memória:
+    cada vaga vai para o disponível com menos sobreavisos
+    (histórico + os já planejados no período).
+
+    Número fixo de queries (ContextoGeracao modo SOB), qualquer
+    que seja o período.
+    """
+    if not datas:
+        return []
+
+    if contexto is None:
+        contexto = ContextoGeracao.carregar(secao, datas[0], datas[-1], "SOB")
+
+    operadores = contexto.operadores
+    contagem = {op.id: contexto.sobreavisos.get(op.id, 0) for op in operadores}
+    disponibilidade = contexto.disponibilidade
+
+    planos = []
+
+    for data in datas:
+        plano = PlanoEscala(
+            secao=secao,
+            data_inicio=data,
+            data_fim=data,
+            tipo=Escala.Tipo.SOBREAVISO,
+        )
+        turno = plano.adicionar_dia(data, "VERMELHA").adicionar_turno("SOB")
+
+        disponiveis = sorted(
+            (
+                op for op in operadores
+                if disponibilidade.disponivel(op.id, data)
+            ),
+            key=lambda op: (contagem[op.id], op.id),
+        )
+
+        for op in disponiveis[:quantidade]:
+            turno.adicionar(op, tipo="SOB")
+            contagem[op.id] += 1
+
+        planos.append(plano)
+
+    return planos
+
+@instrumentado("criar_sobreavisos_periodo")
+@transaction.atomic
+def criar_sobreavisos_periodo(secao, data_inicio, data_fim, quantidade, criada_por, feriados=()):
+    """
+    Sobreaviso para todo fim de semana e feriado do período.
+    Datas que já começam uma escala da seção (sobreaviso ou a
+    semanal, p.ex. feriado na segunda) são puladas: a constraint
+    escala_unica_por_secao_semana vale para qualquer tipo.
+    """
+    if isinstance(data_inicio, str):
+        data_inicio = parse_date(data_inicio)
+
+    if isinstance(data_fim, str):
+        data_fim = parse_date(data_fim)
+
+    if data_fim < data_inicio:
+        raise ValidationError("Data final antes da inicial.")
+
+    existentes = set(
+        Escala.objects
+        .filter(
+            secao=secao,
+            data_inicio__range=(data_inicio, data_fim),
+        )
+        .values_list("data_inicio", flat=True)
+    )
+
+    datas = [
+        d for d in datas_sobreaviso(data_inicio, data_fim, feriados)
+        if d not in existentes
+    ]
+
+    planos = planejar_sobreavisos(secao, datas, quantidade)
+
+    # 💾 escalas, dias, turnos e alocações: um INSERT por tabela
+    return gravar_planos(planos, criada_por)
+
@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from escalas.benchmark import (
+    rodar_benchmarks,
+    carregar_baseline,
+    comparar,
+)
+
+
+CENARIOS = {
+    "gerar_escala_semanal_DIN",
+    "gerar_escala_semanal_SEM",
+    "encerrar_escala",
+    "criar_sobreaviso_service",
+}
+
+
+@pytest.mark.django_db
+def test_benchmark_mede_todos_os_cenarios():
+    from escalas.models import Escala
+
+    resultados = rodar_benchmarks(tamanhos=(10,))
+
+    assert set(resultados["10"]) == CENARIOS
+
+    for metricas in resultados["10"].values():
+        assert metricas["segundos"] > 0
+        assert metricas["queries"] > 0
+        assert metricas["pico_memoria_kb"] > 0
+
+    # seção sintética é desfeita no final
+    assert not Escala.objects.exists()
+
+
+def test_comparar_aponta_regressoes():
+    base = {"10": {"encerrar_escala": {"segundos": 1.0, "queries": 5, "pico_memoria_kb": 100}}}
+
+    dentro = {"10": {"encerrar_escala": {"segundos": 1.2, "queries": 5, "pico_memoria_kb": 110}}}
+    assert comparar(dentro, base, tolerancia=0.25) == []
+
+    pior = {"10": {"encerrar_escala": {"segundos": 2.0, "queries": 6, "pico_memoria_kb": 100}}}
+    regressoes = comparar(pior, base, tolerancia=0.25)
+
+    assert len(regressoes) == 2
+    assert any("queries" in r for r in regressoes)
+    assert any("segundos" in r for r in regressoes)
+
+
+@pytest.mark.django_db
+@pytest.mark.skipif(
+    not os.environ.get("ESCALA_BENCHMARK"),
+    reason="benchmark completo: defina ESCALA_BENCHMARK=1",
+)
+def test_benchmark_sem_regressao():
+    baseline = carregar_baseline()
+
+    if baseline is None:
+        pytest.skip("sem baseline (manage.py benchmark_escalas --salvar)")
+
+    resultados = rodar_benchmarks(tamanhos=[int(t) for t in baseline])
+
+    assert comparar(resultados, baseline) == []
@@ -3,9 +3,14 @@ from datetime import date, timedelta
 from collections import Counter
 
 from accounts.models import User, CursoOperacional, Curso
-from escalas.models import Escala
+from escalas.models import Escala, AlocacaoEscala
 from projetos.models import Projeto, Secao
-from escalas.services import gerar_escala_semanal, encerrar_escala, criar_sobreaviso_service
+from escalas.services import (
+    gerar_escala_semanal,
+    gerar_escalas_periodo,
+    encerrar_escala,
+    criar_sobreaviso_service,
+)
 
 # =========================
 # FIXTURES
@@ -175,4 +180,1070 @@ def test_substituicao_por_indisponibilidade(secao, admin_user, criar_operadores)
             # pode ser diferente nesse dia
             continue
 
-        assert ops_dia == operadores_por_dia[0][1]
\ No newline at end of file
+        assert ops_dia == operadores_por_dia[0][1]
+
+@pytest.mark.django_db
+def test_indisponibilidade_consultada_uma_vez_por_semana(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from indisponibilidades.models import Indisponibilidade
+
+    ops = criar_operadores(8)
+
+    Indisponibilidade.objects.create(
+        usuario=ops[0],
+        data_inicio=date(2026, 1, 6),
+        data_fim=date(2026, 1, 8),
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        escala = gerar_escala_semanal(
+            secao=secao,
+            data_inicio=date(2026, 1, 5),
+            criada_por=admin_user,
+            qtd_madrugada=0,
+            qtd_noturno=2,
+            modo="DIN"
+        )
+
+    consultas = [
+        q["sql"] for q in ctx.captured_queries
+        if "indisponibilidades_indisponibilidade" in q["sql"]
+    ]
+
+    assert len(consultas) == 1
+
+    for dia in escala.dias.filter(data__range=(date(2026, 1, 6), date(2026, 1, 8))):
+        for turno in dia.turnos.all():
+            assert not turno.alocacoes.filter(usuario=ops[0]).exists()
+
+
+@pytest.mark.django_db
+def test_cursos_consultados_uma_vez_por_geracao(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    criar_operadores(8)
+
+    with CaptureQueriesContext(connection) as ctx:
+        gerar_escala_semanal(
+            secao=secao,
+            data_inicio=date(2026, 1, 5),
+            criada_por=admin_user,
+            qtd_madrugada=0,
+            qtd_noturno=2,
+            modo="SEM"
+        )
+
+    consultas = [
+        q["sql"] for q in ctx.captured_queries
+        if "accounts_user_cursos" in q["sql"]
+        and "escalas_alocacaoescala" not in q["sql"]
+    ]
+
+    assert len(consultas) == 1
+
+
+@pytest.mark.django_db
+def test_geracao_grava_em_lote(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from pontuacao.models import Pontuacao
+
+    criar_operadores(10)
+
+    with CaptureQueriesContext(connection) as ctx:
+        escala = gerar_escala_semanal(
+            secao=secao,
+            data_inicio=date(2026, 1, 5),
+            criada_por=admin_user,
+            qtd_madrugada=0,
+            qtd_noturno=2,
+            modo="DIN"
+        )
+
+    inserts = [
+        q["sql"] for q in ctx.captured_queries
+        if q["sql"].startswith("INSERT")
+    ]
+
+    # escala, dias, turnos, alocações, pontuações, contadores
+    assert len(inserts) == 6
+
+    titulares = AlocacaoEscala.objects.filter(
+        turno__dia__escala=escala, tipo="TIT"
+    ).count()
+    assert titulares == 5 * 2
+    assert Pontuacao.objects.filter(alocacao__turno__dia__escala=escala).count() == titulares
+
+
+def test_fila_fair_escolhe_menor_carga_e_respeita_elegibilidade():
+    from types import SimpleNamespace
+    from escalas.fairness import FilaFair
+    from escalas.indices import (
+        CapacidadesOperadores, IndiceDisponibilidade, CAP_MANUTENCAO
+    )
+    from escalas.plano import PlanoDia
+
+    ops = [SimpleNamespace(id=i) for i in range(1, 6)]
+    stats = {
+        1: {"total": 3, "preta": 3, "amarela": 0},
+        2: {"total": 0, "preta": 0, "amarela": 0},
+        3: {"total": 1, "preta": 0, "amarela": 1},
+    }
+    capacidades = CapacidadesOperadores(
+        {op.id: 0 if op.id == 4 else CAP_MANUTENCAO for op in ops}
+    )
+
+    disponibilidade = IndiceDisponibilidade(date(2026, 1, 5), date(2026, 1, 11))
+    fila = FilaFair(ops, stats)
+    turno = PlanoDia(data=date(2026, 1, 5), tipo_dia="PRETA").adicionar_turno("NOT")
+
+    # 4 e 5 têm carga zero, mas 4 não tem curso
+    escolhidos = [
+        fila.puxar(
+            date(2026, 1, 5), turno, {5},
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+        ).id
+        for _ in range(3)
+    ]
+
+    assert escolhidos == [2, 3, 2]
+    assert stats[2]["total"] == 2
+    assert stats[2]["preta"] == 2
+
+
+@pytest.mark.django_db
+def test_contadores_materializados_acompanham_alocacoes(secao, admin_user, criar_operadores):
+    from django.utils import timezone
+    from escalas.contadores import recalcular_contadores_escala, semana_de
+    from escalas.fairness import calcular_stats
+    from escalas.models import ContadorFairness
+
+    criar_operadores(6)
+
+    inicio = semana_de(timezone.now().date())
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=inicio,
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+        modo="DIN"
+    )
+
+    stats = calcular_stats(secao)
+    assert sum(d["total"] for d in stats.values()) == 5 * 2
+    assert sum(d["amarela"] for d in stats.values()) == 2
+
+    # edição manual: recálculo da semana bate com as alocações
+    AlocacaoEscala.objects.filter(
+        turno__dia__escala=escala, tipo="TIT", turno__dia__tipo_dia="AMARELA"
+    ).delete()
+    recalcular_contadores_escala(escala)
+
+    stats = calcular_stats(secao)
+    assert sum(d["total"] for d in stats.values()) == 4 * 2
+    assert sum(d["amarela"] for d in stats.values()) == 0
+    assert ContadorFairness.objects.filter(secao=secao, semana=inicio).count() > 0
+
+
+@pytest.mark.django_db
+def test_admin_de_alocacoes_mantem_contadores(secao, admin_user, criar_operadores):
+    from django.contrib import admin
+    from escalas.admin import AlocacaoEscalaAdmin, EscalaAdmin
+    from escalas.fairness import calcular_stats
+
+    ops = criar_operadores(6)
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+    )
+
+    def titularidades():
+        return {
+            u: d["total"]
+            for u, d in calcular_stats(secao, dias=3650).items()
+            if d["total"]
+        }
+
+    def esperado():
+        return dict(Counter(
+            AlocacaoEscala.objects
+            .filter(turno__dia__escala__secao=secao, tipo="TIT")
+            .values_list("usuario_id", flat=True)
+        ))
+
+    alocacoes = AlocacaoEscalaAdmin(AlocacaoEscala, admin.site)
+
+    # edição: troca o titular
+    alocacao = AlocacaoEscala.objects.filter(turno__dia__escala=escala, tipo="TIT").first()
+    alocacao.usuario = next(
+        op for op in ops
+        if not AlocacaoEscala.objects.filter(usuario=op, turno__dia=alocacao.turno.dia).exists()
+    )
+    alocacoes.save_model(None, alocacao, None, change=True)
+    assert titularidades() == esperado()
+
+    # delete (um e em lote)
+    alocacoes.delete_model(None, alocacao)
+    assert titularidades() == esperado()
+
+    alocacoes.delete_queryset(
+        None, AlocacaoEscala.objects.filter(turno__dia__escala=escala, turno__dia__data=date(2026, 1, 6))
+    )
+    assert titularidades() == esperado()
+
+    # apagar a escala zera a semana
+    EscalaAdmin(Escala, admin.site).delete_model(None, escala)
+    assert titularidades() == {}
+
+
+@pytest.mark.django_db
+def test_gerar_varias_semanas_em_lote(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    criar_operadores(10)
+
+    with CaptureQueriesContext(connection) as ctx:
+        escalas = gerar_escalas_periodo(
+            secao=secao,
+            data_inicio=date(2026, 1, 5),
+            semanas=4,
+            criada_por=admin_user,
+            qtd_madrugada=0,
+            qtd_noturno=2,
+            modo="DIN"
+        )
+
+    assert [e.data_inicio for e in escalas] == [
+        date(2026, 1, 5) + timedelta(days=7 * i) for i in range(4)
+    ]
+
+    inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+    assert len(inserts) == 6
+
+    # estado carregado entre semanas → carga distribuída no mês
+    contagem = Counter(
+        AlocacaoEscala.objects
+        .filter(turno__dia__escala__in=escalas, tipo="TIT")
+        .values_list("usuario_id", flat=True)
+    )
+    assert max(contagem.values()) - min(contagem.values()) <= 1
+
+
+@pytest.mark.django_db
+def test_comando_gerar_escalas_por_projeto(secao, admin_user, criar_operadores):
+    from io import StringIO
+    from django.core.management import call_command
+    from django.core.management.base import CommandError
+
+    criar_operadores(6)
+
+    saida = StringIO()
+    call_command(
+        "gerar_escalas",
+        projeto=str(secao.projeto_id),
+        semana=date(2026, 1, 5),
+        usuario=admin_user.username,
+        processos=1,
+        stdout=saida,
+    )
+
+    assert Escala.objects.filter(secao=secao, data_inicio=date(2026, 1, 5)).exists()
+    assert "1/1 seções geradas" in saida.getvalue()
+
+    # seção inexistente vira falha no relatório, não exceção
+    from escalas.paralelo import gerar_secao
+
+    r = gerar_secao(0, date(2026, 1, 12), 1, admin_user.id, 0, 2, "DIN")
+    assert r["erro"] and r["escalas"] == 0
+
+    with pytest.raises(CommandError, match="segunda-feira"):
+        call_command(
+            "gerar_escalas",
+            projeto=str(secao.projeto_id),
+            semana=date(2026, 1, 6),
+            usuario=admin_user.username,
+            processos=1,
+        )
+
+
+@pytest.mark.django_db
+def test_modo_otimo_preenche_semana(secao, admin_user, criar_operadores):
+    criar_operadores(8)
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+        modo="OPT"
+    )
+
+    alocacoes = AlocacaoEscala.objects.filter(turno__dia__escala=escala)
+
+    assert alocacoes.filter(tipo="TIT").count() == 5 * 2
+    # só há reserva com curso para o noturno
+    assert alocacoes.filter(tipo="RES").count() == 5
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("modo", ["DIN", "SEM"])
+def test_geracao_dentro_do_orcamento_de_queries(settings, secao, admin_user, criar_operadores, modo):
+    from escalas.instrumentacao import ORCAMENTOS, medir_queries
+
+    settings.ESCALA_ORCAMENTO_ESTRITO = True
+
+    criar_operadores(30)
+
+    # instrumentado → levanta OrcamentoExcedido se estourar
+    with medir_queries("teste") as m:
+        escala = gerar_escala_semanal(
+            secao=secao,
+            data_inicio=date(2026, 1, 5),
+            criada_por=admin_user,
+            qtd_madrugada=0,
+            qtd_noturno=2,
+            modo=modo
+        )
+
+    assert m.queries <= ORCAMENTOS["gerar_escala_semanal"]
+
+    escala.status = Escala.Status.PUBLICADA
+    escala.save()
+    encerrar_escala(escala, admin_user)
+
+    criar_sobreaviso_service(secao, date(2026, 1, 10), 2, admin_user)
+
+
+@pytest.mark.django_db
+def test_permuta_direta_dentro_do_orcamento(settings, secao, admin_user, criar_operadores):
+    from permutas.models import Permuta
+    from permutas.services import executar_permuta_direta
+
+    settings.ESCALA_ORCAMENTO_ESTRITO = True
+
+    criar_operadores(6)
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+        modo="DIN"
+    )
+
+    origem, destino = (
+        AlocacaoEscala.objects
+        .filter(turno__dia__escala=escala, turno__dia__data=date(2026, 1, 5))
+        .order_by("id")[:2]
+    )
+
+    permuta = Permuta.objects.create(
+        solicitante=origem.usuario,
+        tipo="DIRETA",
+        alocacao_origem=origem,
+        alocacao_destino=destino,
+    )
+
+    executar_permuta_direta(permuta)
+
+
+@pytest.mark.django_db
+def test_medir_queries_aponta_repetidas_e_orcamento(settings, secao, criar_operadores):
+    from escalas.instrumentacao import medir_queries, OrcamentoExcedido
+
+    settings.ESCALA_ORCAMENTO_ESTRITO = True
+    settings.ESCALA_ORCAMENTOS_QUERIES = {"n_mais_um": 3}
+
+    ops = criar_operadores(5)
+
+    with pytest.raises(OrcamentoExcedido):
+        with medir_queries("n_mais_um") as m:
+            for op in ops:
+                list(op.cursos.all())
+
+    assert m.queries == 5
+    assert list(m.duplicadas.values()) == [5]
+    assert m.segundos >= m.sql_segundos > 0
+
+
+@pytest.mark.django_db
+def test_medir_queries_publica_chamada_que_falhou(settings, caplog, secao, criar_operadores):
+    from escalas.instrumentacao import medir_queries
+
+    settings.ESCALA_ORCAMENTO_ESTRITO = True
+    settings.ESCALA_ORCAMENTOS_QUERIES = {"falha": 1}
+
+    ops = criar_operadores(3)
+
+    # a exceção do serviço passa; o orçamento estourado só vai pro log
+    with caplog.at_level("INFO", logger="escalas.instrumentacao"):
+        with pytest.raises(ZeroDivisionError):
+            with medir_queries("falha") as m:
+                for op in ops:
+                    list(op.cursos.all())
+                1 / 0
+
+    assert m.erro == "ZeroDivisionError"
+    assert m.queries == 3 and m.segundos > 0
+    assert caplog.records[-1].medicao["erro"] == "ZeroDivisionError"
+
+
+@pytest.mark.django_db
+def test_noturno_validado_sem_consultar_alocacoes(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    criar_operadores(8)
+
+    with CaptureQueriesContext(connection) as ctx:
+        gerar_escala_semanal(
+            secao=secao,
+            data_inicio=date(2026, 1, 5),
+            criada_por=admin_user,
+            qtd_madrugada=0,
+            qtd_noturno=2,
+            modo="DIN"
+        )
+
+    leituras = [
+        q["sql"] for q in ctx.captured_queries
+        if q["sql"].startswith("SELECT") and "escalas_alocacaoescala" in q["sql"]
+    ]
+
+    assert leituras == []
+
+
+@pytest.mark.django_db
+def test_clean_exige_habilitado_no_noturno(secao, admin_user, criar_operadores):
+    from django.core.exceptions import ValidationError
+    from escalas.models import DiaEscala, TurnoEscala
+
+    habilitado = criar_operadores(1)[0]
+    sem_curso = User.objects.create_user(
+        username="semcurso", password="123", secao=secao, papel=User.Papel.OPERADOR
+    )
+
+    escala = Escala.objects.create(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        data_fim=date(2026, 1, 11),
+        criada_por=admin_user,
+    )
+    dia = DiaEscala.objects.create(escala=escala, data=date(2026, 1, 5), tipo_dia="PRETA")
+    turno = TurnoEscala.objects.create(dia=dia, turno="NOT")
+
+    with pytest.raises(ValidationError):
+        AlocacaoEscala(turno=turno, usuario=sem_curso, data=dia.data).clean()
+
+    AlocacaoEscala.objects.create(turno=turno, usuario=habilitado, data=dia.data)
+
+    # já existe habilitado → qualquer um entra
+    AlocacaoEscala(turno=turno, usuario=sem_curso, data=dia.data).clean()
+
+
+@pytest.mark.django_db
+def test_geracao_com_busca_local(secao, admin_user, criar_operadores):
+    criar_operadores(12)
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+        modo="DIN",
+        melhorar_ms=50,
+    )
+
+    alocacoes = AlocacaoEscala.objects.filter(turno__dia__escala=escala)
+    assert alocacoes.filter(tipo="TIT").count() == 5 * 2
+
+    por_dia = Counter(alocacoes.values_list("data", "usuario_id"))
+    assert max(por_dia.values()) == 1
+
+    contagem = Counter(alocacoes.filter(tipo="TIT").values_list("usuario_id", flat=True))
+    assert max(contagem.values()) == 1
+
+
+@pytest.mark.django_db
+def test_reparo_incremental_por_indisponibilidade(settings, secao, admin_user, criar_operadores):
+    from django.core.exceptions import ValidationError
+    from indisponibilidades.models import Indisponibilidade
+    from pontuacao.models import Pontuacao
+    from escalas.fairness import calcular_stats
+    from escalas.reparo import planejar_reparo, aplicar_reparo
+
+    settings.ESCALA_ORCAMENTO_ESTRITO = True
+
+    criar_operadores(8)
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+        modo="DIN"
+    )
+
+    alvo = (
+        AlocacaoEscala.objects
+        .filter(turno__dia__escala=escala, data=date(2026, 1, 6), tipo="TIT")
+        .order_by("id")
+        .first()
+        .usuario
+    )
+
+    antes = set(
+        AlocacaoEscala.objects
+        .exclude(data__range=(date(2026, 1, 6), date(2026, 1, 7)))
+        .values_list("id", "usuario_id")
+    )
+
+    indisp = Indisponibilidade.objects.create(
+        usuario=alvo,
+        data_inicio=date(2026, 1, 6),
+        data_fim=date(2026, 1, 7),
+        motivo=Indisponibilidade.Motivo.MEDICA,
+    )
+
+    substituicoes = planejar_reparo(indisp)
+
+    afetadas = AlocacaoEscala.objects.filter(
+        usuario=alvo, data__range=(date(2026, 1, 6), date(2026, 1, 7))
+    )
+    assert {s.alocacao_id for s in substituicoes} == set(afetadas.values_list("id", flat=True))
+    assert all(s.entra and s.entra.id != alvo.id for s in substituicoes)
+
+    # prévia não grava nada
+    assert afetadas.exists()
+
+    aplicar_reparo([s.chave() for s in substituicoes])
+
+    assert not afetadas.exists()
+
+    # resto da semana intacto
+    assert antes <= set(AlocacaoEscala.objects.values_list("id", "usuario_id"))
+
+    # um turno por dia continua valendo
+    por_dia = Counter(
+        AlocacaoEscala.objects
+        .filter(turno__dia__escala=escala)
+        .values_list("data", "usuario_id")
+    )
+    assert max(por_dia.values()) == 1
+
+    # pontuação e contadores acompanham quem assumiu
+    titulares = [s for s in substituicoes if s.tipo == "TIT"]
+    for s in titulares:
+        assert Pontuacao.objects.get(alocacao_id=s.alocacao_id).usuario_id == s.entra.id
+
+    assert sum(d["total"] for d in calcular_stats(secao, dias=3650).values()) == 5 * 2
+
+    # diff velho não é reaplicado
+    with pytest.raises(ValidationError):
+        aplicar_reparo([s.chave() for s in substituicoes])
+
+
+@pytest.mark.django_db
+def test_reparo_de_turno_editado_a_mao_revalida_quem_entra(secao, admin_user, criar_operadores):
+    from django.core.exceptions import ValidationError
+    from indisponibilidades.models import Indisponibilidade
+    from escalas.models import TurnoEscala
+    from escalas.reparo import alocacoes_afetadas, planejar_reparo, aplicar_reparo
+
+    ops = criar_operadores(8)
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+    )
+
+    # como editar_turno: alocações recriadas sem `data`
+    turno = TurnoEscala.objects.get(dia__escala=escala, dia__data=date(2026, 1, 6), turno="NOT")
+    usados = set(
+        AlocacaoEscala.objects
+        .filter(turno__dia__escala=escala, turno__dia__data=date(2026, 1, 6))
+        .exclude(turno=turno)
+        .values_list("usuario_id", flat=True)
+    )
+    livres = [op for op in ops if op.id not in usados]
+
+    turno.alocacoes.all().delete()
+    for op in livres[:2]:
+        AlocacaoEscala.objects.create(turno=turno, usuario=op, tipo="TIT")
+
+    alvo = livres[0]
+
+    indisp = Indisponibilidade.objects.create(
+        usuario=alvo,
+        data_inicio=date(2026, 1, 6),
+        data_fim=date(2026, 1, 6),
+        motivo=Indisponibilidade.Motivo.MEDICA,
+    )
+
+    assert alocacoes_afetadas(indisp).count() == 1
+
+    [substituicao] = planejar_reparo(indisp)
+    assert substituicao.data == date(2026, 1, 6)
+    assert substituicao.entra is not None
+
+    # quem entra registrou ausência depois da prévia → nada é gravado
+    Indisponibilidade.objects.create(
+        usuario_id=substituicao.entra.id,
+        data_inicio=date(2026, 1, 6),
+        data_fim=date(2026, 1, 6),
+        motivo=Indisponibilidade.Motivo.FOLGA,
+    )
+
+    with pytest.raises(ValidationError, match="mudou desde a prévia"):
+        aplicar_reparo([substituicao.chave()])
+
+    assert alocacoes_afetadas(indisp).count() == 1
+
+
+@pytest.mark.django_db
+def test_sobreaviso_em_periodo_com_rodizio(settings, secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from indisponibilidades.models import Indisponibilidade
+    from escalas.services import criar_sobreavisos_periodo
+
+    settings.ESCALA_ORCAMENTO_ESTRITO = True
+
+    ops = criar_operadores(6)
+
+    # sábado 10/01 ocupado por indisponibilidade de ops[0]
+    Indisponibilidade.objects.create(
+        usuario=ops[0],
+        data_inicio=date(2026, 1, 10),
+        data_fim=date(2026, 1, 10),
+        motivo=Indisponibilidade.Motivo.FOLGA,
+    )
+
+    with CaptureQueriesContext(connection) as ctx:
+        escalas = criar_sobreavisos_periodo(
+            secao,
+            date(2026, 1, 5),
+            date(2026, 1, 25),
+            2,
+            admin_user,
+            feriados=[date(2026, 1, 20)],
+        )
+
+    assert sorted(e.data_inicio for e in escalas) == [
+        date(2026, 1, 10), date(2026, 1, 11),
+        date(2026, 1, 17), date(2026, 1, 18),
+        date(2026, 1, 20),
+        date(2026, 1, 24), date(2026, 1, 25),
+    ]
+    assert all(e.tipo == Escala.Tipo.SOBREAVISO for e in escalas)
+
+    inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+    assert len(inserts) == 4
+
+    sob = AlocacaoEscala.objects.filter(tipo="SOB")
+    assert sob.count() == 7 * 2
+    assert not sob.filter(usuario=ops[0], data=date(2026, 1, 10)).exists()
+
+    contagem = Counter(sob.values_list("usuario_id", flat=True))
+    assert max(contagem.values()) - min(contagem.values()) <= 1
+
+    # rodar de novo não duplica datas
+    assert criar_sobreavisos_periodo(
+        secao, date(2026, 1, 5), date(2026, 1, 25), 2, admin_user
+    ) == []
+
+
+@pytest.mark.django_db
+def test_sobreaviso_pula_feriado_na_segunda_com_escala_semanal(secao, admin_user, criar_operadores):
+    from escalas.services import criar_sobreavisos_periodo
+
+    criar_operadores(6)
+
+    semanal = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 12),
+        criada_por=admin_user,
+        qtd_madrugada=0,
+        qtd_noturno=2,
+    )
+
+    # feriado na segunda 12/01 = data_inicio da escala semanal
+    escalas = criar_sobreavisos_periodo(
+        secao,
+        date(2026, 1, 10),
+        date(2026, 1, 12),
+        1,
+        admin_user,
+        feriados=[date(2026, 1, 12)],
+    )
+
+    assert sorted(e.data_inicio for e in escalas) == [date(2026, 1, 10), date(2026, 1, 11)]
+    assert Escala.objects.get(secao=secao, data_inicio=date(2026, 1, 12)) == semanal
+
+
+@pytest.mark.django_db
+def test_escala_fixa_com_queries_constantes(secao, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from indisponibilidades.models import Indisponibilidade
+    from escalas.plano import montar_plano_semanal
+    from escalas.services import gerar_escala_semanal_fixa, TURNOS_PADRAO
+
+    def contar(qtd, prefixo):
+        ops = criar_operadores(qtd, prefixo=prefixo)
+        Indisponibilidade.objects.create(
+            usuario=ops[0],
+            data_inicio=date(2026, 1, 6),
+            data_fim=date(2026, 1, 8),
+        )
+
+        plano = montar_plano_semanal(secao, date(2026, 1, 5), TURNOS_PADRAO)
+
+        with CaptureQueriesContext(connection) as ctx:
+            gerar_escala_semanal_fixa(
+                plano.dias, secao,
+                qtd_operadores_semana=6,
+                qtd_madrugada=0,
+                qtd_noturno=2,
+                operadores=ops,
+                stats={},
+            )
+
+        for dia, turno in plano.turnos():
+            if date(2026, 1, 6) <= dia.data <= date(2026, 1, 8):
+                assert ops[0].id not in turno.usuarios_ids()
+
+        return len(ctx.captured_queries)
+
+    assert contar(8, "a") == contar(40, "b")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("modo", ["DIN", "SEM", "OPT"])
+def test_seed_regenera_a_mesma_semana(secao, admin_user, criar_operadores, modo):
+    from escalas.services import planejar_escala_semanal
+
+    criar_operadores(10)
+
+    def escolhas(plano):
+        return sorted(
+            (dia.data, turno.turno, a.tipo, a.usuario.id)
+            for dia, turno in plano.turnos()
+            for a in turno.alocacoes
+        )
+
+    # sem seed → sorteia uma e guarda no plano
+    sorteado = planejar_escala_semanal(secao, date(2026, 1, 5), 1, 2, modo=modo)
+    assert sorteado.seed is not None
+
+    repetido = planejar_escala_semanal(
+        secao, date(2026, 1, 5), 1, 2, modo=modo, seed=sorteado.seed
+    )
+    assert escolhas(repetido) == escolhas(sorteado)
+
+    escala = gerar_escala_semanal(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        criada_por=admin_user,
+        qtd_madrugada=1,
+        qtd_noturno=2,
+        modo=modo,
+        seed=sorteado.seed,
+    )
+
+    assert escala.seed == sorteado.seed
+
+    gravadas = sorted(
+        AlocacaoEscala.objects
+        .filter(turno__dia__escala=escala)
+        .values_list("data", "turno__turno", "tipo", "usuario_id")
+    )
+
+    assert gravadas == escolhas(sorteado)
+
+
+@pytest.mark.django_db
+def test_previa_nao_grava_e_confirmar_grava_o_mesmo_plano(
+    secao, admin_user, criar_operadores, django_capture_on_commit_callbacks
+):
+    from django.core.exceptions import ValidationError
+    from escalas.previa import gerar_previa, confirmar_previa
+
+    criar_operadores(10)
+
+    def propostas(planos):
+        return sorted(
+            (dia.data, turno.turno, a.tipo, a.usuario.id)
+            for plano in planos
+            for dia, turno in plano.turnos()
+            for a in turno.alocacoes
+        )
+
+    chave, planos = gerar_previa(
+        secao, date(2026, 1, 5), qtd_madrugada=1, qtd_noturno=2,
+        semanas=2, seed=99,
+    )
+
+    assert not Escala.objects.exists()
+
+    # no banco (DatabaseCache), não na memória do worker que gerou
+    from django.core.cache import caches
+    from django.db import connection
+
+    tabela = caches["previas"]._table
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {tabela}")
+        assert cursor.fetchone()[0] == 1
+
+    # mesmos parâmetros + mesma seed → mesma chave, plano do cache
+    mesma, do_cache = gerar_previa(
+        secao, date(2026, 1, 5), qtd_madrugada=1, qtd_noturno=2,
+        semanas=2, seed=99,
+    )
+    assert mesma == chave
+    assert propostas(do_cache) == propostas(planos)
+
+    with django_capture_on_commit_callbacks(execute=True):
+        escalas = confirmar_previa(chave, secao, admin_user)
+
+    assert len(escalas) == 2
+
+    gravadas = sorted(
+        AlocacaoEscala.objects
+        .filter(turno__dia__escala__secao=secao)
+        .values_list("data", "turno__turno", "tipo", "usuario_id")
+    )
+    assert gravadas == propostas(planos)
+
+    # já confirmada → expirou
+    with pytest.raises(ValidationError):
+        confirmar_previa(chave, secao, admin_user)
+
+
+@pytest.mark.django_db
+def test_participacao_recente_em_uma_query(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from escalas.contadores import participacao_recente
+
+    criar_operadores(10)
+
+    gerar_escalas_periodo(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        semanas=4,
+        criada_por=admin_user,
+        qtd_madrugada=1,
+        qtd_noturno=2,
+    )
+
+    hoje = date(2026, 2, 4)  # quarta da semana seguinte à última gerada
+
+    with CaptureQueriesContext(connection) as ctx:
+        participacao = participacao_recente(secao, semanas=3, hoje=hoje)
+
+    assert len(ctx.captured_queries) == 1
+
+    def titulares(**filtro):
+        return AlocacaoEscala.objects.filter(
+            turno__dia__escala__secao=secao, tipo="TIT", **filtro
+        )
+
+    # bloqueados: escalas que começaram há menos de uma semana
+    assert participacao.bloqueados == set(
+        titulares(turno__dia__escala__data_inicio__gte=hoje - timedelta(days=7))
+        .values_list("usuario_id", flat=True)
+    )
+
+    # participação: semanas (escalas) com titularidade na janela
+    esperado = Counter(
+        usuario_id for usuario_id, _ in
+        titulares(turno__dia__data__gte=date(2026, 1, 12))
+        .values_list("usuario_id", "turno__dia__escala")
+        .distinct()
+    )
+    assert participacao.semanas == dict(esperado)
+
+
+@pytest.mark.django_db
+def test_contexto_traz_titulares_recentes(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from escalas.contadores import participacao_recente
+    from escalas.contexto import ContextoGeracao
+    from escalas.plano import gravar_plano
+    from escalas.services import planejar_escala_semanal
+
+    criar_operadores(10)
+
+    gerar_escalas_periodo(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        semanas=4,
+        criada_por=admin_user,
+        qtd_madrugada=1,
+        qtd_noturno=2,
+    )
+
+    inicio = date(2026, 2, 2)
+
+    with CaptureQueriesContext(connection) as ctx:
+        contexto = ContextoGeracao.carregar(secao, inicio, inicio + timedelta(days=6))
+    carga = len(ctx.captured_queries)
+
+    for semanas in (3, 8):
+        assert contexto.participacao(inicio, semanas=semanas) == participacao_recente(
+            secao, semanas=semanas, hoje=inicio
+        )
+
+    # semana planejada entra no recente antes de ser gravada
+    plano = planejar_escala_semanal(secao, inicio, 1, 2, contexto=contexto, seed=5)
+    contexto.acumular(plano)
+    gravar_plano(plano, admin_user)
+
+    seguinte = inicio + timedelta(days=7)
+    assert contexto.participacao(seguinte) == participacao_recente(secao, hoje=seguinte)
+
+    # operadores (2), stats, indisponibilidades e titulares recentes
+    assert carga == 5
+
+
+@pytest.mark.django_db
+def test_fila_ia_em_uma_query(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from pontuacao.models import Pontuacao
+    from escalas.ia.runtime import carregar_parametros_ia, fila_operadores_com_ia
+
+    ops = criar_operadores(8)
+
+    gerar_escalas_periodo(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        semanas=2,
+        criada_por=admin_user,
+        qtd_madrugada=1,
+        qtd_noturno=2,
+    )
+
+    Pontuacao.objects.create(usuario=ops[0], tipo="AMARELA", pontos=2)
+    Pontuacao.objects.create(usuario=ops[1], pontos=-3)
+
+    params = carregar_parametros_ia(secao)
+
+    with CaptureQueriesContext(connection) as ctx:
+        fila = fila_operadores_com_ia(secao)
+
+    assert len(ctx.captured_queries) == 1
+
+    def score(u):
+        pontos = sum(u.pontuacoes.values_list("pontos", flat=True))
+        amarelas = u.pontuacoes.filter(tipo="AMARELA").count()
+        sobreavisos = u.alocacoes.filter(tipo="SOB").count()
+
+        return (
+            pontos * params.peso_pontos +
+            amarelas * params.peso_amarelas +
+            sobreavisos * params.peso_sobreaviso
+        )
+
+    assert [u.id for u in fila] == [u.id for u in sorted(ops, key=lambda u: (score(u), u.id))]
+
+
+@pytest.mark.django_db
+def test_historico_secao_em_janela_e_memorizado(secao, admin_user, criar_operadores):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from escalas.models import TurnoEscala
+    from escalas.ia.adapters import carregar_historico_secao
+
+    ops = criar_operadores(6)
+
+    gerar_escalas_periodo(
+        secao=secao,
+        data_inicio=date(2026, 1, 5),
+        semanas=3,
+        criada_por=admin_user,
+        qtd_madrugada=1,
+        qtd_noturno=2,
+    )
+
+    hoje = date(2026, 1, 26)
+
+    def esperado(desde):
+        mapa = {}
+        for a in AlocacaoEscala.objects.filter(
+            usuario__secao=secao, turno__dia__data__gte=desde
+        ).select_related("turno__dia"):
+            tipo = "SOB_ATIVO" if a.turno.turno == "SOB" and a.foi_acionado else a.turno.turno
+            mapa.setdefault(a.usuario_id, []).append((a.turno.dia.data, tipo))
+        return {uid: sorted(p) for uid, p in mapa.items()}
+
+    def obtido(usuarios):
+        return {u.user_id: sorted((p.data, p.tipo) for p in u.plantoes) for u in usuarios}
+
+    completo = carregar_historico_secao(secao)
+    janela = carregar_historico_secao(secao, janela_dias=10, hoje=hoje)
+
+    assert obtido(completo) == esperado(date.min)
+    assert obtido(janela) == esperado(hoje - timedelta(days=10))
+    assert sum(len(u.plantoes) for u in janela) < sum(len(u.plantoes) for u in completo)
+
+    # memorizado: só a query de versão até chegar alocação nova
+    primeira = carregar_historico_secao(secao, janela_dias=30, hoje=hoje, memorizar=True)
+
+    with CaptureQueriesContext(connection) as ctx:
+        assert carregar_historico_secao(secao, janela_dias=30, hoje=hoje, memorizar=True) is primeira
+
+    assert len(ctx.captured_queries) == 1
+
+    # permuta: mesmas alocações, usuários trocados
+    from permutas.models import Permuta
+    from permutas.services import executar_permuta_direta
+
+    origem = AlocacaoEscala.objects.filter(
+        turno__dia__escala__secao=secao, turno__dia__data=date(2026, 1, 19), tipo="TIT"
+    ).first()
+    destino = AlocacaoEscala.objects.filter(
+        turno__dia__escala__secao=secao, turno__dia__data=date(2026, 1, 20), tipo="TIT"
+    ).exclude(usuario=origem.usuario).first()
+
+    executar_permuta_direta(Permuta.objects.create(
+        solicitante=origem.usuario,
+        tipo="DIRETA",
+        alocacao_origem=origem,
+        alocacao_destino=destino,
+    ))
+
+    permutada = carregar_historico_secao(secao, janela_dias=30, hoje=hoje, memorizar=True)
+
+    assert permutada is not primeira
+    assert obtido(permutada) == esperado(hoje - timedelta(days=30))
+    assert obtido(permutada) != obtido(primeira)
+
+    primeira = permutada
+
+    turno = TurnoEscala.objects.filter(dia__escala__secao=secao).first()
+    AlocacaoEscala.objects.create(turno=turno, usuario=ops[0], tipo="RES")
+
+    nova = carregar_historico_secao(secao, janela_dias=30, hoje=hoje, memorizar=True)
+
+    assert nova is not primeira
+    assert sum(len(u.plantoes) for u in nova) == sum(len(u.plantoes) for u in primeira) + 1
@@ -0,0 +1,435 @@
+import pytest
+import random
+from collections import deque
+from datetime import date, timedelta
+from types import SimpleNamespace
+
+from escalas.fairness import puxar_da_fila_fair, puxar_da_fila_fixa
+from escalas.indices import (
+    CapacidadesOperadores, IndiceDisponibilidade, CAP_PISTA, CAP_MANUTENCAO
+)
+from escalas.plano import montar_plano_semanal
+from escalas.vetorizado import PlacarVetorizado
+
+
+INICIO = date(2026, 1, 5)
+
+
+def _cenario(qtd=12):
+    ops = [SimpleNamespace(id=i) for i in range(1, qtd + 1)]
+
+    capacidades = CapacidadesOperadores({
+        op.id: CAP_MANUTENCAO | (CAP_PISTA if op.id % 3 else 0)
+        for op in ops
+    })
+
+    disponibilidade = IndiceDisponibilidade(
+        INICIO,
+        INICIO + timedelta(days=6),
+        {INICIO + timedelta(days=2): {1, 2}, INICIO + timedelta(days=4): {5}},
+    )
+
+    stats = {
+        op.id: {"total": op.id % 4, "preta": op.id % 2, "amarela": 0}
+        for op in ops
+    }
+
+    return ops, capacidades, disponibilidade, stats
+
+
+def _rodar(puxar, fila, capacidades, disponibilidade):
+    plano = montar_plano_semanal(None, INICIO, ["MAD", "NOT"])
+    escolhas = []
+
+    for dia, turno in plano.turnos():
+        usados = set()
+        for _ in range(2):
+            op = puxar(fila, dia.data, turno, usados)
+            if op is None:
+                break
+            usados.add(op.id)
+            turno.adicionar(op, capacidades=capacidades)
+            escolhas.append(op.id)
+
+    return escolhas
+
+
+def test_placar_vetorizado_reproduz_caminho_escalar():
+    ops, capacidades, disponibilidade, stats = _cenario()
+
+    def escalar(fila, data, turno, usados):
+        return puxar_da_fila_fair(
+            fila, data, turno, usados, None,
+            stats=stats_escalar,
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+        )
+
+    stats_escalar = {k: dict(v) for k, v in stats.items()}
+    random.seed(42)
+    esperado = _rodar(escalar, deque(ops), capacidades, disponibilidade)
+
+    stats_vetor = {k: dict(v) for k, v in stats.items()}
+    placar = PlacarVetorizado(ops, stats_vetor)
+    random.seed(42)
+    obtido = _rodar(
+        lambda fila, data, turno, usados: fila.puxar(
+            data, turno, usados, disponibilidade, capacidades
+        ),
+        placar, capacidades, disponibilidade,
+    )
+
+    assert obtido == esperado
+    assert stats_vetor == stats_escalar
+
+
+def test_placar_vetorizado_reproduz_fila_fixa():
+    ops, capacidades, disponibilidade, stats = _cenario()
+
+    def executar(stats_local, semana):
+        return lambda f, data, turno, usados: puxar_da_fila_fixa(
+            f, data, turno, usados, None,
+            stats_local, semana,
+            disponibilidade=disponibilidade,
+            capacidades=capacidades,
+        )
+
+    stats_escalar, semana_escalar = {k: dict(v) for k, v in stats.items()}, {}
+    random.seed(7)
+    esperado = _rodar(
+        executar(stats_escalar, semana_escalar),
+        deque(ops), capacidades, disponibilidade,
+    )
+
+    stats_vetor, semana_vetor = {k: dict(v) for k, v in stats.items()}, {}
+    placar = PlacarVetorizado(ops, stats_vetor, semana_vetor)
+    random.seed(7)
+    obtido = _rodar(
+        executar(stats_vetor, semana_vetor),
+        placar, capacidades, disponibilidade,
+    )
+
+    assert obtido == esperado
+    assert semana_vetor == semana_escalar
+
+
+def test_fluxo_custo_minimo_atribuicao_simples():
+    from escalas.otimo import FluxoCustoMinimo
+
+    g = FluxoCustoMinimo()
+    origem, destino = g.no(), g.no()
+    a, b = g.no(), g.no()
+    x, y = g.no(), g.no()
+
+    g.aresta(origem, a, 1, 0)
+    g.aresta(origem, b, 1, 0)
+    g.aresta(a, x, 1, 1)
+    g.aresta(a, y, 1, 5)
+    g.aresta(b, x, 1, 2)
+    g.aresta(b, y, 1, 10)
+    g.aresta(x, destino, 1, 0)
+    g.aresta(y, destino, 1, 0)
+
+    # a→y (5) + b→x (2) = 7 < a→x (1) + b→y (10)
+    assert g.resolver(origem, destino) == (2, 7)
+
+
+def test_alocar_otimo_respeita_restricoes_e_espalha_carga():
+    from collections import Counter
+    from escalas.otimo import alocar_otimo
+
+    ops, capacidades, disponibilidade, _ = _cenario()
+    plano = montar_plano_semanal(None, INICIO, ["MAD", "NOT"])
+
+    usados = alocar_otimo(
+        plano, ops, {}, lambda turno: 2,
+        disponibilidade, capacidades,
+    )
+
+    carga = Counter()
+
+    for dia, turno in plano.turnos():
+        ids = turno.usuarios_ids()
+        assert len(ids) == 2
+
+        for usuario_id in ids:
+            assert disponibilidade.disponivel(usuario_id, dia.data)
+            assert capacidades.pode_assumir(usuario_id, turno.turno)
+            carga[usuario_id] += 1
+
+        # um turno por dia
+        assert len(usados[dia.data]) == sum(len(t.alocacoes) for t in dia.turnos)
+
+    # 20 vagas para 12 operadores
+    assert max(carga.values()) - min(carga.values()) <= 1
+
+
+def test_plano_acompanha_cobertura_do_noturno():
+    ops, capacidades, _, _ = _cenario()
+    capacidades.mascaras[ops[0].id] = CAP_PISTA  # sem manutenção
+
+    plano = montar_plano_semanal(None, INICIO, ["MAD", "NOT"], vagas={"NOT": 2})
+    turno = plano.dias[0].turnos[1]
+
+    assert (turno.qtd, turno.vagas, turno.precisa_habilitado) == (2, 2, True)
+
+    turno.adicionar(ops[0], capacidades=capacidades)
+    assert turno.vagas == 1
+    assert turno.precisa_habilitado
+
+    turno.adicionar(ops[1], tipo="RES", capacidades=capacidades)
+    assert turno.vagas == 1
+    assert turno.precisa_habilitado
+
+    turno.adicionar(ops[2], capacidades=capacidades)
+    assert turno.vagas == 0
+    assert turno.habilitados == 1
+    assert not turno.precisa_habilitado
+
+
+def test_busca_local_reduz_injustica_sem_violar_restricoes():
+    from escalas.busca_local import Objetivo, melhorar_plano
+    from escalas.ia.autoajuste import avaliar_injustica
+    from escalas.utils import pode_assumir_turno, usuario_disponivel
+
+    ops, capacidades, disponibilidade, _ = _cenario()
+    stats = {}
+
+    # guloso ruim: os mesmos 4 operadores a semana toda
+    plano = montar_plano_semanal(None, INICIO, ["MAD", "NOT"], vagas={"MAD": 1, "NOT": 1})
+    for dia, turno in plano.turnos():
+        usados = {i for t in dia.turnos for i in t.usuarios_ids()}
+        for op in ops[2:6]:
+            if (
+                op.id not in usados
+                and usuario_disponivel(op, dia.data, disponibilidade)
+                and pode_assumir_turno(op, turno.turno, capacidades)
+            ):
+                turno.adicionar(op, capacidades=capacidades)
+                break
+
+    cargas = {op.id: {"total": 0, "preta": 0, "amarela": 0} for op in ops}
+    for dia, turno in plano.turnos():
+        for usuario_id in turno.usuarios_ids():
+            cargas[usuario_id]["total"] += 1
+    assert Objetivo(cargas).valor() == pytest.approx(
+        avaliar_injustica({k: v["total"] for k, v in cargas.items()})
+    )
+
+    random.seed(7)
+    resumo = melhorar_plano(
+        plano, ops, stats, disponibilidade, capacidades, orcamento_ms=100
+    )
+
+    assert resumo["aceitos"] > 0
+    assert resumo["depois"] < resumo["antes"]
+
+    for dia in plano.dias:
+        ids = [i for t in dia.turnos for i in t.usuarios_ids()]
+        assert len(ids) == len(set(ids))
+
+        for turno in dia.turnos:
+            assert turno.titulares == turno.qtd
+            assert not turno.precisa_habilitado
+            for a in turno.alocacoes:
+                assert usuario_disponivel(a.usuario, dia.data, disponibilidade)
+                assert pode_assumir_turno(a.usuario, turno.turno, capacidades)
+
+
+def test_matriz_elegibilidade_reproduz_checagem_escalar():
+    from escalas.elegibilidade import MatrizElegibilidade
+    from escalas.fairness import candidato_valido
+
+    ops, capacidades, disponibilidade, stats = _cenario()
+    plano = montar_plano_semanal(None, INICIO, ["MAD", "NOT"])
+
+    matriz = MatrizElegibilidade.montar(
+        [dia.data for dia in plano.dias], ["MAD", "NOT"],
+        ops, disponibilidade, capacidades,
+    )
+
+    assert matriz.matriz.shape == (7, 2, len(ops))
+
+    for dia, turno in plano.turnos():
+        for op in ops:
+            assert matriz.elegivel(op.id, dia.data, turno.turno) == candidato_valido(
+                op, dia.data, turno, (), disponibilidade, capacidades
+            )
+
+    # com a matriz o placar chega às mesmas escolhas
+    def rodar(elegibilidade):
+        placar = PlacarVetorizado(ops, {k: dict(v) for k, v in stats.items()})
+        random.seed(3)
+        return _rodar(
+            lambda fila, data, turno, usados: fila.puxar(
+                data, turno, usados, disponibilidade, capacidades, elegibilidade
+            ),
+            placar, capacidades, disponibilidade,
+        )
+
+    assert rodar(matriz) == rodar(None)
+
+
+@pytest.mark.parametrize("modo", ["DIN", "SEM", "OPT"])
+def test_motores_rodam_sobre_contexto_sem_banco(modo):
+    from escalas.contexto import ContextoGeracao, Operador
+    from escalas.services import planejar_escala_semanal
+
+    # sem django_db: qualquer query aqui falha o teste
+    operadores = [
+        Operador(id=i, username=f"op{i}", cursos=frozenset({"MAN", "PIS"}))
+        for i in range(1, 11)
+    ]
+
+    contexto = ContextoGeracao(
+        secao=None,
+        operadores=operadores,
+        stats={},
+        disponibilidade=IndiceDisponibilidade(
+            INICIO, INICIO + timedelta(days=6), {INICIO: {1, 2}},
+        ),
+        capacidades=CapacidadesOperadores.de_operadores(operadores),
+        modo=modo,
+    )
+
+    plano = planejar_escala_semanal(
+        None, INICIO, 1, 2, modo=modo, contexto=contexto, seed=5
+    )
+
+    for dia, turno in plano.turnos():
+        assert turno.titulares == turno.qtd
+        if dia.data == INICIO:
+            assert not {1, 2} & set(turno.usuarios_ids())
+
+
+@pytest.mark.django_db
+def test_simulador_vetorizado_reproduz_simulador_escala(django_assert_num_queries):
+    from accounts.models import User, CursoOperacional, Curso
+    from indisponibilidades.models import Indisponibilidade
+    from projetos.models import Projeto, Secao
+    from escalas.ia.autoajuste import ParametrosIA
+    from escalas.ia.simulador import SimuladorEscala
+    from escalas.ia.vetorizado import CenarioSimulacao, simular
+
+    secao = Secao.objects.create(nome="A", projeto=Projeto.objects.create(nome="P"))
+    pista = CursoOperacional.objects.get_or_create(codigo=Curso.PISTA)[0]
+    manutencao = CursoOperacional.objects.get_or_create(codigo=Curso.MANUTENCAO)[0]
+
+    for i in range(8):
+        u = User.objects.create_user(
+            username=f"op{i}", password="123", secao=secao, papel=User.Papel.OPERADOR
+        )
+        u.cursos.add(manutencao)
+        if i % 3:
+            u.cursos.add(pista)
+        if i in (1, 4):
+            Indisponibilidade.objects.create(
+                usuario=u, data_inicio=INICIO + timedelta(days=i), data_fim=INICIO + timedelta(days=9)
+            )
+
+    params = ParametrosIA(peso_pontos=1.1, peso_amarelas=1.7, peso_sobreaviso=0.3)
+
+    esperado = SimuladorEscala(secao, params=params)
+    esperado_resultado = {}
+    for s in range(4):
+        for nome, qtd in esperado.simular_semana(INICIO + timedelta(days=7 * s)).items():
+            esperado_resultado[nome] = esperado_resultado.get(nome, 0) + qtd
+
+    cenario = CenarioSimulacao.carregar(secao, semanas=4, inicio=INICIO)
+
+    with django_assert_num_queries(0):
+        obtido = simular(cenario, params)
+
+    assert obtido == esperado_resultado
+
+
+@pytest.mark.django_db
+def test_treinar_ia_populacao_reprodutivel():
+    from accounts.models import User, CursoOperacional, Curso
+    from projetos.models import Projeto, Secao
+    from escalas.ia.aprendiz import treinar_ia
+
+    secao = Secao.objects.create(nome="A", projeto=Projeto.objects.create(nome="P"))
+    manutencao = CursoOperacional.objects.get_or_create(codigo=Curso.MANUTENCAO)[0]
+
+    for i in range(6):
+        User.objects.create_user(
+            username=f"op{i}", password="123", secao=secao, papel=User.Papel.OPERADOR
+        ).cursos.add(manutencao)
+
+    relatorios = []
+
+    def treinar():
+        return treinar_ia(
+            secao, geracoes=4, semanas=8, populacao=6, processos=1, seed=11,
+            ao_terminar_geracao=lambda *r: relatorios.append(r),
+        )
+
+    melhor, historico = treinar()
+
+    assert len(historico) == 4
+    assert len(relatorios) == 4
+    assert all(segundos >= 0 for *_, segundos in relatorios)
+    assert treinar() == (melhor, historico)
+
+
+@pytest.mark.django_db
+def test_parametros_ia_por_secao_em_cache(django_assert_num_queries):
+    from projetos.models import Projeto, Secao
+    from escalas.ia.autoajuste import ParametrosIA
+    from escalas.ia.runtime import (
+        carregar_parametros_ia, invalidar_parametros_ia, salvar_parametros_ia
+    )
+
+    projeto = Projeto.objects.create(nome="P")
+    secao = Secao.objects.create(nome="A", projeto=projeto)
+    outra = Secao.objects.create(nome="B", projeto=projeto)
+
+    invalidar_parametros_ia()
+
+    # sem treino → settings, uma query só na primeira leitura
+    with django_assert_num_queries(1):
+        padrao = carregar_parametros_ia(secao)
+        assert carregar_parametros_ia(secao) is padrao
+
+    treinados = ParametrosIA(peso_pontos=2.0, peso_amarelas=0.5, peso_sobreaviso=1.0)
+    salvo = salvar_parametros_ia(secao, treinados, injustica=0.1, geracoes=5)
+
+    # save invalida
+    with django_assert_num_queries(1):
+        assert carregar_parametros_ia(secao) == treinados
+        assert carregar_parametros_ia(secao) == treinados
+
+    assert carregar_parametros_ia(outra) == padrao
+
+    salvo.delete()
+
+    assert carregar_parametros_ia(secao) == padrao
+
+
+@pytest.mark.django_db
+def test_parametros_ia_gravados_por_outro_processo_expiram(monkeypatch):
+    from projetos.models import Projeto, Secao
+    from escalas.models import ParametrosIASecao
+    from escalas.ia import runtime
+
+    secao = Secao.objects.create(nome="A", projeto=Projeto.objects.create(nome="P"))
+
+    runtime.invalidar_parametros_ia()
+    padrao = runtime.carregar_parametros_ia(secao)
+
+    # outro processo (treinar_ia --salvar): o cache daqui não fica sabendo
+    ParametrosIASecao.objects.bulk_create([
+        ParametrosIASecao(
+            secao=secao, peso_pontos=3.0, peso_amarelas=2.0, peso_sobreaviso=1.0
+        )
+    ])
+
+    assert runtime.carregar_parametros_ia(secao) == padrao
+
+    agora = runtime.time.monotonic()
+    monkeypatch.setattr(
+        runtime.time, "monotonic", lambda: agora + runtime.TTL_PARAMETROS_IA + 1
+    )
+
+    assert runtime.carregar_parametros_ia(secao).peso_pontos == 3.0
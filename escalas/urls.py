@@ -5,6 +5,7 @@ app_name = "escalas"
 
 urlpatterns = [
     path("criar/", views.criar_escala, name="criar_escala"),
+    path("criar/confirmar/", views.confirmar_previa_view, name="confirmar_previa"),
     path("sobreaviso/", views.criar_sobreaviso_view, name="criar_sobreaviso"),
     path("<int:escala_id>/", views.detalhe_escala, name="detalhe_escala"),
     path("<int:escala_id>/publicar/", views.publicar_escala, name="publicar"),
@@ -17,4 +18,5 @@ urlpatterns = [
     path("sobreaviso/acionar/<int:alocacao_id>/", views.acionar_sobreaviso, name="acionar_sobreaviso"),
     path("reserva/<int:alocacao_id>/acionar/", views.acionar_reserva, name="acionar_reserva"),
     path("pisteiro/<int:alocacao_id>/", views.toggle_pisteiro, name="toggle_pisteiro",),
+    path("reparo/<int:indisponibilidade_id>/", views.reparar_indisponibilidade, name="reparar_indisponibilidade"),
 ]
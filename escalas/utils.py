@@ -12,33 +12,51 @@ def escolher_titular_semana(
     turno,
     titulares,
     fila,
-    usados_no_dia
+    usados_no_dia,
+    disponibilidade=None,
+    capacidades=None
 ):
     # 1️⃣ tenta titulares fixos
     for op in titulares:
         if op.id in usados_no_dia:
             continue
 
-        if not usuario_disponivel(op, data):
+        if not usuario_disponivel(op, data, disponibilidade):
             continue
 
-        if not pode_assumir_turno(op, turno.turno):
+        if not pode_assumir_turno(op, turno.turno, capacidades):
             continue
 
         return op
 
     # 2️⃣ fallback → fila (vira substituto)
-    return puxar_da_fila(fila, data, turno, usados_no_dia)
+    return puxar_da_fila(
+        fila, data, turno, usados_no_dia, disponibilidade, capacidades
+    )
 
 def escolher_reserva(
     data,
     turno,
     fila,
-    usados_no_dia
+    usados_no_dia,
+    disponibilidade=None,
+    capacidades=None
 ):
-    return puxar_da_fila(fila, data, turno, usados_no_dia)
+    return puxar_da_fila(
+        fila, data, turno, usados_no_dia, disponibilidade, capacidades
+    )
 
 def pontuar_alocacao(alocacao):
+    pontuacao = montar_pontuacao(alocacao)
+
+    if pontuacao is not None:
+        pontuacao.save()
+
+def montar_pontuacao(alocacao):
+    """
+    Pontuação (não salva) de uma alocação titular.
+    Usada pelo bulk_create do flush da escala.
+    """
     tipo_dia = alocacao.turno.dia.tipo_dia
 
     mapa_tipo = {
@@ -58,29 +76,39 @@ def pontuar_alocacao(alocacao):
     pontos = pesos.get(tipo_dia, 0)
 
     if alocacao.tipo != "TIT":
-        return  # reserva não pontua
+        return None  # reserva não pontua
 
-    Pontuacao.objects.create(
-        usuario=alocacao.usuario,
+    return Pontuacao(
+        usuario_id=alocacao.usuario_id,
         alocacao=alocacao,
         tipo=tipo,
         origem=Pontuacao.Origem.ESCALA,
         pontos=pontos,
     )
 
-def usuario_disponivel(usuario, data):
+def usuario_disponivel(usuario, data, disponibilidade=None):
+    """
+    Usa o índice em memória quando ele cobre a data;
+    caso contrário consulta o banco.
+    """
+    if disponibilidade is not None and disponibilidade.cobre(data):
+        return disponibilidade.disponivel(usuario.id, data)
+
     return not Indisponibilidade.objects.filter(
         usuario=usuario,
         data_inicio__lte=data,
         data_fim__gte=data,
     ).exists()
 
-def pode_assumir_turno(usuario, turno_codigo):
+def pode_assumir_turno(usuario, turno_codigo, capacidades=None):
     """
     Retorna True se o usuário pode operar o turno informado
     considerando seus cursos.
     """
 
+    if capacidades is not None and capacidades.conhece(usuario.id):
+        return capacidades.pode_assumir(usuario.id, turno_codigo)
+
     cursos = set(
         usuario.cursos.values_list("codigo", flat=True)
     )
@@ -96,11 +124,29 @@ def pode_assumir_turno(usuario, turno_codigo):
 
     return False
 
+def tem_curso_manutencao(usuario, capacidades=None):
+    if capacidades is not None and capacidades.conhece(usuario.id):
+        return capacidades.habilitado(usuario.id)
+
+    return usuario.cursos.filter(codigo=Curso.MANUTENCAO).exists()
+
+def turno_tem_habilitado(turno, capacidades=None):
+    """
+    Turno do plano responde pelo contador em memória; turno do banco consulta.
+    """
+    if hasattr(turno, "habilitados"):
+        return turno.habilitados > 0
+
+    return turno.alocacoes.filter(
+        usuario__cursos__codigo=Curso.MANUTENCAO
+    ).exists()
+
 class SeletorOperadores:
-    def __init__(self, operadores, start_index=0):
+    def __init__(self, operadores, start_index=0, disponibilidade=None):
         self.operadores = operadores
         self.indice = start_index
         self.total = len(operadores)
+        self.disponibilidade = disponibilidade
 
     def proximo(self, data, ignorar_ids=None):
         ignorar_ids = ignorar_ids or set()
@@ -113,7 +159,7 @@ class SeletorOperadores:
             if usuario.id in ignorar_ids:
                 continue
 
-            if not usuario_disponivel(usuario, data):
+            if not usuario_disponivel(usuario, data, self.disponibilidade):
                 continue
             return usuario
         return None
@@ -165,7 +211,14 @@ def fila_operadores(secao):
     return deque(operadores)
 
 
-def puxar_da_fila(fila, data, turno, usados_no_dia):
+def puxar_da_fila(
+    fila,
+    data,
+    turno,
+    usados_no_dia,
+    disponibilidade=None,
+    capacidades=None
+):
     """
     Lógica inteligente:
     - NOT: garante pelo menos 1 habilitado
@@ -177,9 +230,7 @@ def puxar_da_fila(fila, data, turno, usados_no_dia):
     # verifica se já há habilitado no NOT
     ja_tem_habilitado = False
     if turno.turno == "NOT":
-        ja_tem_habilitado = turno.alocacoes.filter(
-            usuario__cursos__codigo="MAN",
-        ).exists()
+        ja_tem_habilitado = turno_tem_habilitado(turno, capacidades)
 
     candidato_habilitado = None
 
@@ -188,7 +239,7 @@ def puxar_da_fila(fila, data, turno, usados_no_dia):
 
         disponivel = (
             op.id not in usados_no_dia
-            and usuario_disponivel(op, data)
+            and usuario_disponivel(op, data, disponibilidade)
         )
 
         if not disponivel:
@@ -206,7 +257,7 @@ def puxar_da_fila(fila, data, turno, usados_no_dia):
                 return op
 
             # ainda não tem habilitado → guardar o primeiro habilitado encontrado
-            if op.cursos.filter(codigo=Curso.MANUTENCAO).exists():
+            if tem_curso_manutencao(op, capacidades):
                 candidato_habilitado = op
 
             fila.append(op)
@@ -216,7 +267,7 @@ def puxar_da_fila(fila, data, turno, usados_no_dia):
         # MADRUGADA (regra normal)
         # ===============================
         if turno.turno == "MAD":
-            if pode_assumir_turno(op, "MAD"):
+            if pode_assumir_turno(op, "MAD", capacidades):
                 fila.append(op)
                 return op
 
@@ -234,15 +285,17 @@ def escolher_operador(
     data,
     turno_codigo,
     usados_no_dia,
+    disponibilidade=None,
+    capacidades=None,
 ):
     for op in operadores:
         if op.id in usados_no_dia:
             continue
 
-        if not usuario_disponivel(op, data):
+        if not usuario_disponivel(op, data, disponibilidade):
             continue
 
-        if not pode_assumir_turno(op, turno_codigo):
+        if not pode_assumir_turno(op, turno_codigo, capacidades):
             continue
 
         return op
@@ -0,0 +1,268 @@
+import random
+
+import numpy as np
+
+from .fairness import turno_tem_habilitado
+from .indices import BIT_POR_TURNO, CAP_MANUTENCAO
+from .utils import usuario_disponivel, pode_assumir_turno, tem_curso_manutencao
+
+
+# =========================
+# PLACAR VETORIZADO (NumPy)
+# =========================
+class PlacarVetorizado:
+    """
+    Contadores de fairness em arrays NumPy indexados pela posição
+    do operador.
+
+    Substitui a fila + dicts de stats do caminho escalar:
+    `ordem` reproduz a rotação da fila (remove + append) para que o
+    ruído de desempate seja sorteado na mesma ordem e, com a mesma
+    seed, as escolhas sejam idênticas às de puxar_da_fila_fair /
+    puxar_da_fila_fixa.
+
+    Os dicts `stats` / `stats_semana` recebidos continuam sendo
+    atualizados, então quem chama enxerga o mesmo estado.
+    """
+
+    def __init__(self, operadores, stats, stats_semana=None, rng=random):
+        self.operadores = list(operadores)
+        self.rng = rng
+        self.stats = stats
+        self.stats_semana = stats_semana if stats_semana is not None else {}
+
+        self.ids = np.array([op.id for op in self.operadores], dtype=np.int64)
+        self.posicao = {op.id: i for i, op in enumerate(self.operadores)}
+
+        def coluna(chave):
+            return np.array(
+                [stats.get(op.id, {}).get(chave, 0) for op in self.operadores],
+                dtype=np.int64,
+            )
+
+        self.total = coluna("total")
+        self.preta = coluna("preta")
+        self.amarela = coluna("amarela")
+
+        self.semana = np.array(
+            [self.stats_semana.get(op.id, 0) for op in self.operadores],
+            dtype=np.int64,
+        )
+
+        self.ordem = np.arange(len(self.operadores), dtype=np.int64)
+        self._cursos = None
+        self._na_matriz = None
+
+    def __len__(self):
+        return len(self.operadores)
+
+    def __iter__(self):
+        return (self.operadores[i] for i in self.ordem)
+
+    # =========================
+    # MÁSCARAS
+    # =========================
+    def _mascara_cursos(self, capacidades):
+        if self._cursos is None:
+            self._cursos = np.array(
+                [capacidades.mascaras.get(op.id, 0) for op in self.operadores],
+                dtype=np.int64,
+            )
+        return self._cursos
+
+    def _posicoes_na_matriz(self, elegibilidade):
+        """
+        Posição de cada operador da fila na MatrizElegibilidade
+        (None se algum operador não está nela).
+        """
+        if self._na_matriz is None or self._na_matriz[0] is not elegibilidade:
+            posicoes = None
+
+            if all(elegibilidade.conhece(int(u)) for u in self.ids):
+                posicoes = np.array(
+                    [elegibilidade.posicao[int(u)] for u in self.ids],
+                    dtype=np.int64,
+                )
+
+            self._na_matriz = (elegibilidade, posicoes)
+
+        return self._na_matriz[1]
+
+    def mascara_elegiveis(
+        self,
+        data,
+        turno,
+        usados_no_dia,
+        disponibilidade=None,
+        capacidades=None,
+        elegibilidade=None
+    ):
+        """
+        Elegibilidade de todos os operadores (na ordem da fila).
+        """
+        ids = self.ids[self.ordem]
+
+        mascara = ~np.isin(ids, list(usados_no_dia))
+
+        # 🔥 matriz pré-calculada → uma leitura de linha
+        if elegibilidade is not None and elegibilidade.cobre(data, turno.turno):
+            posicoes = self._posicoes_na_matriz(elegibilidade)
+
+            if posicoes is not None:
+                return mascara & elegibilidade.linha(data, turno.turno)[posicoes[self.ordem]]
+
+        if disponibilidade is not None and disponibilidade.cobre(data):
+            ausentes = disponibilidade.ausentes_por_dia.get(data, ())
+            mascara &= ~np.isin(ids, list(ausentes))
+        else:
+            mascara &= np.array(
+                [usuario_disponivel(op, data) for op in self],
+                dtype=bool,
+            )
+
+        if turno.turno in BIT_POR_TURNO:
+            if capacidades is not None:
+                bits = self._mascara_cursos(capacidades)[self.ordem]
+                mascara &= (bits & BIT_POR_TURNO[turno.turno]) != 0
+            else:
+                mascara &= np.array(
+                    [pode_assumir_turno(op, turno.turno) for op in self],
+                    dtype=bool,
+                )
+
+        return mascara
+
+    def _habilitados(self, posicoes, capacidades):
+        if capacidades is not None:
+            return (self._mascara_cursos(capacidades)[posicoes] & CAP_MANUTENCAO) != 0
+
+        return np.array(
+            [tem_curso_manutencao(self.operadores[i]) for i in posicoes],
+            dtype=bool,
+        )
+
+    # =========================
+    # SCORE
+    # =========================
+    def score_historico(self, posicoes, turno):
+        """
+        Mesmo cálculo de score_usuario para um lote de posições.
+        """
+        total = self.total[posicoes]
+        preta = self.preta[posicoes]
+        amarela = self.amarela[posicoes]
+
+        peso_amarela = 3 if turno.dia.tipo_dia == "AMARELA" else 1
+
+        score = (
+            (total - total.min()) * 10 +
+            (preta - preta.min()) * 4 +
+            (amarela - amarela.min()) * peso_amarela
+        )
+
+        # 🎲 ruído sorteado na mesma ordem do caminho escalar
+        ruido = np.array(
+            [self.rng.uniform(0, 0.1) for _ in range(len(posicoes))],
+            dtype=np.float64,
+        )
+
+        return score + ruido
+
+    def _argmin(self, posicoes, score):
+        # mesma ordenação de (score, id)
+        return posicoes[np.lexsort((self.ids[posicoes], score))[0]]
+
+    # =========================
+    # UPDATE
+    # =========================
+    def registrar(self, posicao, turno, semanal=False):
+        usuario_id = int(self.ids[posicao])
+
+        if semanal:
+            self.semana[posicao] += 1
+            self.stats_semana[usuario_id] = self.stats_semana.get(usuario_id, 0) + 1
+
+        dados = self.stats.setdefault(
+            usuario_id, {"total": 0, "preta": 0, "amarela": 0}
+        )
+
+        self.total[posicao] += 1
+        dados["total"] += 1
+
+        if turno.dia.tipo_dia == "PRETA":
+            self.preta[posicao] += 1
+            dados["preta"] += 1
+
+        elif turno.dia.tipo_dia == "AMARELA":
+            self.amarela[posicao] += 1
+            dados["amarela"] += 1
+
+        # rotação (remove + append)
+        self.ordem = np.append(self.ordem[self.ordem != posicao], posicao)
+
+        return self.operadores[posicao]
+
+    # =========================
+    # SELEÇÃO
+    # =========================
+    def puxar(
+        self,
+        data,
+        turno,
+        usados_no_dia,
+        disponibilidade=None,
+        capacidades=None,
+        elegibilidade=None
+    ):
+        """
+        Equivalente vetorizado de puxar_da_fila_fair.
+        """
+        if not len(self):
+            return None
+
+        mascara = self.mascara_elegiveis(
+            data, turno, usados_no_dia, disponibilidade, capacidades,
+            elegibilidade,
+        )
+        posicoes = self.ordem[mascara]
+
+        if not len(posicoes):
+            return None
+
+        # Regra NOT (garantir habilitado)
+        if turno.turno == "NOT" and not turno_tem_habilitado(turno, capacidades):
+            habilitados = self._habilitados(posicoes, capacidades)
+            if habilitados.any():
+                posicoes = posicoes[habilitados]
+
+        score = self.score_historico(posicoes, turno)
+
+        return self.registrar(self._argmin(posicoes, score), turno)
+
+    def puxar_fixa(
+        self,
+        data,
+        turno,
+        usados_no_dia,
+        disponibilidade=None,
+        capacidades=None,
+        elegibilidade=None
+    ):
+        """
+        Equivalente vetorizado de puxar_da_fila_fixa.
+        """
+        mascara = self.mascara_elegiveis(
+            data, turno, usados_no_dia, disponibilidade, capacidades,
+            elegibilidade,
+        )
+        posicoes = self.ordem[mascara]
+
+        if not len(posicoes):
+            return None
+
+        score = (
+            self.semana[posicoes] * 20 +   # 🔥 PRIORIDADE
+            self.score_historico(posicoes, turno) * 5
+        )
+
+        return self.registrar(self._argmin(posicoes, score), turno, semanal=True)
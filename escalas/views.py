@@ -4,8 +4,15 @@ from django.core.exceptions import PermissionDenied
 from django.shortcuts import get_object_or_404, redirect, render
 
 from .models import Escala
-from .services import gerar_escala_semanal, encerrar_escala, acionar_sobreaviso, criar_sobreaviso_service
+from .services import gerar_escala_semanal, gerar_escalas_periodo, encerrar_escala, acionar_sobreaviso, criar_sobreaviso_service, criar_sobreavisos_periodo
+from django.utils.dateparse import parse_date
 from .forms import CriarEscalaForm
+from .busca_local import ORCAMENTO_PADRAO_MS
+from .reparo import planejar_reparo, aplicar_reparo
+from .previa import gerar_previa, confirmar_previa, TTL_PREVIA
+from django.core.exceptions import ValidationError
+from indisponibilidades.models import Indisponibilidade
+from .contadores import recalcular_contadores
 from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.db import transaction
@@ -24,6 +31,50 @@ def criar_escala(request):
         if form.is_valid():
 
             tipo = form.cleaned_data["tipo_escala"]
+            semanas = form.cleaned_data.get("semanas") or 1
+            melhorar_ms = ORCAMENTO_PADRAO_MS if form.cleaned_data.get("refinar") else 0
+
+            # 👀 prévia → planeja sem gravar
+            if request.POST.get("acao") == "previa":
+                chave, planos = gerar_previa(
+                    secao=request.user.secao,
+                    data_inicio=form.cleaned_data["data_inicio"],
+                    qtd_madrugada=form.cleaned_data["qtd_madrugada"],
+                    qtd_noturno=form.cleaned_data["qtd_noturno"],
+                    semanas=semanas,
+                    modo=tipo,
+                    melhorar_ms=melhorar_ms,
+                )
+
+                return render(
+                    request,
+                    "escalas/previa_escala.html",
+                    {
+                        "form": form,
+                        "chave": chave,
+                        "planos": planos,
+                        "validade_min": TTL_PREVIA // 60,
+                    },
+                )
+
+            # 🔥 várias semanas → uma transação, um flush
+            if semanas > 1:
+                escalas = gerar_escalas_periodo(
+                    secao=request.user.secao,
+                    data_inicio=form.cleaned_data["data_inicio"],
+                    semanas=semanas,
+                    criada_por=request.user,
+                    qtd_madrugada=form.cleaned_data["qtd_madrugada"],
+                    qtd_noturno=form.cleaned_data["qtd_noturno"],
+                    modo=tipo,
+                    melhorar_ms=melhorar_ms,
+                )
+
+                messages.success(
+                    request,
+                    f"{len(escalas)} escalas geradas."
+                )
+                return redirect("escalas:semanas_escalante")
 
             escala = gerar_escala_semanal(
                 secao=request.user.secao,
@@ -32,6 +83,7 @@ def criar_escala(request):
                 qtd_madrugada=form.cleaned_data["qtd_madrugada"],
                 qtd_noturno=form.cleaned_data["qtd_noturno"],
                 modo=tipo,  # 🔥 ESSA LINHA RESOLVE TUDO
+                melhorar_ms=melhorar_ms,
             )
 
             return redirect("escalas:detalhe_escala", escala.id)
@@ -45,6 +97,30 @@ def criar_escala(request):
         {"form": form},
     )
 
+@login_required
+def confirmar_previa_view(request):
+    if not request.user.pode_escalar():
+        raise PermissionDenied
+
+    if request.method != "POST":
+        return redirect("escalas:criar_escala")
+
+    try:
+        escalas = confirmar_previa(
+            request.POST.get("chave", ""),
+            request.user.secao,
+            request.user,
+        )
+    except ValidationError as e:
+        messages.error(request, e.messages[0])
+        return redirect("escalas:criar_escala")
+
+    if len(escalas) == 1:
+        return redirect("escalas:detalhe_escala", escalas[0].id)
+
+    messages.success(request, f"{len(escalas)} escalas geradas.")
+    return redirect("escalas:semanas_escalante")
+
 @login_required
 def detalhe_escala(request, escala_id):
     escala = get_object_or_404(Escala, id=escala_id)
@@ -141,6 +217,8 @@ def editar_turno(request, turno_id):
                         reserva.substituiu = titular_substituido
                         reserva.save()
 
+            recalcular_contadores(escala.secao, [turno.dia.data])
+
         messages.success(request, "Turno atualizado com sucesso.")
         return redirect("escalas:detalhe_escala", escala.id)
 
@@ -231,7 +309,10 @@ def apagar_escala(request, escala_id):
 
     if request.method == "POST":
         with transaction.atomic():
+            datas = list(escala.dias.values_list("data", flat=True))
+            secao = escala.secao
             escala.delete()
+            recalcular_contadores(secao, datas)
 
         messages.success(
             request,
@@ -316,8 +397,36 @@ def criar_sobreaviso_view(request):
 
     if request.method == "POST":
         data = request.POST.get("data")
+        data_fim = request.POST.get("data_fim")
         quantidade = int(request.POST.get("quantidade"))
 
+        # 🔥 período → todos os fins de semana e feriados de uma vez
+        if data_fim:
+            feriados = [
+                parse_date(f.strip())
+                for f in request.POST.get("feriados", "").replace(",", "\n").splitlines()
+                if f.strip()
+            ]
+
+            try:
+                escalas = criar_sobreavisos_periodo(
+                    secao=request.user.secao,
+                    data_inicio=data,
+                    data_fim=data_fim,
+                    quantidade=quantidade,
+                    criada_por=request.user,
+                    feriados=[f for f in feriados if f],
+                )
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+                return redirect("escalas:criar_sobreaviso")
+
+            messages.success(
+                request,
+                f"{len(escalas)} sobreaviso(s) criado(s)."
+            )
+            return redirect("accounts:dashboard")
+
         criar_sobreaviso_service(
             secao=request.user.secao,
             data=data,
@@ -459,3 +568,46 @@ def toggle_pisteiro(request, alocacao_id):
     )
 
     return redirect("escalas:detalhe_escala", escala.id)
+
+@login_required
+def reparar_indisponibilidade(request, indisponibilidade_id):
+    if not request.user.pode_escalar():
+        raise PermissionDenied
+
+    indisponibilidade = get_object_or_404(
+        Indisponibilidade.objects.select_related("usuario"),
+        id=indisponibilidade_id,
+        usuario__secao=request.user.secao,
+    )
+
+    # o diff aprovado é o mesmo que foi mostrado
+    chave_sessao = f"reparo_{indisponibilidade.id}"
+
+    if request.method == "POST":
+        chaves = request.session.pop(chave_sessao, None)
+
+        if chaves is None:
+            messages.error(request, "Prévia expirada. Confira o reparo novamente.")
+            return redirect("escalas:reparar_indisponibilidade", indisponibilidade.id)
+
+        try:
+            alocacoes = aplicar_reparo(chaves)
+        except ValidationError as e:
+            messages.error(request, e.messages[0])
+            return redirect("escalas:reparar_indisponibilidade", indisponibilidade.id)
+
+        messages.success(request, f"{len(alocacoes)} alocação(ões) reparada(s).")
+        return redirect("indisponibilidades:secao")
+
+    substituicoes = planejar_reparo(indisponibilidade)
+    request.session[chave_sessao] = [s.chave() for s in substituicoes]
+
+    return render(
+        request,
+        "escalas/reparar_indisponibilidade.html",
+        {
+            "indisponibilidade": indisponibilidade,
+            "substituicoes": substituicoes,
+            "tem_substituto": any(s.entra for s in substituicoes),
+        },
+    )
@@ -17,4 +17,35 @@ class DatabaseRetryMiddleware:
             return HttpResponse(
                 "Banco iniciando, tente novamente em alguns segundos.",
                 status=503
-            )
\ No newline at end of file
+            )
+
+class ResumoQueriesMiddleware:
+    """
+    Uma linha de log por requisição com as medições dos serviços
+    instrumentados (escalas.instrumentacao).
+    Ativado com ESCALA_RESUMO_QUERIES=1.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        import json
+        from escalas.instrumentacao import coletar_requisicao, logger
+
+        with coletar_requisicao() as medicoes:
+            response = self.get_response(request)
+
+        if medicoes:
+            logger.info(json.dumps({
+                "path": request.path,
+                "status": response.status_code,
+                "servicos": [m.servico for m in medicoes],
+                "queries": sum(m.queries for m in medicoes),
+                "sql_ms": round(sum(m.sql_segundos for m in medicoes) * 1000, 2),
+                "orcamentos_excedidos": [m.servico for m in medicoes if m.excedeu],
+            }, ensure_ascii=False))
+
+            response["X-Escala-Queries"] = str(sum(m.queries for m in medicoes))
+
+        return response
@@ -68,6 +68,14 @@ MIDDLEWARE = [
     'gerador_de_escala.middleware.DatabaseRetryMiddleware',
 ]
 
+# resumo de queries por requisição (escalas.instrumentacao)
+if os.getenv("ESCALA_RESUMO_QUERIES"):
+    MIDDLEWARE.append("gerador_de_escala.middleware.ResumoQueriesMiddleware")
+
+# orçamento de queries estourado: True → exceção, False → só log.
+# Só para testes: a exceção vem depois do COMMIT, não desfaz nada.
+ESCALA_ORCAMENTO_ESTRITO = bool(os.getenv("ESCALA_ORCAMENTO_ESTRITO"))
+
 ROOT_URLCONF = 'gerador_de_escala.urls'
 
 TEMPLATES = [
@@ -161,6 +169,22 @@ ESCALA_IA_PARAMS = {
     "peso_sobreaviso": 0.6320978796260854,
 }
 
+# Cache
+# "previas": planos da prévia de geração (escalas.previa). Tem que ser
+# compartilhado entre os workers do gunicorn (WEB_CONCURRENCY) e
+# sobreviver a restart: a prévia é gerada num worker e confirmada
+# em outro. DatabaseCache no próprio Postgres; a tabela é criada
+# pela migration escalas.0008 (createcachetable).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "previas": {
+        "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+        "LOCATION": "escalas_cache_previas",
+    },
+}
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
@@ -28,6 +28,16 @@ def criar_indisponibilidade(request):
             indisp.usuario = request.user
             indisp.save()
             messages.success(request, "Indisponibilidade registrada.")
+
+            from escalas.reparo import alocacoes_afetadas
+
+            afetadas = alocacoes_afetadas(indisp).count()
+            if afetadas:
+                messages.warning(
+                    request,
+                    f"Você está escalado em {afetadas} turno(s) nesse período. "
+                    "O escalante precisa reparar a escala."
+                )
             return redirect("indisponibilidades:minhas")
     else:
         form = IndisponibilidadeForm()
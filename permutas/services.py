@@ -2,6 +2,8 @@ from django.utils import timezone
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from escalas.models import AlocacaoEscala
+from escalas.contadores import recalcular_contadores_alocacoes
+from escalas.instrumentacao import instrumentado
 
 
 def validar_permuta(permuta):
@@ -27,6 +29,7 @@ def usuario_ja_escala_no_dia(usuario, dia, ignorar_alocacao=None):
     return qs.exists()
 
 
+@instrumentado("executar_permuta_direta")
 @transaction.atomic
 def executar_permuta_direta(permuta):
     validar_permuta(permuta)
@@ -64,11 +67,14 @@ def executar_permuta_direta(permuta):
     origem.usuario = usuario_destino
     origem.save(update_fields=["usuario"])
 
+    recalcular_contadores_alocacoes(origem, destino)
+
     permuta.status = "ACEITA"
     permuta.resolvida_em = timezone.now()
     permuta.save()
 
 
+@instrumentado("executar_pedido_permuta")
 def executar_pedido_permuta(permuta, novo_usuario):
     validar_permuta(permuta)
 
@@ -86,6 +92,8 @@ def executar_pedido_permuta(permuta, novo_usuario):
     alocacao.usuario = novo_usuario
     alocacao.save()
 
+    recalcular_contadores_alocacoes(alocacao)
+
     permuta.status = "ACEITA"
     permuta.resolvida_em = timezone.now()
     permuta.save()
\ No newline at end of file